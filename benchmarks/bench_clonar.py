@@ -0,0 +1,68 @@
+"""
+Benchmark: clonar un mapa y hacer una sola edición en el clon.
+
+Compara la versión anterior (copy.deepcopy de listas de listas con un
+Tile por celda) contra Mapa.clonar con copy-on-write.
+
+Uso:
+    python benchmarks/bench_clonar.py [lado]
+"""
+
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from modelo.mapa import Mapa, Tile
+
+
+def medir(funcion, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def capas_como_antes(lado):
+    # Así eran las capas antes: una instancia de Tile por celda pintada
+    return {
+        'fondo': [[Tile('pasto') for _ in range(lado)] for _ in range(lado)],
+        'decoracion': [[None for _ in range(lado)] for _ in range(lado)],
+        'objetos': [[None for _ in range(lado)] for _ in range(lado)],
+        'colision': [[False for _ in range(lado)] for _ in range(lado)]
+    }
+
+
+def main():
+    lado = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    print(f"Mapa de {lado}x{lado} con la capa de fondo llena\n")
+
+    capas = capas_como_antes(lado)
+
+    def antes():
+        clon = copy.deepcopy(capas)
+        clon['fondo'][0][0] = Tile('agua')
+
+    for disperso in (False, True):
+        mapa = Mapa(lado, lado, 32, disperso)
+        pasto = Tile('pasto')
+        for y in range(lado):
+            for x in range(lado):
+                mapa._asignar(x, y, 'fondo', pasto)
+
+        def despues():
+            clon = mapa.clonar()
+            clon.colocar_tile(0, 0, Tile('agua'), 'fondo')
+
+        nombre = "chunks" if disperso else "denso"
+        print(f"  clonar + 1 edición ({nombre}): {medir(despues) * 1000:9.3f} ms")
+
+    print(f"  clonar + 1 edición (deepcopy):  {medir(antes, 1) * 1000:9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: flood fill de todo un mapa vacío.
+
+Compara el relleno anterior (pila de 4 vecinos con un set de visitados y
+una llamada a colocar_tile por celda) contra Mapa.rellenar (por tramos,
+una sola acción de undo), y mide también deshacer ese relleno.
+
+Uso:
+    python benchmarks/bench_relleno.py [lado]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from modelo.mapa import Mapa, Tile
+from modelo.relleno import calcular_relleno
+
+
+def relleno_como_antes(mapa, x, y, tile, capa):
+    pila = [(x, y)]
+    visitados = set()
+    while pila:
+        cx, cy = pila.pop()
+        if (cx, cy) in visitados or not mapa._validar_coordenadas(cx, cy):
+            continue
+        if mapa.obtener_tile(cx, cy, capa) is not None:
+            continue
+        mapa.colocar_tile(cx, cy, tile, capa)
+        visitados.add((cx, cy))
+        pila.extend([(cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)])
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    lado = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    print(f"Mapa vacío de {lado}x{lado}\n")
+    pasto = Tile('pasto')
+
+    for disperso in (False, True):
+        nombre = "chunks" if disperso else "denso"
+        mapa = Mapa(lado, lado, 32, disperso)
+        t = medir(lambda: calcular_relleno(mapa.capas['fondo'], 0, 0))
+        print(f"  máscara ({nombre}):          {t * 1000:9.1f} ms")
+        t = medir(lambda: mapa.rellenar(0, 0, pasto, 'fondo'))
+        print(f"  rellenar ({nombre}):         {t * 1000:9.1f} ms")
+        t = medir(lambda: mapa.undo_redo.deshacer(mapa))
+        print(f"  deshacer ({nombre}):         {t * 1000:9.1f} ms")
+
+    # El relleno anterior es demasiado lento para el mapa completo
+    lado_antes = min(lado, 256)
+    mapa = Mapa(lado_antes, lado_antes, 32)
+    t = medir(lambda: relleno_como_antes(mapa, 0, 0, pasto, 'fondo'))
+    print(f"  relleno anterior ({lado_antes}x{lado_antes}): {t * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
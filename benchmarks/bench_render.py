@@ -0,0 +1,83 @@
+"""
+Benchmark: costo por cuadro de MapView según el tamaño del mapa.
+
+Pinta la vista fuera de pantalla (plataforma "offscreen" de Qt) sobre
+mapas llenos de distintos tamaños con la ventana siempre igual. Como solo
+se pintan los chunks que se ven, el tiempo por cuadro tiene que quedar
+parejo aunque el mapa crezca.
+
+Mide tres cosas:
+  - primer cuadro: compone los chunks visibles;
+  - cuadro con caché: todo ya compuesto;
+  - desplazamiento: cada cuadro mueve la vista y entran chunks nuevos;
+  - lejos: la vista a escala 1/16, pintada con los niveles reducidos
+    (primer cuadro / con caché).
+
+Uso:
+    python benchmarks/bench_render.py [ancho_ventana alto_ventana]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from PyQt5.QtWidgets import QApplication
+
+from modelo.mapa import Mapa, Tile
+from interfaz.map_canvas import MapView
+
+
+CUADROS = 30
+
+
+def medir(funcion, veces=1):
+    inicio = time.perf_counter()
+    for _ in range(veces):
+        funcion()
+    return (time.perf_counter() - inicio) / veces
+
+
+def main():
+    ancho = int(sys.argv[1]) if len(sys.argv) > 2 else 1024
+    alto = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    app = QApplication(sys.argv)
+    print(f"Ventana de {ancho}x{alto}, tiles de 32 px\n")
+    print(f"{'mapa':>11} {'primer cuadro':>14} {'con caché':>10} {'desplazando':>12} {'chunks':>7} {'lejos':>19}")
+
+    for lado in (128, 512, 2048, 4096):
+        mapa = Mapa(lado, lado, 32, lado * lado > Mapa.CELDAS_MAX_DENSO)
+        mapa.rellenar(0, 0, Tile('pasto'), 'fondo')
+        mapa.undo_redo.limpiar()
+
+        vista = MapView()
+        vista.resize(ancho, alto)
+        vista.mapa = mapa
+        vista.centerOn(lado * 16, lado * 16)
+
+        primero = medir(vista.grab)
+        con_cache = medir(vista.grab, CUADROS)
+
+        barra = vista.horizontalScrollBar()
+        def desplazar():
+            barra.setValue(barra.value() + 64)
+            vista.grab()
+        desplazando = medir(desplazar, CUADROS)
+
+        pintados = vista._render.pintados
+
+        vista.scale(1 / 16, 1 / 16)
+        lejos_primero = medir(vista.grab)
+        lejos = medir(vista.grab, CUADROS)
+
+        print(f"{lado:>5}x{lado:<5} {primero * 1000:11.1f} ms {con_cache * 1000:7.1f} ms "
+              f"{desplazando * 1000:9.1f} ms {pintados:>7} "
+              f"{lejos_primero * 1000:8.1f} / {lejos * 1000:5.1f} ms")
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
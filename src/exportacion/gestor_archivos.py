@@ -36,10 +36,11 @@ class GestorArchivos:
                 'spawn_points': mapa.spawn_points
             }
             
-            for nombre_capa, matriz in mapa.capas.items():
+            for nombre_capa in mapa.capas:
                 if nombre_capa == 'colision':
-                    datos['capas'][nombre_capa] = matriz
+                    datos['capas'][nombre_capa] = mapa.colisiones.a_matriz()
                 else:
+                    matriz = mapa.obtener_matriz(nombre_capa)
                     # Serializar tiles
                     capa_serializada = []
                     for fila in matriz:
@@ -82,18 +83,20 @@ class GestorArchivos:
             
             # Reconstruir mapa
             metadata = datos['metadata']
-            mapa = Mapa(metadata['ancho'], metadata['alto'], metadata['tamano_tile'])
+            disperso = metadata['ancho'] * metadata['alto'] > Mapa.CELDAS_MAX_DENSO
+            mapa = Mapa(metadata['ancho'], metadata['alto'], metadata['tamano_tile'], disperso)
             
             # Reconstruir capas
             for nombre_capa, contenido in datos['capas'].items():
+                if nombre_capa not in mapa.capas:
+                    continue
                 if nombre_capa == 'colision':
-                    mapa.capas[nombre_capa] = contenido
+                    mapa.colisiones.cargar_matriz(contenido)
                 else:
-                    for y, fila in enumerate(contenido):
-                        for x, tile_data in enumerate(fila):
-                            if tile_data:
-                                tile = Tile.from_dict(tile_data)
-                                mapa.capas[nombre_capa][y][x] = tile
+                    mapa.establecer_matriz(nombre_capa, [
+                        [Tile.from_dict(tile_data) if tile_data else None for tile_data in fila]
+                        for fila in contenido
+                    ])
             
             mapa.spawn_points = datos.get('spawn_points', [])
             
@@ -125,9 +128,9 @@ class GestorArchivos:
                 'height': mapa.alto,
                 'tileSize': mapa.tamano_tile,
                 'layers': {
-                    'background': self._comprimir_capa(mapa.capas['fondo']),
-                    'objects': self._comprimir_capa(mapa.capas['objetos']),
-                    'collision': self._comprimir_colisiones(mapa.capas['colision'])
+                    'background': self._comprimir_capa(mapa.obtener_matriz('fondo')),
+                    'objects': self._comprimir_capa(mapa.obtener_matriz('objetos')),
+                    'collision': self._comprimir_colisiones(mapa.colisiones)
                 },
                 'spawns': mapa.spawn_points
             }
@@ -144,13 +147,8 @@ class GestorArchivos:
     def _comprimir_capa(self, matriz):
         return [[tile.tipo if tile else None for tile in fila] for fila in matriz]
     
-    def _comprimir_colisiones(self, matriz):
-        colisiones = []
-        for y, fila in enumerate(matriz):
-            for x, tiene_colision in enumerate(fila):
-                if tiene_colision:
-                    colisiones.append([x, y])
-        return colisiones
+    def _comprimir_colisiones(self, capa_colision):
+        return [[x, y] for x, y in capa_colision.celdas_activas()]
     
     def exportar_png(self, mapa, nombre_archivo):
         #BONO, Exportar el mapa como imagen PNG
@@ -176,16 +174,14 @@ class GestorArchivos:
                             
                             draw.rectangle([x1, y1, x2, y2], fill=rgb)
             
-            for y in range(mapa.alto):
-                for x in range(mapa.ancho):
-                    if mapa.capas['colision'][y][x]:
-                        x1 = x * mapa.tamano_tile
-                        y1 = y * mapa.tamano_tile
-                        x2 = x1 + mapa.tamano_tile
-                        y2 = y1 + mapa.tamano_tile
+            for x, y in mapa.colisiones.celdas_activas():
+                x1 = x * mapa.tamano_tile
+                y1 = y * mapa.tamano_tile
+                x2 = x1 + mapa.tamano_tile
+                y2 = y1 + mapa.tamano_tile
 
-                        draw.line([x1, y1, x2, y2], fill=(255, 0, 0), width=2)
-                        draw.line([x2, y1, x1, y2], fill=(255, 0, 0), width=2)
+                draw.line([x1, y1, x2, y2], fill=(255, 0, 0), width=2)
+                draw.line([x2, y1, x1, y2], fill=(255, 0, 0), width=2)
             
             for x in range(0, ancho_img, mapa.tamano_tile):
                 draw.line([(x, 0), (x, alto_img)], fill=(200, 200, 200), width=1)
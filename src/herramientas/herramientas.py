@@ -37,6 +37,8 @@ class HerramientaLapiz(Herramienta):
     
     def mouse_press(self, x, y, mapa, tile_seleccionado=None):
         self.dibujando = True
+        if mapa:
+            mapa.undo_redo.iniciar_trazo()
         self._dibujar(x, y, mapa, tile_seleccionado)
     
     def mouse_move(self, x, y, mapa, tile_seleccionado=None):
@@ -45,6 +47,8 @@ class HerramientaLapiz(Herramienta):
     
     def mouse_release(self, x, y, mapa, tile_seleccionado=None):
         self.dibujando = False
+        if mapa:
+            mapa.undo_redo.confirmar_trazo()
     
     def _dibujar(self, x, y, mapa, tile):
         """Coloca el tile seleccionado en la posición."""
@@ -55,9 +59,8 @@ class HerramientaLapiz(Herramienta):
         grid_y = y // mapa.tamano_tile
         
         try:
-            # Clonar el tile para que cada celda tenga su propia instancia
-            tile_nuevo = tile.clonar()
-            mapa.colocar_tile(grid_x, grid_y, tile_nuevo)
+            # La paleta del mapa comparte una única instancia por tipo de tile
+            mapa.colocar_tile(grid_x, grid_y, tile)
         except ValueError:
             pass  # Fuera del mapa
 
@@ -71,6 +74,8 @@ class HerramientaBorrador(Herramienta):
     
     def mouse_press(self, x, y, mapa, tile_seleccionado=None):
         self.borrando = True
+        if mapa:
+            mapa.undo_redo.iniciar_trazo()
         self._borrar(x, y, mapa)
     
     def mouse_move(self, x, y, mapa, tile_seleccionado=None):
@@ -79,6 +84,8 @@ class HerramientaBorrador(Herramienta):
     
     def mouse_release(self, x, y, mapa, tile_seleccionado=None):
         self.borrando = False
+        if mapa:
+            mapa.undo_redo.confirmar_trazo()
     
     def _borrar(self, x, y, mapa):
         """Borra el tile en la posición."""
@@ -110,56 +117,14 @@ class HerramientaRelleno(Herramienta):
         if not mapa._validar_coordenadas(grid_x, grid_y):
             return
         
-        capa = mapa.capa_activa
-        tile_original = mapa.obtener_tile(grid_x, grid_y, capa)
-        
-        # No hacer nada si es el mismo tipo
-        if tile_original and tile_original.tipo == tile_seleccionado.tipo:
-            return
-        
-        # Flood fill
-        self._flood_fill(mapa, grid_x, grid_y, tile_original, tile_seleccionado, capa)
+        # Flood fill por tramos en el modelo (una sola acción de undo)
+        mapa.rellenar(grid_x, grid_y, tile_seleccionado, mapa.capa_activa)
     
     def mouse_move(self, x, y, mapa, tile_seleccionado=None):
         pass  # Relleno no se activa con movimiento
     
     def mouse_release(self, x, y, mapa, tile_seleccionado=None):
         pass
-    
-    def _flood_fill(self, mapa, x, y, tile_original, tile_nuevo, capa):
-        """Algoritmo de flood fill iterativo."""
-        tipo_original = tile_original.tipo if tile_original else None
-        
-        pila = [(x, y)]
-        visitados = set()
-        
-        while pila:
-            cx, cy = pila.pop()
-            
-            if (cx, cy) in visitados:
-                continue
-            
-            if not mapa._validar_coordenadas(cx, cy):
-                continue
-            
-            tile_actual = mapa.obtener_tile(cx, cy, capa)
-            tipo_actual = tile_actual.tipo if tile_actual else None
-            
-            if tipo_actual != tipo_original:
-                continue
-            
-            # Colocar nuevo tile
-            tile_clon = tile_nuevo.clonar()
-            mapa.colocar_tile(cx, cy, tile_clon, capa)
-            visitados.add((cx, cy))
-            
-            # Agregar vecinos
-            pila.extend([
-                (cx + 1, cy),
-                (cx - 1, cy),
-                (cx, cy + 1),
-                (cx, cy - 1)
-            ])
 
 
 class HerramientaColision(Herramienta):
@@ -171,6 +136,8 @@ class HerramientaColision(Herramienta):
     
     def mouse_press(self, x, y, mapa, tile_seleccionado=None):
         self.pintando = True
+        if mapa:
+            mapa.undo_redo.iniciar_trazo()
         self._marcar(x, y, mapa)
     
     def mouse_move(self, x, y, mapa, tile_seleccionado=None):
@@ -179,6 +146,8 @@ class HerramientaColision(Herramienta):
     
     def mouse_release(self, x, y, mapa, tile_seleccionado=None):
         self.pintando = False
+        if mapa:
+            mapa.undo_redo.confirmar_trazo()
     
     def _marcar(self, x, y, mapa):
         """Marca colisión en la posición."""
@@ -189,7 +158,7 @@ class HerramientaColision(Herramienta):
         grid_y = y // mapa.tamano_tile
         
         if mapa._validar_coordenadas(grid_x, grid_y):
-            mapa.capas['colision'][grid_y][grid_x] = True
+            mapa.establecer_colision(grid_x, grid_y, True)
 
 class HerramientaMover(Herramienta):
     def __init__(self):
@@ -211,8 +180,11 @@ class HerramientaMover(Herramienta):
             grid_y = y
 
             if mapa._validar_coordenadas(grid_x, grid_y):
+                # Mover = borrar + colocar, deshecho de una vez
+                mapa.undo_redo.iniciar_trazo()
                 mapa.colocar_tile(self.origen[0], self.origen[1], None)
                 mapa.colocar_tile(grid_x, grid_y, self.tile_copiado)
+                mapa.undo_redo.confirmar_trazo()
 
         self.tile_copiado = None
         self.origen = None
@@ -0,0 +1,110 @@
+"""
+Reloj de animación compartido por todo el canvas.
+
+Un solo QTimer para todos los tiles animados: en cada tick se calcula el
+frame de cada entrada animada de la paleta (no de cada celda) y se avisa
+qué entradas cambiaron de frame. La vista repinta solo las celdas
+visibles con esas entradas (ver IndiceAnimados).
+
+El reloj se detiene solo cuando no hay celdas animadas y se puede pausar
+(p. ej. con la ventana minimizada): en pausa el tiempo no avanza.
+"""
+
+from PyQt5.QtCore import QElapsedTimer, QObject, QTimer, pyqtSignal
+
+from modelo.animacion import es_animado, frame_en
+
+
+class RelojAnimacion(QObject):
+    """Reloj común de los tiles animados."""
+
+    # Set de índices de la paleta que cambiaron de frame
+    avanzo = pyqtSignal(object)
+
+    INTERVALO_MS = 33
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paleta = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.INTERVALO_MS)
+        self._timer.timeout.connect(self._tick)
+        self._cronometro = QElapsedTimer()
+        self._cronometro.start()
+        # Tiempo acumulado hasta la última pausa
+        self._base_ms = 0
+        self._pausado = False
+        self._hay_animados = False
+        # Índice de la paleta -> frame mostrado
+        self._frames = {}
+        # Entradas animadas de la paleta (se recalculan si la paleta crece)
+        self._entradas = []
+        self._largo_paleta = -1
+
+    def establecer_paleta(self, paleta):
+        self.paleta = paleta
+        self._frames = {}
+        self._largo_paleta = -1
+
+    def tiempo_ms(self):
+        if self._pausado:
+            return self._base_ms
+        return self._base_ms + self._cronometro.elapsed()
+
+    def frame(self, valor):
+        """Frame actual de la entrada de la paleta."""
+        frame = self._frames.get(valor)
+        if frame is None:
+            frame = self._frames[valor] = frame_en(self.paleta.obtener_tile(valor), self.tiempo_ms())
+        return frame
+
+    def _tick(self):
+        if self.paleta is None:
+            return
+        if len(self.paleta) != self._largo_paleta:
+            self._largo_paleta = len(self.paleta)
+            self._entradas = [(valor, tile) for valor, tile in self.paleta if es_animado(tile)]
+        tiempo = self.tiempo_ms()
+        cambiados = set()
+        for valor, tile in self._entradas:
+            frame = frame_en(tile, tiempo)
+            if self._frames.get(valor) != frame:
+                self._frames[valor] = frame
+                cambiados.add(valor)
+        if cambiados:
+            self.avanzo.emit(cambiados)
+
+    # ------------------------------------------------------------------
+    # Marcha y pausa
+    # ------------------------------------------------------------------
+    def establecer_hay_animados(self, hay):
+        """Avisa si hay celdas animadas: sin ninguna el timer no corre."""
+        self._hay_animados = bool(hay)
+        self._actualizar_timer()
+
+    def pausar(self):
+        if not self._pausado:
+            self._base_ms += self._cronometro.elapsed()
+            self._pausado = True
+            self._actualizar_timer()
+
+    def reanudar(self):
+        if self._pausado:
+            self._cronometro.restart()
+            self._pausado = False
+            self._actualizar_timer()
+
+    @property
+    def pausado(self):
+        return self._pausado
+
+    @property
+    def activo(self):
+        return self._timer.isActive()
+
+    def _actualizar_timer(self):
+        if self._hay_animados and not self._pausado:
+            if not self._timer.isActive():
+                self._timer.start()
+        else:
+            self._timer.stop()
@@ -0,0 +1,104 @@
+"""
+Caché LRU de sprites decodificados y escalados, compartida por el canvas,
+la paleta de tiles, el preview y la galería de sprites.
+
+Cada archivo se decodifica una vez (se guarda el original) y cada tamaño
+pedido se escala una vez a partir de ese original. La clave incluye el
+mtime que conoce el registro de recursos: cuando un sprite cambia en
+disco (registro_recursos.reescanear()), las entradas viejas dejan de
+usarse y salen solas por LRU.
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap
+
+from modelo.recursos import registro_recursos
+
+
+class CachePixmaps:
+    """QPixmaps por (ruta, mtime, tamaño, modo) con límite de memoria."""
+
+    MEMORIA_MB = 64
+
+    def __init__(self, memoria_mb=MEMORIA_MB):
+        self._pixmaps = OrderedDict()
+        self.limite_bytes = int(memoria_mb * 1024 * 1024)
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _bytes(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def obtener(self, ruta, tamano=None, modo=Qt.SmoothTransformation, aspecto=Qt.KeepAspectRatio):
+        """
+        Pixmap del sprite, escalado a tamano (int o (ancho, alto)) si se pide.
+        Si el archivo no existe o no se puede leer devuelve un QPixmap nulo.
+        """
+        if isinstance(tamano, int):
+            tamano = (tamano, tamano)
+        info = registro_recursos.info(ruta)
+        clave = (info.ruta_absoluta, info.mtime, tamano, int(modo), int(aspecto))
+
+        pixmap = self._pixmaps.get(clave)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(clave)
+            self.aciertos += 1
+            return pixmap
+
+        self.fallos += 1
+        if tamano is None:
+            pixmap = QPixmap(info.ruta_absoluta) if info.existe else QPixmap()
+        else:
+            original = self.obtener(ruta)
+            if original.isNull():
+                return original
+            pixmap = original.scaled(tamano[0], tamano[1], aspecto, modo)
+        self._guardar(clave, pixmap)
+        return pixmap
+
+    def _guardar(self, clave, pixmap):
+        self._pixmaps[clave] = pixmap
+        self.bytes_usados += self._bytes(pixmap)
+        self._recortar()
+
+    def _recortar(self):
+        # Siempre queda al menos el último pedido
+        while len(self._pixmaps) > 1 and self.bytes_usados > self.limite_bytes:
+            _, viejo = self._pixmaps.popitem(last=False)
+            self.bytes_usados -= self._bytes(viejo)
+
+    def establecer_limite(self, memoria_mb):
+        self.limite_bytes = int(memoria_mb * 1024 * 1024)
+        self._recortar()
+
+    def invalidar(self, ruta=None):
+        """Olvida los pixmaps de una ruta (o todos)."""
+        if ruta is None:
+            self._pixmaps.clear()
+            self.bytes_usados = 0
+            return
+        absoluta = registro_recursos.info(ruta).ruta_absoluta
+        for clave in [c for c in self._pixmaps if c[0] == absoluta]:
+            self.bytes_usados -= self._bytes(self._pixmaps.pop(clave))
+
+    def obtener_estadisticas(self):
+        pedidos = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._pixmaps),
+            'bytes_usados': self.bytes_usados,
+            'limite_bytes': self.limite_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / pedidos if pedidos else 0.0
+        }
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+# Caché global de pixmaps
+cache_pixmaps = CachePixmaps()
@@ -4,14 +4,17 @@ from PyQt5.QtWidgets import (
     QDockWidget, QListWidget, QListWidgetItem, QDialog, 
     QSpinBox, QFormLayout, QDialogButtonBox, QInputDialog
 )
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QEvent, pyqtSignal
 from PyQt5.QtGui import QColor, QPixmap, QIcon
 import os
 
 from modelo.mapa import Mapa, Tile, TILES_CONFIG, crear_tile_desde_config
 from modelo.cargador_tiles import cargar_tiles_desde_assets
 from exportacion.gestor_archivos import GestorArchivos
+from sistema.diario import abrir_diario, hay_cambios_sin_guardar, recuperar_mapa
 from .map_canvas import MapView
+from .cache_pixmaps import cache_pixmaps
+from .minimapa import Minimapa
 
 
 class NewMapDialog(QDialog):
@@ -22,11 +25,11 @@ class NewMapDialog(QDialog):
         layout = QFormLayout()
         
         self.width_spin = QSpinBox()
-        self.width_spin.setRange(10, 200)
+        self.width_spin.setRange(10, 4096)
         self.width_spin.setValue(30)
         
         self.height_spin = QSpinBox()
-        self.height_spin.setRange(10, 200)
+        self.height_spin.setRange(10, 4096)
         self.height_spin.setValue(20)
         
         self.tile_spin = QSpinBox()
@@ -49,6 +52,9 @@ class NewMapDialog(QDialog):
 
 
 class MainWindow(QMainWindow):
+    # El diario avisa desde su hilo escritor: la señal lo pasa al hilo de la interfaz
+    diario_fallo = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Editor de Mapas 2D")
@@ -56,6 +62,11 @@ class MainWindow(QMainWindow):
 
         self.gestor_archivos = GestorArchivos()
         self.archivo_actual = None
+        
+        # Diario de cambios en disco del mapa abierto (para recuperar trabajo sin guardar)
+        self.ruta_diarios = "maps/.diarios/"
+        self.diario = None
+        self.diario_fallo.connect(self._al_fallar_diario)
 
         self.map_view = MapView()
         self.setCentralWidget(self.map_view)
@@ -69,6 +80,8 @@ class MainWindow(QMainWindow):
         self.status.showMessage("Listo - Crea un nuevo mapa para empezar")
 
         self._create_menu()
+        
+        self._recuperar_trabajo()
 
     # =========================================================
     # MENÚ PRINCIPAL
@@ -91,6 +104,11 @@ class MainWindow(QMainWindow):
         redo_action.triggered.connect(self.redo)
         edit_menu.addAction(redo_action)
 
+        rama_action = QAction("⑂ Alternar rama (A/B)", self)
+        rama_action.setShortcut("Ctrl+B")
+        rama_action.triggered.connect(self.alternar_rama)
+        edit_menu.addAction(rama_action)
+
         new_action = QAction("📄 Nuevo mapa", self)
         new_action.setShortcut("Ctrl+N")
         new_action.triggered.connect(self.action_new_map)
@@ -132,7 +150,16 @@ class MainWindow(QMainWindow):
         toggle_grid.setShortcut("G")
         toggle_grid.triggered.connect(self.toggle_grid)
 
-        view_menu.addActions([zoom_in, zoom_out, reset_zoom, toggle_grid])
+        recargar_sprites = QAction("🔄 Recargar sprites", self)
+        recargar_sprites.setShortcut("F5")
+        recargar_sprites.triggered.connect(self.recargar_sprites)
+
+        metricas_action = QAction("📈 Métricas de render", self)
+        metricas_action.setShortcut("F3")
+        metricas_action.setCheckable(True)
+        metricas_action.toggled.connect(self.toggle_metricas)
+
+        view_menu.addActions([zoom_in, zoom_out, reset_zoom, toggle_grid, recargar_sprites, metricas_action])
 
         # Herramientas
         tools_menu.addAction("✏️ Lápiz (1)", lambda: self.cambiar_herramienta('lapiz'))
@@ -149,7 +176,10 @@ class MainWindow(QMainWindow):
         export_png_action.setShortcut("Ctrl+P")
         export_png_action.triggered.connect(self.action_export_png)
 
-        export_menu.addActions([export_game_action, export_png_action])
+        export_traza_action = QAction("📈 Exportar traza de render (JSON)", self)
+        export_traza_action.triggered.connect(self.action_export_traza)
+
+        export_menu.addActions([export_game_action, export_png_action, export_traza_action])
 
     # =========================================================
     # PALETA COMBINADA (IMÁGENES + COLORES)
@@ -171,7 +201,7 @@ class MainWindow(QMainWindow):
             item = QListWidgetItem(f"🖼️ {tipo}")
             item.setData(Qt.UserRole, tile)
             if tile.tiene_sprite():
-                icon = QIcon(QPixmap(tile.sprite).scaled(32, 32, Qt.KeepAspectRatio))
+                icon = QIcon(cache_pixmaps.obtener(tile.sprite, 32, Qt.FastTransformation))
                 item.setIcon(icon)
             self.palette_images.addItem(item)
 
@@ -210,7 +240,7 @@ class MainWindow(QMainWindow):
         self.map_view.establecer_tile_seleccionado(tile)
 
         if tile.tiene_sprite():
-            pixmap = QPixmap(tile.sprite).scaled(64, 64, Qt.KeepAspectRatio)
+            pixmap = cache_pixmaps.obtener(tile.sprite, 64, Qt.FastTransformation)
             self.preview_label.setPixmap(pixmap)
             self.preview_label.setStyleSheet("border: 1px solid gray; background: white;")
         else:
@@ -234,8 +264,14 @@ class MainWindow(QMainWindow):
         
         self.layers_list = QListWidget()
         self.layers_list.addItems(["👁️ Fondo", "👁️ Objetos", "👁️ Colisión"])
+        for i in range(self.layers_list.count()):
+            # La casilla muestra u oculta la capa en el canvas
+            item = self.layers_list.item(i)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
         self.layers_list.setCurrentRow(0)
         self.layers_list.itemClicked.connect(self._on_layer_changed)
+        self.layers_list.itemChanged.connect(self._on_layer_visibility_changed)
         
         layout.addWidget(self.layers_list)
         
@@ -247,20 +283,39 @@ class MainWindow(QMainWindow):
         widget.setLayout(layout)
         dock.setWidget(widget)
         self.addDockWidget(Qt.RightDockWidgetArea, dock)
+        
+        # Minimapa debajo de las capas: vista general y clic para ir
+        dock_minimapa = QDockWidget("Minimapa", self)
+        dock_minimapa.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        self.minimapa = Minimapa(self.map_view)
+        dock_minimapa.setWidget(self.minimapa)
+        self.addDockWidget(Qt.RightDockWidgetArea, dock_minimapa)
+        self.splitDockWidget(dock, dock_minimapa, Qt.Vertical)
     
     # ---- Resto de funciones (undo, redo, guardar, exportar, etc.) ----
     # son las mismas que en tu versión anterior y no se modifican
 
     
-    def _on_layer_changed(self, item):
+    @staticmethod
+    def _capa_del_item(item):
         texto = item.text().replace('👁️ ', '').lower()
         mapa_capas = {'fondo': 'fondo', 'objetos': 'objetos', 'colisión': 'colision'}
-        capa_real = mapa_capas.get(texto)
+        return mapa_capas.get(texto)
+
+    def _on_layer_changed(self, item):
+        capa_real = self._capa_del_item(item)
         
         if self.map_view.mapa and capa_real:
             self.map_view.mapa.cambiar_capa_activa(capa_real)
             self.status.showMessage(f"Capa activa: {capa_real}")
 
+    def _on_layer_visibility_changed(self, item):
+        capa_real = self._capa_del_item(item)
+        if capa_real:
+            visible = item.checkState() == Qt.Checked
+            self.map_view.establecer_visibilidad_capa(capa_real, visible)
+            self.status.showMessage(f"Capa {capa_real} {'visible' if visible else 'oculta'}")
+
     def _clear_layer(self):
         if not self.map_view.mapa:
             return
@@ -272,7 +327,6 @@ class MainWindow(QMainWindow):
         )
         if reply == QMessageBox.Yes:
             self.map_view.mapa.limpiar_capa(capa_actual)
-            self.map_view.dibujar_mapa()
             self.status.showMessage(f"✅ Capa '{capa_actual}' limpiada")
 
     # =========================================================
@@ -282,24 +336,36 @@ class MainWindow(QMainWindow):
         self.map_view.establecer_herramienta(herramienta)
         self.status.showMessage(f"Herramienta activa: {herramienta}")
 
+    def recargar_sprites(self):
+        self.map_view.recargar_sprites()
+        self.status.showMessage("🔄 Sprites recargados")
+
+    def toggle_metricas(self, activo):
+        self.map_view.mostrar_metricas = activo
+        self.status.showMessage(f"Métricas de render {'activadas' if activo else 'desactivadas'}")
+
     def toggle_grid(self):
         self.map_view.mostrar_cuadricula = not self.map_view.mostrar_cuadricula
-        self.map_view.dibujar_mapa()
+        self.map_view.actualizar_cuadricula()
         estado = "visible" if self.map_view.mostrar_cuadricula else "oculta"
         self.status.showMessage(f"Cuadrícula {estado}")
 
     def undo(self):
         if self.map_view.mapa and hasattr(self.map_view, 'gestor_undo_redo'):
-            exito, msg = self.map_view.gestor_undo_redo.deshacer(self.map_view.mapa)
-            if exito:
-                self.map_view.dibujar_mapa()
+            with self.map_view.metricas.medir('modelo'):
+                exito, msg = self.map_view.gestor_undo_redo.deshacer(self.map_view.mapa)
             self.status.showMessage(msg)
 
     def redo(self):
         if self.map_view.mapa and hasattr(self.map_view, 'gestor_undo_redo'):
-            exito, msg = self.map_view.gestor_undo_redo.rehacer(self.map_view.mapa)
-            if exito:
-                self.map_view.dibujar_mapa()
+            with self.map_view.metricas.medir('modelo'):
+                exito, msg = self.map_view.gestor_undo_redo.rehacer(self.map_view.mapa)
+            self.status.showMessage(msg)
+
+    def alternar_rama(self):
+        # Vuelve a la otra versión de lo último que se deshizo y rehízo distinto
+        if self.map_view.mapa:
+            exito, msg = self.map_view.gestor_undo_redo.alternar_rama(self.map_view.mapa)
             self.status.showMessage(msg)
 
     # =========================================================
@@ -311,6 +377,7 @@ class MainWindow(QMainWindow):
             w, h, tile = dialog.get_values()
             self.map_view.create_new_map(w, h, tile)
             self.archivo_actual = None
+            self._abrir_diario()
             self.status.showMessage(f"✅ Mapa nuevo {w}x{h}, tile={tile}px")
 
     def action_open(self):
@@ -322,8 +389,8 @@ class MainWindow(QMainWindow):
             exito, mapa, mensaje = self.gestor_archivos.cargar_mapa(nombre_archivo)
             if exito:
                 self.map_view.mapa = mapa
-                self.map_view.dibujar_mapa()
                 self.archivo_actual = nombre_archivo
+                self._abrir_diario()
                 self.status.showMessage(f"✅ Mapa cargado: {nombre_archivo}")
                 QMessageBox.information(self, "Éxito", mensaje)
             else:
@@ -340,6 +407,7 @@ class MainWindow(QMainWindow):
             return
         exito, mensaje = self.gestor_archivos.guardar_mapa(self.map_view.mapa, self.archivo_actual)
         if exito:
+            self._diario_guardado()
             self.status.showMessage(f"✅ Guardado: {self.archivo_actual}")
             QMessageBox.information(self, "Éxito", mensaje)
 
@@ -352,6 +420,7 @@ class MainWindow(QMainWindow):
             exito, mensaje = self.gestor_archivos.guardar_mapa(self.map_view.mapa, nombre)
             if exito:
                 self.archivo_actual = nombre
+                self._diario_guardado()
                 self.status.showMessage(f"✅ Guardado: {nombre}")
                 QMessageBox.information(self, "Éxito", mensaje)
 
@@ -376,3 +445,128 @@ class MainWindow(QMainWindow):
             if exito:
                 self.status.showMessage(f"✅ PNG exportado: {nombre}")
                 QMessageBox.information(self, "Éxito BONO", mensaje)
+
+    def action_export_traza(self):
+        if not self.map_view.metricas.cuadros:
+            QMessageBox.information(
+                self, "Traza de render",
+                "No hay cuadros medidos: activa Vista → Métricas de render (F3) y usa el editor un rato"
+            )
+            return
+        ruta, _ = QFileDialog.getSaveFileName(
+            self, "Exportar traza de render", "exports/traza_render.json", "JSON (*.json)"
+        )
+        if ruta:
+            try:
+                self.map_view.exportar_traza(ruta)
+                self.status.showMessage(f"✅ Traza exportada: {ruta}")
+            except OSError as e:
+                QMessageBox.warning(self, "Traza de render", f"No se pudo guardar la traza: {e}")
+
+    # =========================================================
+    # DIARIO DE CAMBIOS (recuperación)
+    # =========================================================
+    def _abrir_diario(self):
+        """Empieza un diario nuevo para el mapa actual (cierra el anterior)."""
+        self._cerrar_diario()
+        if not self.map_view.mapa:
+            return
+        # El historial del editor es un árbol (no se pierden las ramas)
+        self.map_view.mapa.undo_redo.usar_arbol(self.map_view.mapa)
+        try:
+            self.diario = abrir_diario(self.map_view.mapa, self._ruta_diario(), al_fallar=self.diario_fallo.emit)
+        except OSError as e:
+            self.diario = None
+            self.status.showMessage(f"⚠️ Sin diario de cambios: {e}")
+
+    def _ruta_diario(self):
+        nombre = self.archivo_actual or "sin_titulo"
+        return os.path.join(self.ruta_diarios, f"{nombre}.diario")
+
+    def _diario_guardado(self):
+        # Lo guardado no se ofrece recuperar; el diario sigue con el nombre del mapa
+        if self.diario:
+            self.diario.guardado(self._ruta_diario())
+
+    def _al_fallar_diario(self, error):
+        # Se puede seguir editando; solo se pierde la recuperación (y el undo
+        # más allá de lo que hay en memoria). La señal llega encolada: puede
+        # ser de un diario que ya se cerró
+        diario = self.diario
+        if diario is None or diario.error is not error:
+            return
+        self.diario = None
+        gestor = diario.mapa.undo_redo
+        if gestor.diario is diario:
+            gestor.diario = None
+        try:
+            diario.cerrar(borrar=True)
+        except OSError:
+            pass
+        self.status.showMessage(f"⚠️ Diario de cambios desactivado: {error}")
+
+    def _cerrar_diario(self):
+        # Al cambiar de mapa o salir normalmente el diario ya no hace falta
+        if self.diario:
+            self.diario.cerrar(borrar=True)
+            self.diario = None
+
+    def _recuperar_trabajo(self):
+        """Si quedó algún diario (el editor se cerró sin salir), ofrece recuperarlo."""
+        if not os.path.isdir(self.ruta_diarios):
+            return
+        for archivo in sorted(os.listdir(self.ruta_diarios)):
+            if not archivo.endswith(".diario"):
+                continue
+            ruta = os.path.join(self.ruta_diarios, archivo)
+            try:
+                pendiente = hay_cambios_sin_guardar(ruta)
+            except (OSError, ValueError):
+                # Que lo intente recuperar_mapa y avise qué pasa
+                pendiente = True
+            if not pendiente:
+                # Se cerró sin salir, pero después de guardar todo
+                os.remove(ruta)
+                continue
+            respuesta = QMessageBox.question(
+                self, "Recuperar trabajo",
+                f"Se encontraron cambios sin guardar ({archivo}). ¿Recuperarlos?"
+            )
+            if respuesta != QMessageBox.Yes:
+                os.remove(ruta)
+                continue
+            try:
+                mapa = recuperar_mapa(ruta, al_fallar=self.diario_fallo.emit)
+            except (OSError, ValueError) as e:
+                QMessageBox.critical(self, "Error", f"No se pudo recuperar: {e}")
+                continue
+            self._cerrar_diario()
+            self.map_view.mapa = mapa
+            self.diario = mapa.undo_redo.diario
+            mapa.undo_redo.usar_arbol(mapa)
+            nombre = archivo[:-len(".diario")]
+            self.archivo_actual = None if nombre == "sin_titulo" else nombre
+            self.status.showMessage(f"✅ Trabajo recuperado: {archivo}")
+            break
+
+    # Con la ventana oculta o minimizada no tiene sentido animar
+    def hideEvent(self, event):
+        self.map_view.reloj_animacion.pausar()
+        super().hideEvent(event)
+
+    def showEvent(self, event):
+        if not self.isMinimized():
+            self.map_view.reloj_animacion.reanudar()
+        super().showEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.map_view.reloj_animacion.pausar()
+            else:
+                self.map_view.reloj_animacion.reanudar()
+        super().changeEvent(event)
+
+    def closeEvent(self, event):
+        self._cerrar_diario()
+        super().closeEvent(event)
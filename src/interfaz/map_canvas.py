@@ -1,16 +1,40 @@
 
-from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QWidget
-from PyQt5.QtCore import Qt, QPoint, QRect
+import time
+
+from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QWidget, QLabel
+from PyQt5.QtCore import Qt, QPoint, QRect, QLineF, QTimer, pyqtSignal
 from PyQt5.QtGui import QPen, QPainter, QBrush, QColor, QPixmap
 
-from modelo.mapa import Mapa, Tile
+from modelo.mapa import Mapa, Tile, registro_tiles
 from modelo.objetos import Objeto
-from sistema.undo_redo import GestorUndoRedo, Accion
+from modelo.lineas import celdas_del_trazo
+from modelo.animacion import IndiceAnimados
+from sistema.metricas import MetricasRender
+from .cache_pixmaps import cache_pixmaps
+from modelo.recursos import registro_recursos
+from .render_chunks import RenderChunks
+from .mascara_colision import MascaraColision
+from .animacion import RelojAnimacion
 
 
 class MapView(QGraphicsView):
     #Vista del canvas con undo/redo integrado
     
+    # Se cambió el mapa mostrado (el nuevo Mapa o None)
+    mapa_cambiado = pyqtSignal(object)
+    # Cambió lo que se ve: desplazamiento, zoom o tamaño de la ventana
+    vista_cambiada = pyqtSignal()
+    
+    # Capas de tiles que se dibujan, de abajo hacia arriba (compuestas en chunks);
+    # la colisión y la cuadrícula se pintan encima, en drawForeground
+    CAPAS_DIBUJADAS = ('fondo', 'objetos')
+    # Con tiles más chicos que esto en pantalla la cuadrícula no se dibuja
+    MIN_PX_CUADRICULA = 4
+    # Herramientas que pintan mientras se arrastra
+    HERRAMIENTAS_TRAZO = ('lapiz', 'borrador', 'colision')
+    # Los movimientos del mouse se aplican a lo sumo una vez por cuadro (~60 fps)
+    INTERVALO_TRAZO_MS = 16
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self._scene = QGraphicsScene(self)
@@ -23,146 +47,310 @@ class MapView(QGraphicsView):
         self._zoom = 0
         self._zoom_step = 1.15
         self._max_zoom = 10
-        self._min_zoom = -10
+        # Con los niveles de detalle se puede alejar hasta ~1 píxel por tile
+        self._min_zoom = -25
 
         # Mapa y herramientas
-        self.mapa = None
+        self._mapa = None
         self.tile_seleccionado = None
         self.herramienta_activa = 'lapiz'
         self.dibujando = False
         
+        # Trazo en curso: posiciones del mouse que faltan aplicar y la última aplicada
+        self._puntos_pendientes = []
+        self._ultima_celda = None
+        self._valor_colision = None
+        self._timer_trazo = QTimer(self)
+        self._timer_trazo.setSingleShot(True)
+        self._timer_trazo.setInterval(self.INTERVALO_TRAZO_MS)
+        self._timer_trazo.timeout.connect(self._aplicar_trazo_pendiente)
+        
         # Cuadrícula
         self.mostrar_cuadricula = True
         self.grosor_cuadricula = 1
         
-        # UNDO/REDO
-        self.gestor_undo_redo = GestorUndoRedo()
-
-    def create_new_map(self, width_tiles, height_tiles, tile_size):
-        self.mapa = Mapa(width_tiles, height_tiles, tile_size)
-        
-        w = width_tiles * tile_size
-        h = height_tiles * tile_size
-        self._scene.clear()
-        self._scene.setSceneRect(0, 0, w, h)
-        
-        self.gestor_undo_redo.limpiar()
+        # Chunks horneados del mapa (se pintan en drawBackground)
+        self._render = None
+        # Máscara de colisión (se pinta en drawForeground)
+        self._mascara = None
+        # Tiles animados: dónde están y el reloj común que los hace avanzar
+        self._animados = None
+        self.reloj_animacion = RelojAnimacion(self)
+        self.reloj_animacion.avanzo.connect(self._al_avanzar_animacion)
         
+        # Métricas de dibujo (inactivas hasta mostrar_metricas) y su overlay
+        self.metricas = MetricasRender()
+        # Ítems de la escena para las métricas: solo cambian al rearmar el
+        # dibujo, así que se cuentan una vez (None: hay que volver a contar)
+        self._items_escena = None
+        self._overlay = QLabel(self.viewport())
+        self._overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self._overlay.setStyleSheet(
+            "background: rgba(0, 0, 0, 160); color: #B0FFB0; padding: 4px; font-family: monospace;"
+        )
+        self._overlay.move(6, 6)
+        self._overlay.hide()
+        self._timer_overlay = QTimer(self)
+        self._timer_overlay.setInterval(250)
+        self._timer_overlay.timeout.connect(self._actualizar_overlay)
+        self._capas_ocultas = set()
+    
+    @property
+    def mapa(self):
+        return self._mapa
+    
+    @mapa.setter
+    def mapa(self, mapa):
+        # La vista se entera de cada cambio del mapa y re-hornea solo esos chunks
+        if self._mapa is not None:
+            self._mapa.quitar_oyente(self._al_cambiar_celdas)
+        self._mapa = mapa
+        if mapa is not None:
+            mapa.agregar_oyente(self._al_cambiar_celdas)
+            self._scene.setSceneRect(0, 0, mapa.ancho * mapa.tamano_tile, mapa.alto * mapa.tamano_tile)
         self.dibujar_mapa()
+        self.mapa_cambiado.emit(mapa)
+    
+    @property
+    def gestor_undo_redo(self):
+        # Un solo historial: el del mapa (antes la vista tenía otro y cada edición se registraba dos veces)
+        return self.mapa.undo_redo if self.mapa else None
+
+    def create_new_map(self, width_tiles, height_tiles, tile_size):
+        disperso = width_tiles * height_tiles > Mapa.CELDAS_MAX_DENSO
+        self.mapa = Mapa(width_tiles, height_tiles, tile_size, disperso)
     
     def dibujar_mapa(self):
-        #Dibuja el mapa completo.
+        #Prepara el dibujo del mapa (al cargarlo); se pinta solo lo visible y las ediciones re-hornean solo sus chunks.
+        with self.metricas.medir('reconstruccion'):
+            self._dibujar_mapa()
+    
+    def _dibujar_mapa(self):
+        self._scene.clear()
+        self._items_escena = None
+        self._render = None
+        self._mascara = None
+        self._animados = None
         if not self.mapa:
+            self.reloj_animacion.establecer_hay_animados(False)
             return
         
-        self._scene.clear()
-        
-        for nombre_capa in ['fondo', 'objetos']:
-            for y in range(self.mapa.alto):
-                for x in range(self.mapa.ancho):
-                    tile = self.mapa.obtener_tile(x, y, nombre_capa)
-                    
-                    if tile is None:
-                        continue
-                    
-                    px = x * self.mapa.tamano_tile
-                    py = y * self.mapa.tamano_tile
-                    size = self.mapa.tamano_tile
-                    
-                    if tile.tiene_sprite():
-                        pixmap = QPixmap(tile.sprite)
-                        pixmap = pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        item = QGraphicsPixmapItem(pixmap)
-                        item.setPos(px, py)
-                        self._scene.addItem(item)
-                    else:
-                        color = QColor(tile.color)
-                        self._scene.addRect(
-                            px, py, size, size,
-                            QPen(QColor(200, 200, 200)),
-                            QBrush(color)
-                        )
-        
-        # Dibujar capa de colisión (con transparencia)
-        for y in range(self.mapa.alto):
-            for x in range(self.mapa.ancho):
-                if self.mapa.capas['colision'][y][x]:
-                    px = x * self.mapa.tamano_tile
-                    py = y * self.mapa.tamano_tile
-                    size = self.mapa.tamano_tile
-                    
-                    # Color rojo semi-transparente para colisiones
-                    color = QColor(255, 0, 0, 100)
-                    self._scene.addRect(
-                        px, py, size, size,
-                        QPen(QColor(255, 0, 0)),
-                        QBrush(color)
-                    )
-        
-        # Dibujar cuadrícula
-        if self.mostrar_cuadricula:
-            self._dibujar_cuadricula()
+        # Los chunks se componen recién cuando entran en la ventana
+        self._render = RenderChunks(self._scene, self.mapa, self.CAPAS_DIBUJADAS)
+        self._render.metricas = self.metricas
+        self._mascara = MascaraColision(self._scene, self.mapa)
+        self._animados = IndiceAnimados(self.mapa, self.CAPAS_DIBUJADAS, self._render.tamano_chunk)
+        self._render.animados = self._animados
+        self._render.reloj = self.reloj_animacion
+        self.reloj_animacion.establecer_paleta(self.mapa.paleta)
+        self.reloj_animacion.establecer_hay_animados(len(self._animados))
+        for capa in self._capas_ocultas:
+            self._establecer_visibilidad(capa, False)
+        self._scene.update()
     
-    def _dibujar_cuadricula(self):
-        if not self.mapa:
+    def paintEvent(self, event):
+        if not self.metricas.activo:
+            super().paintEvent(event)
             return
-        
-        w = self.mapa.ancho * self.mapa.tamano_tile
-        h = self.mapa.alto * self.mapa.tamano_tile
+        inicio = time.perf_counter()
+        super().paintEvent(event)
+        fin = time.perf_counter()
+        region = sum(r.width() * r.height() for r in event.region().rects())
+        if self._items_escena is None:
+            self._items_escena = len(self._scene.items())
+        self.metricas.fin_cuadro(
+            inicio, fin, region, self._items_escena,
+            cache_pixmaps.obtener_estadisticas()['tasa_aciertos']
+        )
+    
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    @property
+    def mostrar_metricas(self):
+        return self.metricas.activo
+    
+    @mostrar_metricas.setter
+    def mostrar_metricas(self, activo):
+        """Activa las métricas y el overlay que las muestra (desactivar no borra lo medido)."""
+        self.metricas.activo = activo
+        self._overlay.setVisible(activo)
+        if activo:
+            self._actualizar_overlay()
+            self._timer_overlay.start()
+            self.viewport().update()
+        else:
+            self._timer_overlay.stop()
+    
+    def _actualizar_overlay(self):
+        self._overlay.setText("\n".join(self.metricas.lineas_overlay()))
+        self._overlay.adjustSize()
+    
+    def obtener_metricas(self):
+        """Percentiles de los últimos cuadros (ver MetricasRender.resumen)."""
+        return self.metricas.resumen()
+    
+    def exportar_traza(self, ruta):
+        """Guarda lo medido como traza JSON (formato de eventos de Chrome)."""
+        self.metricas.exportar_json(ruta)
+    
+    def drawBackground(self, painter, rect):
+        # Solo los chunks que cortan lo expuesto; el resto del mapa no cuesta nada
+        super().drawBackground(painter, rect)
+        if self._render is not None:
+            # Lejos se usan los niveles reducidos de los chunks
+            escala = self.transform().m11()
+            self._render.pintar(painter, rect, escala)
+            self._render.preparar_margen(self.rect_visible(), escala=escala)
+    
+    def drawForeground(self, painter, rect):
+        # Colisión y cuadrícula: solo el rango visible, sin ítems en la escena
+        super().drawForeground(painter, rect)
+        if self._mascara is not None:
+            self._mascara.pintar(painter, rect)
+        if self.mostrar_cuadricula and self.mapa:
+            self._dibujar_cuadricula(painter, rect)
+    
+    def rect_visible(self):
+        """Rectángulo de la escena que se ve en la ventana."""
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+    
+    def _al_cambiar_celdas(self, capa, indices):
+        """Oyente del mapa: invalida los chunks (o la máscara) de las celdas cambiadas."""
+        if capa == 'colision':
+            if self._mascara is not None:
+                self._mascara.actualizar_celdas(indices)
+        elif self._render is not None:
+            # Primero el índice de animados: el re-horneado lo consulta
+            self._animados.actualizar(capa, indices)
+            self.reloj_animacion.establecer_hay_animados(len(self._animados))
+            self._render.invalidar_celdas(capa, indices)
+    
+    def _al_avanzar_animacion(self, cambiados):
+        """Reloj de animación: repinta solo las celdas visibles que cambiaron de frame."""
+        if self._render is not None:
+            self._render.repintar_animados(self.rect_visible(), cambiados)
+    
+    def establecer_visibilidad_capa(self, capa, visible):
+        """Muestra u oculta una capa (re-hornea los chunks con las capas visibles)."""
+        if visible:
+            self._capas_ocultas.discard(capa)
+        else:
+            self._capas_ocultas.add(capa)
+        if self.mapa:
+            self._establecer_visibilidad(capa, visible)
+    
+    def _establecer_visibilidad(self, capa, visible):
+        if capa == 'colision':
+            self._mascara.establecer_visibilidad(visible)
+        else:
+            self._render.establecer_visibilidad(capa, visible)
+    
+    def recargar_sprites(self):
+        """Vuelve a mirar los sprites en disco y re-hornea todos los chunks."""
+        # Con el mtime nuevo la caché de pixmaps ya no usa las versiones viejas
+        registro_recursos.reescanear()
+        if self._render is not None:
+            self._render.invalidar()
+    
+    def _dibujar_cuadricula(self, painter, rect):
         size = self.mapa.tamano_tile
+        if size * self.transform().m11() < self.MIN_PX_CUADRICULA:
+            return
+        
+        w = self.mapa.ancho * size
+        h = self.mapa.alto * size
+        # Solo las líneas que caen dentro de rect
+        x0 = max(0, int(rect.left() // size))
+        x1 = min(self.mapa.ancho, int(rect.right() // size) + 1)
+        y0 = max(0, int(rect.top() // size))
+        y1 = min(self.mapa.alto, int(rect.bottom() // size) + 1)
+        top, bottom = max(0, rect.top()), min(h, rect.bottom())
+        left, right = max(0, rect.left()), min(w, rect.right())
+        
+        lineas = [QLineF(x * size, top, x * size, bottom) for x in range(x0, x1 + 1)]
+        lineas += [QLineF(left, y * size, right, y * size) for y in range(y0, y1 + 1)]
         
         # Cuadrícula más sutil
         pen = QPen(QColor(180, 180, 180, 80))
         pen.setWidth(self.grosor_cuadricula)
-        
-        for x in range(0, w + 1, size):
-            self._scene.addLine(x, 0, x, h, pen)
-        
-        for y in range(0, h + 1, size):
-            self._scene.addLine(0, y, w, y, pen)
+        painter.save()
+        painter.setPen(pen)
+        painter.drawLines(lineas)
+        painter.restore()
+    
+    def actualizar_cuadricula(self):
+        """Muestra u oculta la cuadrícula según mostrar_cuadricula (solo repinta, no rearma el mapa)."""
+        self._scene.update()
     
     def establecer_tile_seleccionado(self, tile):
-        self.tile_seleccionado = tile
+        # Se interna una sola vez; luego cada celda pintada solo guarda su índice
+        self.tile_seleccionado = registro_tiles.internar(tile) if tile else None
     
     def establecer_herramienta(self, herramienta):
         self.herramienta_activa = herramienta
     
     
+    def _celda_del_evento(self, event):
+        scene_pos = self.mapToScene(event.pos())
+        return int(scene_pos.x()) // self.mapa.tamano_tile, int(scene_pos.y()) // self.mapa.tamano_tile
+    
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton and self.mapa:
-            scene_pos = self.mapToScene(event.pos())
-            x = int(scene_pos.x())
-            y = int(scene_pos.y())
-            
-            grid_x = x // self.mapa.tamano_tile
-            grid_y = y // self.mapa.tamano_tile
+            grid_x, grid_y = self._celda_del_evento(event)
             
             self.dibujando = True
-            self._aplicar_herramienta(grid_x, grid_y)
+            # Todo lo que se pinte hasta soltar el mouse es una sola acción de undo
+            self.mapa.undo_redo.iniciar_trazo()
+            if self.herramienta_activa in self.HERRAMIENTAS_TRAZO:
+                self._ultima_celda = None
+                self._valor_colision = None
+                self._puntos_pendientes = [(grid_x, grid_y)]
+                self._aplicar_trazo_pendiente()
+            else:
+                self._aplicar_herramienta(grid_x, grid_y)
         else:
             super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event):
-        if self.dibujando and self.mapa and self.herramienta_activa in ['lapiz', 'borrador', 'colision']:
-            scene_pos = self.mapToScene(event.pos())
-            x = int(scene_pos.x())
-            y = int(scene_pos.y())
-            
-            grid_x = x // self.mapa.tamano_tile
-            grid_y = y // self.mapa.tamano_tile
-            
-            self._aplicar_herramienta(grid_x, grid_y)
+        if self.dibujando and self.mapa and self.herramienta_activa in self.HERRAMIENTAS_TRAZO:
+            # Se junta y se aplica una vez por cuadro (ver _aplicar_trazo_pendiente)
+            celda = self._celda_del_evento(event)
+            pendientes = self._puntos_pendientes
+            ultima = pendientes[-1] if pendientes else self._ultima_celda
+            if celda != ultima:
+                pendientes.append(celda)
+                if not self._timer_trazo.isActive():
+                    self._timer_trazo.start()
         else:
             super().mouseMoveEvent(event)
     
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.dibujando = False
+            if self.mapa:
+                self._timer_trazo.stop()
+                self._aplicar_trazo_pendiente()
+                self.mapa.undo_redo.confirmar_trazo()
         super().mouseReleaseEvent(event)
     
-    def _aplicar_herramienta(self, grid_x, grid_y):
-        """Aplica herramienta CON registro de undo."""
-        if not self.mapa._validar_coordenadas(grid_x, grid_y):
+    def _aplicar_trazo_pendiente(self):
+        """
+        Aplica las posiciones del mouse juntadas desde el último cuadro: se
+        completan los segmentos entre ellas (Bresenham) y se escriben todas
+        las celdas en una sola operación del modelo, que avisa una vez.
+        """
+        puntos, self._puntos_pendientes = self._puntos_pendientes, []
+        if not puntos or not self.mapa:
+            return
+        with self.metricas.medir('modelo'):
+            self._aplicar_trazo(puntos)
+    
+    def _aplicar_trazo(self, puntos):
+        celdas = celdas_del_trazo(puntos, self._ultima_celda)
+        self._ultima_celda = puntos[-1]
+        celdas = [(x, y) for x, y in celdas if self.mapa._validar_coordenadas(x, y)]
+        if not celdas:
             return
         
         try:
@@ -170,50 +358,41 @@ class MapView(QGraphicsView):
             
             if self.herramienta_activa == 'lapiz':
                 if self.tile_seleccionado:
-                    # GUARDAR ESTADO ANTERIOR
-                    tile_anterior = self.mapa.obtener_tile(grid_x, grid_y, capa)
-                    
-                    # Colocar tile
-                    tile_nuevo = self.tile_seleccionado.clonar()
-                    self.mapa.colocar_tile(grid_x, grid_y, tile_nuevo, capa)
-                    
-                    # REGISTRAR PARA UNDO
-                    accion = Accion('colocar_tile', (grid_x, grid_y, capa, tile_anterior))
-                    self.gestor_undo_redo.registrar_accion(accion)
-                    
-                    self.dibujar_mapa()
+                    tile = self.tile_seleccionado
+                    self.mapa.colocar_lote(((x, y, tile) for x, y in celdas), capa)
             
             elif self.herramienta_activa == 'borrador':
-                tile_anterior = self.mapa.obtener_tile(grid_x, grid_y, capa)
-                
-                self.mapa.colocar_tile(grid_x, grid_y, None, capa)
-                
-                accion = Accion('colocar_tile', (grid_x, grid_y, capa, tile_anterior))
-                self.gestor_undo_redo.registrar_accion(accion)
-                
-                self.dibujar_mapa()
+                self.mapa.colocar_lote(((x, y, None) for x, y in celdas), capa)
             
-            elif self.herramienta_activa == 'relleno':
+            elif self.herramienta_activa == 'colision':
+                # La primera celda se alterna y el resto del trazo queda igual que ella
+                if self._valor_colision is None:
+                    x, y = celdas[0]
+                    self._valor_colision = not self.mapa.colisiones.obtener(x, y)
+                valor = self._valor_colision
+                self.mapa.colocar_lote(((x, y, valor) for x, y in celdas), 'colision')
+        
+        except (ValueError, IndexError):
+            pass
+    
+    def _aplicar_herramienta(self, grid_x, grid_y):
+        """Aplica una herramienta de un solo clic; los cambios quedan en el trazo abierto del mapa."""
+        if not self.mapa._validar_coordenadas(grid_x, grid_y):
+            return
+        
+        try:
+            if self.herramienta_activa == 'relleno':
                 if self.mapa.capa_activa == 'colision':
                     return
                 if self.tile_seleccionado:
-                    self._flood_fill(grid_x, grid_y)
-
-            
-            elif self.herramienta_activa == 'colision':
-                estado_anterior = self.mapa.capas['colision'][grid_y][grid_x]
-                self.mapa.capas['colision'][grid_y][grid_x] = not estado_anterior
-                
-                accion = Accion('toggle_colision', (grid_x, grid_y, estado_anterior))
-                self.gestor_undo_redo.registrar_accion(accion)
-                
-                self.dibujar_mapa()
+                    with self.metricas.medir('modelo'):
+                        self._flood_fill(grid_x, grid_y)
         
         except (ValueError, IndexError):
             pass
     
     def _flood_fill(self, start_x, start_y):
-        """Algoritmo de relleno (flood fill)."""
+        """Relleno (flood fill) con el motor por tramos de Mapa.rellenar."""
         if not self.tile_seleccionado or not self.mapa:
             return
         # Evitar flood fill si la capa es de colisión o no guarda Tiles
@@ -223,52 +402,9 @@ class MapView(QGraphicsView):
         
         capa = self.mapa.capa_activa
         
-        tile_original = self.mapa.obtener_tile(start_x, start_y, capa)
-        tipo_original = tile_original.tipo if tile_original else None
-        
-        if tile_original and tile_original.tipo == self.tile_seleccionado.tipo:
-            return
-        
-        pila = [(start_x, start_y)]
-        visitados = set()
-        tiles_modificados = []
-        
-        while pila:
-            x, y = pila.pop()
-            
-            if (x, y) in visitados:
-                continue
-            
-            if not self.mapa._validar_coordenadas(x, y):
-                continue
-            
-            tile_actual = self.mapa.obtener_tile(x, y, capa)
-            tipo_actual = tile_actual.tipo if tile_actual else None
-            
-            if tipo_actual != tipo_original:
-                continue
-            
-            visitados.add((x, y))
-            
-            # Guardar estado anterior
-            tiles_modificados.append((x, y, tile_actual))
-            
-            # Colocar nuevo tile
-            tile_nuevo = self.tile_seleccionado.clonar()
-            self.mapa.colocar_tile(x, y, tile_nuevo, capa)
-            
-            pila.extend([
-                (x + 1, y),
-                (x - 1, y),
-                (x, y + 1),
-                (x, y - 1)
-            ])
-        
-        if tiles_modificados:
-            accion = Accion('flood_fill', tiles_modificados)
-            self.gestor_undo_redo.registrar_accion(accion)
-        
-        self.dibujar_mapa()
+        # El relleno lo hace el modelo y queda dentro del trazo abierto
+        # (la vista se entera por el aviso de cambio del mapa)
+        self.mapa.rellenar(start_x, start_y, self.tile_seleccionado, capa)
     
     
     def wheelEvent(self, event):
@@ -285,11 +421,21 @@ class MapView(QGraphicsView):
         if self._zoom < self._max_zoom:
             self.scale(self._zoom_step, self._zoom_step)
             self._zoom += 1
+            self.vista_cambiada.emit()
 
     def zoom_out(self):
         if self._zoom > self._min_zoom:
             self.scale(1 / self._zoom_step, 1 / self._zoom_step)
             self._zoom -= 1
+            self.vista_cambiada.emit()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.vista_cambiada.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.vista_cambiada.emit()
 
     def reset_zoom(self):
         while self._zoom > 0:
@@ -0,0 +1,85 @@
+"""
+Capa de colisión dibujada como una máscara.
+
+En vez de un rectángulo de la escena por celda bloqueada, la colisión es
+una sola QImage de 1 bit por celda (ancho x alto píxeles). El bitmap de
+CapaColision ya tiene el mismo formato que QImage.Format_MonoLSB (filas de
+bytes, bit menos significativo primero), así que armarla es copiar el
+volcado. Las ediciones cambian solo los píxeles de sus celdas.
+
+La vista la pinta en drawForeground: se recorta la parte visible de la
+máscara y se escala al tamaño de los tiles.
+"""
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QImage, QPainter, qRgba
+
+
+class MascaraColision:
+    """Máscara de 1 bit de la capa de colisión de un mapa."""
+
+    # Rojo semi-transparente, como se dibujaban las colisiones
+    COLOR = qRgba(255, 0, 0, 100)
+    # Con más celdas avisadas que esto se vuelve a copiar la capa entera
+    MAX_CELDAS_INCREMENTAL = 20000
+
+    def __init__(self, escena, mapa):
+        self.escena = escena
+        self.mapa = mapa
+        self.visible = True
+        self.imagen = None
+        self.reconstruir()
+
+    def reconstruir(self):
+        """Vuelve a armar la máscara desde la capa de colisión."""
+        capa = self.mapa.colisiones
+        datos = capa.volcar()
+        # copy(): la QImage pasa a tener sus propios datos
+        self.imagen = QImage(datos, capa.ancho, capa.alto, capa.bytes_por_fila,
+                             QImage.Format_MonoLSB).copy()
+        self.imagen.setColorTable([qRgba(0, 0, 0, 0), self.COLOR])
+        self.escena.update()
+
+    def actualizar_celdas(self, indices):
+        """Oyente del mapa (capa 'colision'): copia esas celdas a la máscara."""
+        if indices is None or len(indices) > self.MAX_CELDAS_INCREMENTAL:
+            self.reconstruir()
+            return
+        if not len(indices):
+            return
+        capa = self.mapa.colisiones
+        ancho = self.mapa.ancho
+        x0 = y0 = None
+        for i in indices:
+            x, y = i % ancho, i // ancho
+            self.imagen.setPixel(x, y, capa.obtener(x, y))
+            if x0 is None:
+                x0, x1, y0, y1 = x, x, y, y
+            else:
+                x0, x1 = min(x0, x), max(x1, x)
+                y0, y1 = min(y0, y), max(y1, y)
+        t = self.mapa.tamano_tile
+        self.escena.update(QRectF(x0 * t, y0 * t, (x1 - x0 + 1) * t, (y1 - y0 + 1) * t))
+
+    def establecer_visibilidad(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            self.escena.update()
+
+    def pintar(self, painter, rect):
+        """Dibuja la parte de la máscara que corta rect (coordenadas de la escena)."""
+        if not self.visible:
+            return
+        t = self.mapa.tamano_tile
+        x0 = max(0, int(rect.left() // t))
+        y0 = max(0, int(rect.top() // t))
+        x1 = min(self.mapa.ancho, int(rect.right() // t) + 1)
+        y1 = min(self.mapa.alto, int(rect.bottom() // t) + 1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        visible = self.imagen.copy(x0, y0, x1 - x0, y1 - y0)
+        painter.save()
+        # Cada píxel es un tile: sin suavizar para que queden bordes netos
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+        painter.drawImage(QRectF(x0 * t, y0 * t, (x1 - x0) * t, (y1 - y0) * t), visible)
+        painter.restore()
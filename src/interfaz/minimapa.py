@@ -0,0 +1,175 @@
+"""
+Minimapa: vista general del mapa, reducida al tamaño del dock.
+
+La imagen tiene a lo sumo LADO_MAX píxeles de lado: en un mapa más grande
+cada píxel muestra el tile de una celda de muestra cada `paso` tiles (la
+de arriba a la izquierda de su bloque). Se arma una vez al cambiar de
+mapa (una fila de muestra por vez, con el color de cada entrada de la
+paleta) y después se mantiene con los avisos de cambio del mapa: una
+edición cambia solo los píxeles de sus celdas de muestra.
+Encima se dibuja el rectángulo de lo que se ve en el canvas; un clic (o
+arrastrar) en el minimapa centra el canvas en ese punto.
+"""
+
+from array import array
+
+from PyQt5.QtCore import QPointF, QRectF, QSize, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+from modelo.capas import VACIO
+
+
+class Minimapa(QWidget):
+    """Miniatura del mapa de una MapView, con el rectángulo visible."""
+
+    # Capas que se ven en el minimapa, de abajo hacia arriba
+    CAPAS = ('fondo', 'objetos')
+    COLOR_VACIO = 0xFFF0F0F0
+    # Lado máximo de la imagen (el dock no suele pasar de esto)
+    LADO_MAX = 512
+    # Con más celdas avisadas que esto se vuelve a armar la imagen
+    MAX_CELDAS_INCREMENTAL = 20000
+
+    def __init__(self, map_view, parent=None):
+        super().__init__(parent)
+        self.map_view = map_view
+        self.mapa = None
+        self.imagen = None
+        # Tiles por píxel de la imagen
+        self.paso = 1
+        # Índice de la paleta -> color RGB del tile
+        self._colores = {}
+
+        self.setMinimumSize(120, 120)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setCursor(Qt.CrossCursor)
+
+        map_view.mapa_cambiado.connect(self.establecer_mapa)
+        map_view.vista_cambiada.connect(self.update)
+        self.establecer_mapa(map_view.mapa)
+
+    def sizeHint(self):
+        return QSize(220, 220)
+
+    # ------------------------------------------------------------------
+    # Imagen
+    # ------------------------------------------------------------------
+    def establecer_mapa(self, mapa):
+        if self.mapa is not None:
+            self.mapa.quitar_oyente(self._al_cambiar_celdas)
+        self.mapa = mapa
+        self._colores = {}
+        if mapa is not None:
+            mapa.agregar_oyente(self._al_cambiar_celdas)
+        self.reconstruir()
+
+    def _color(self, valor):
+        color = self._colores.get(valor)
+        if color is None:
+            color = self._colores[valor] = QColor(self.mapa.paleta.obtener_tile(valor).color).rgb()
+        return color
+
+    def reconstruir(self):
+        """Arma la imagen entera desde las celdas de muestra del mapa."""
+        if self.mapa is None:
+            self.imagen = None
+            self.update()
+            return
+        mapa = self.mapa
+        paso = self.paso = max(1, -(-max(mapa.ancho, mapa.alto) // self.LADO_MAX))
+        ancho = -(-mapa.ancho // paso)
+        alto = -(-mapa.alto // paso)
+        # Color por índice de la paleta (el 0 es vacío) para convertir filas enteras con map()
+        tabla = [self.COLOR_VACIO] + [self._color(valor) for valor, _ in mapa.paleta]
+        vacia = array('I', [self.COLOR_VACIO]) * ancho
+        pixeles = array('I')
+        for y in range(0, mapa.alto, paso):
+            fila = None
+            for nombre in self.CAPAS:
+                valores = mapa.capas[nombre].fila(y)[::paso]
+                if valores.count(VACIO) == ancho:
+                    continue
+                colores = map(tabla.__getitem__, valores)
+                if fila is None:
+                    fila = array('I', colores)
+                else:
+                    # La capa de arriba tapa a la de abajo donde no está vacía
+                    fila = array('I', [c if v else f for f, v, c in zip(fila, valores, colores)])
+            pixeles.extend(fila if fila is not None else vacia)
+        # copy(): la QImage pasa a tener sus propios datos
+        self.imagen = QImage(pixeles.tobytes(), ancho, alto, 4 * ancho, QImage.Format_RGB32).copy()
+        self.update()
+
+    def _al_cambiar_celdas(self, capa, indices):
+        """Oyente del mapa: repinta solo los píxeles de las celdas de muestra cambiadas."""
+        if capa not in self.CAPAS or self.imagen is None:
+            return
+        if indices is None or len(indices) > self.MAX_CELDAS_INCREMENTAL:
+            self.reconstruir()
+            return
+        mapa = self.mapa
+        ancho, paso = mapa.ancho, self.paso
+        for indice in indices:
+            x, y = indice % ancho, indice // ancho
+            if x % paso or y % paso:
+                continue
+            color = self.COLOR_VACIO
+            # Se ve la capa de más arriba que tenga algo
+            for nombre in reversed(self.CAPAS):
+                valor = mapa.capas[nombre].obtener(x, y)
+                if valor != VACIO:
+                    color = self._color(valor)
+                    break
+            self.imagen.setPixel(x // paso, y // paso, color)
+        self.update()
+
+    # ------------------------------------------------------------------
+    # Dibujo y navegación
+    # ------------------------------------------------------------------
+    def _rect_destino(self):
+        """Rectángulo del widget donde se dibuja el mapa (manteniendo la proporción)."""
+        escala = min(self.width() / self.mapa.ancho, self.height() / self.mapa.alto)
+        ancho, alto = self.mapa.ancho * escala, self.mapa.alto * escala
+        return QRectF((self.width() - ancho) / 2, (self.height() - alto) / 2, ancho, alto), escala
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(60, 60, 60))
+        if self.imagen is None:
+            return
+        destino, escala = self._rect_destino()
+        # Sin suavizar: cada píxel es un bloque de color. La última columna
+        # y fila de la imagen pueden cubrir menos de paso tiles
+        paso = self.paso
+        painter.drawImage(destino, self.imagen, QRectF(0, 0, self.mapa.ancho / paso, self.mapa.alto / paso))
+
+        # Lo que se ve en el canvas (en tiles)
+        visible = self.map_view.rect_visible()
+        t = self.mapa.tamano_tile
+        rect = QRectF(
+            destino.x() + visible.x() / t * escala,
+            destino.y() + visible.y() / t * escala,
+            visible.width() / t * escala,
+            visible.height() / t * escala
+        ).intersected(destino)
+        painter.setPen(QPen(QColor(255, 60, 60), 2))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(rect)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._centrar_en(event.pos())
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton:
+            self._centrar_en(event.pos())
+
+    def _centrar_en(self, pos):
+        if self.mapa is None:
+            return
+        destino, escala = self._rect_destino()
+        t = self.mapa.tamano_tile
+        x = (pos.x() - destino.x()) / escala * t
+        y = (pos.y() - destino.y()) / escala * t
+        self.map_view.centerOn(QPointF(x, y))
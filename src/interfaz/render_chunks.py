@@ -0,0 +1,358 @@
+"""
+Dibujo del mapa por chunks "horneados".
+
+El mapa se divide en chunks de TAMANO_CHUNK x TAMANO_CHUNK tiles. No hay
+ítems en la escena: la vista llama a pintar() desde drawBackground con el
+rectángulo expuesto y solo se tocan los chunks que lo cortan (y con
+preparar_margen() se componen MARGEN_CHUNKS más alrededor de lo visible),
+así que el costo de un cuadro depende del tamaño de la ventana y no del
+mapa.
+
+La primera vez que se necesita un chunk se compone una imagen con todas
+las capas de tiles visibles (fondo y objetos, en ese orden) y se guarda.
+Solo se vuelve a componer cuando algo lo invalida: una edición en sus
+celdas, un cambio de visibilidad de una capa o la recarga de los sprites.
+
+Lejos (zoom < 1) no conviene que Qt achique en cada cuadro las imágenes a
+resolución completa: cada chunk tiene una pirámide de niveles de detalle.
+En el nivel n cada tile ocupa tamano_tile / 2^n píxeles (los sprites se
+toman ya reducidos de la caché de pixmaps) y el último nivel es un píxel
+por tile, con el color promedio del sprite. La vista pide el nivel que
+corresponde a su escala y una edición invalida todos los niveles del
+chunk que la contiene.
+
+Los tiles animados no se hornean en el nivel 0: se pintan encima en cada
+cuadro con el frame del reloj de animación, recorriendo solo las celdas
+animadas de los chunks visibles (IndiceAnimados).
+
+Las imágenes compuestas ocupan (16 * tamaño de tile)^2 * 4 bytes cada una,
+así que se guardan en una LRU con límite de memoria: un chunk que salió
+de la LRU se vuelve a componer cuando se lo vuelve a ver. Cada entrada
+cuenta además un costo fijo, para que los chunks vacíos (sin imagen)
+también salgan de la LRU.
+"""
+
+import math
+import time
+from array import array
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QBrush, QColor, QImage, QPainter, QPen, QPixmap
+
+from modelo.capas import VACIO
+from .cache_pixmaps import cache_pixmaps
+
+
+TAMANO_CHUNK = 16
+# Chunks de más alrededor de lo visible que se componen por adelantado
+MARGEN_CHUNKS = 1
+
+
+class RenderChunks:
+    """Chunks compuestos de un mapa (caché LRU) y su pintado por rectángulo."""
+
+    MEMORIA_MB = 256
+    # Lo que cuesta cada entrada de la LRU aparte de la imagen (clave, nodo
+    # del OrderedDict): así también se desalojan los chunks vacíos (None)
+    BYTES_ENTRADA = 256
+    # Con más celdas avisadas que esto se invalidan todos los chunks
+    MAX_CELDAS_INCREMENTAL = 20000
+
+    def __init__(self, escena, mapa, capas, memoria_mb=MEMORIA_MB, tamano_chunk=TAMANO_CHUNK):
+        """capas: nombres de las capas a componer, de abajo hacia arriba."""
+        self.escena = escena
+        self.mapa = mapa
+        self.capas = list(capas)
+        self.visibles = set(self.capas)
+        self.tamano_chunk = tamano_chunk
+        self.lado_px = tamano_chunk * mapa.tamano_tile
+        self.chunks_x = (mapa.ancho + tamano_chunk - 1) // tamano_chunk
+        self.chunks_y = (mapa.alto + tamano_chunk - 1) // tamano_chunk
+        # Nivel de detalle más bajo: un píxel por tile
+        self.nivel_max = mapa.tamano_tile.bit_length() - 1
+
+        # (cx, cy, nivel) -> QPixmap compuesto, o None si el chunk no tiene nada
+        self._pixmaps = OrderedDict()
+        self.limite_bytes = int(memoria_mb * 1024 * 1024)
+        self.bytes_usados = 0
+        self.horneados = 0
+        # Chunks dibujados en el último pintar() y con qué nivel
+        self.pintados = 0
+        self.nivel = 0
+        # Índice de la paleta -> color ARGB del tile (para el último nivel)
+        self._colores = {}
+        # Celdas animadas y reloj que da su frame (los asigna la vista)
+        self.animados = None
+        self.reloj = None
+        # MetricasRender donde anotar cuánto tarda cada horneado (opcional)
+        self.metricas = None
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+    def invalidar(self, claves=None):
+        """Descarta la imagen de esos chunks (o de todos) y pide repintarlos."""
+        if claves is None:
+            self._pixmaps.clear()
+            self._colores.clear()
+            self.bytes_usados = 0
+            self.escena.update()
+            return
+        for cx, cy in claves:
+            for nivel in range(self.nivel_max + 1):
+                clave = (cx, cy, nivel)
+                if clave in self._pixmaps:
+                    self.bytes_usados -= self._bytes(self._pixmaps.pop(clave))
+            self.escena.update(self.rect_chunk(cx, cy))
+
+    def invalidar_celdas(self, capa, indices):
+        """Oyente del mapa: invalida los chunks de las celdas cambiadas."""
+        if capa not in self.visibles:
+            return
+        if indices is None or len(indices) > self.MAX_CELDAS_INCREMENTAL:
+            self.invalidar()
+            return
+        ancho, t = self.mapa.ancho, self.tamano_chunk
+        self.invalidar({((i % ancho) // t, (i // ancho) // t) for i in indices})
+
+    def establecer_visibilidad(self, capa, visible):
+        if visible == (capa in self.visibles):
+            return
+        if visible:
+            self.visibles.add(capa)
+        else:
+            self.visibles.discard(capa)
+        self.invalidar()
+
+    # ------------------------------------------------------------------
+    # Pintado
+    # ------------------------------------------------------------------
+    def rect_chunk(self, cx, cy):
+        lado = self.lado_px
+        return QRectF(cx * lado, cy * lado, lado, lado)
+
+    def rango_chunks(self, rect, margen=0):
+        """(cx0, cy0, cx1, cy1), extremos incluidos, de los chunks que cortan rect."""
+        lado = self.lado_px
+        cx0 = max(0, int(rect.left() // lado) - margen)
+        cy0 = max(0, int(rect.top() // lado) - margen)
+        cx1 = min(self.chunks_x - 1, int(rect.right() // lado) + margen)
+        cy1 = min(self.chunks_y - 1, int(rect.bottom() // lado) + margen)
+        return cx0, cy0, cx1, cy1
+
+    def nivel_para_escala(self, escala):
+        """Nivel de detalle con al menos tantos píxeles por tile como la pantalla."""
+        if escala >= 1:
+            return 0
+        return min(self.nivel_max, int(math.log2(1 / escala)))
+
+    def pintar(self, painter, rect, escala=1.0):
+        """
+        Dibuja los chunks que cortan rect (coordenadas de la escena) con el
+        nivel de detalle que corresponde a la escala de la vista.
+        """
+        cx0, cy0, cx1, cy1 = self.rango_chunks(rect)
+        nivel = self.nivel = self.nivel_para_escala(escala)
+        self.pintados = 0
+        lado = self.lado_px
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                pixmap = self.pixmap_chunk(cx, cy, nivel)
+                if pixmap is None:
+                    continue
+                if nivel:
+                    # La imagen reducida se estira al lugar del chunk: en pantalla queda casi 1:1
+                    painter.drawPixmap(QRectF(cx * lado, cy * lado, lado, lado), pixmap,
+                                       QRectF(pixmap.rect()))
+                else:
+                    painter.drawPixmap(cx * lado, cy * lado, pixmap)
+                self.pintados += 1
+        if nivel == 0 and self.animados is not None and len(self.animados):
+            self._pintar_animados(painter, cx0, cy0, cx1, cy1)
+
+    def _pintar_animados(self, painter, cx0, cy0, cx1, cy1):
+        """Pinta las celdas animadas de los chunks del rango con su frame actual."""
+        mapa = self.mapa
+        ancho, size = mapa.ancho, mapa.tamano_tile
+        visibles = [nombre for nombre in self.capas if nombre in self.visibles]
+        for n, nombre in enumerate(visibles):
+            capa = mapa.capas[nombre]
+            for indice in self.animados.en_chunks(nombre, cx0, cy0, cx1, cy1):
+                x, y = indice % ancho, indice // ancho
+                valor = capa.obtener(x, y)
+                tile = mapa.paleta.obtener_tile(valor)
+                frame = tile.frames[self.reloj.frame(valor)] if self.reloj else tile.frames[0]
+                pixmap = cache_pixmaps.obtener(frame, size)
+                if pixmap.isNull():
+                    self._dibujar_celda(painter, valor, x * size, y * size, size)
+                else:
+                    painter.drawPixmap(x * size, y * size, pixmap)
+                # Lo que está encima en las capas de arriba (ya horneado) se vuelve a pintar
+                for arriba in visibles[n + 1:]:
+                    valor = mapa.capas[arriba].obtener(x, y)
+                    if valor != VACIO and not self.animados.es_animado(valor):
+                        self._dibujar_celda(painter, valor, x * size, y * size, size)
+
+    def repintar_animados(self, rect, cambiados):
+        """Pide repintar las celdas de rect cuyo tile (índice de la paleta) cambió de frame."""
+        # En los niveles reducidos los animados quedan horneados quietos
+        if self.animados is None or self.nivel:
+            return
+        cx0, cy0, cx1, cy1 = self.rango_chunks(rect)
+        mapa = self.mapa
+        ancho, size = mapa.ancho, mapa.tamano_tile
+        for nombre in self.capas:
+            if nombre not in self.visibles:
+                continue
+            capa = mapa.capas[nombre]
+            for indice in self.animados.en_chunks(nombre, cx0, cy0, cx1, cy1):
+                x, y = indice % ancho, indice // ancho
+                if capa.obtener(x, y) in cambiados:
+                    self.escena.update(QRectF(x * size, y * size, size, size))
+
+    def preparar_margen(self, rect, margen=MARGEN_CHUNKS, escala=1.0):
+        """
+        Compone los chunks alrededor de rect (lo visible) que todavía no
+        están en la caché, para que al desplazarse ya estén listos.
+        """
+        nivel = self.nivel_para_escala(escala)
+        cx0, cy0, cx1, cy1 = self.rango_chunks(rect)
+        mx0, my0, mx1, my1 = self.rango_chunks(rect, margen)
+        for cy in range(my0, my1 + 1):
+            for cx in range(mx0, mx1 + 1):
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    continue
+                if (cx, cy, nivel) not in self._pixmaps:
+                    self.pixmap_chunk(cx, cy, nivel)
+
+    # ------------------------------------------------------------------
+    # Composición
+    # ------------------------------------------------------------------
+    def _bytes(self, pixmap):
+        if pixmap is None:
+            return self.BYTES_ENTRADA
+        return self.BYTES_ENTRADA + pixmap.width() * pixmap.height() * 4
+
+    def pixmap_chunk(self, cx, cy, nivel=0):
+        clave = (cx, cy, nivel)
+        if clave in self._pixmaps:
+            self._pixmaps.move_to_end(clave)
+            return self._pixmaps[clave]
+
+        inicio = time.perf_counter()
+        size = max(1, self.mapa.tamano_tile >> nivel)
+        if size == 1:
+            pixmap = self._hornear_puntos(cx, cy)
+        else:
+            pixmap = self._hornear(cx, cy, size)
+        if self.metricas is not None:
+            self.metricas.sumar('horneado', inicio, time.perf_counter())
+        self._pixmaps[clave] = pixmap
+        self.bytes_usados += self._bytes(pixmap)
+        while len(self._pixmaps) > 1 and self.bytes_usados > self.limite_bytes:
+            _, viejo = self._pixmaps.popitem(last=False)
+            self.bytes_usados -= self._bytes(viejo)
+        return pixmap
+
+    def _hornear(self, cx, cy, size):
+        """Compone las capas visibles del chunk con tiles de size px. None si está vacío."""
+        self.horneados += 1
+        mapa = self.mapa
+        t = self.tamano_chunk
+        x0, y0 = cx * t, cy * t
+        x1, y1 = min(x0 + t, mapa.ancho), min(y0 + t, mapa.alto)
+        # En el nivel 0 los animados se pintan aparte, con el frame del momento
+        animados = self.animados if size == mapa.tamano_tile else None
+
+        pixmap = None
+        painter = None
+        for nombre in self.capas:
+            if nombre not in self.visibles:
+                continue
+            capa = mapa.capas[nombre]
+            for y in range(y0, y1):
+                fila = capa.fila(y, x0, x1)
+                if fila.count(VACIO) == len(fila):
+                    continue
+                if painter is None:
+                    pixmap = QPixmap(t * size, t * size)
+                    pixmap.fill(Qt.transparent)
+                    painter = QPainter(pixmap)
+                    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+                py = (y - y0) * size
+                for dx, valor in enumerate(fila):
+                    if valor != VACIO and not (animados and animados.es_animado(valor)):
+                        self._dibujar_celda(painter, valor, dx * size, py, size)
+
+        if painter is not None:
+            painter.end()
+        return pixmap
+
+    def _dibujar_celda(self, painter, valor, px, py, size):
+        tile = self.mapa.paleta.obtener_tile(valor)
+        if tile.tiene_sprite():
+            painter.drawPixmap(px, py, cache_pixmaps.obtener(tile.sprite, size))
+        elif size < 4:
+            # Tan chico el borde gris taparía el color
+            painter.fillRect(px, py, size, size, QColor(tile.color))
+        else:
+            painter.setPen(QPen(QColor(200, 200, 200)))
+            painter.setBrush(QBrush(QColor(tile.color)))
+            painter.drawRect(px, py, size - 1, size - 1)
+
+    def _hornear_puntos(self, cx, cy):
+        """Último nivel: un píxel por tile con el color del tile de más arriba."""
+        self.horneados += 1
+        mapa = self.mapa
+        t = self.tamano_chunk
+        x0, y0 = cx * t, cy * t
+        x1, y1 = min(x0 + t, mapa.ancho), min(y0 + t, mapa.alto)
+
+        # ARGB por celda; 0 = transparente
+        pixeles = array('I', bytes(4 * t * t))
+        vacio = True
+        for nombre in self.capas:
+            if nombre not in self.visibles:
+                continue
+            capa = mapa.capas[nombre]
+            for y in range(y0, y1):
+                fila = capa.fila(y, x0, x1)
+                if fila.count(VACIO) == len(fila):
+                    continue
+                vacio = False
+                base = (y - y0) * t
+                for dx, valor in enumerate(fila):
+                    if valor != VACIO:
+                        pixeles[base + dx] = self._color(valor)
+        if vacio:
+            return None
+        imagen = QImage(pixeles.tobytes(), t, t, 4 * t, QImage.Format_ARGB32)
+        return QPixmap.fromImage(imagen)
+
+    def _color(self, valor):
+        """Color ARGB de un tile visto desde lejos (promedio del sprite)."""
+        color = self._colores.get(valor)
+        if color is None:
+            tile = self.mapa.paleta.obtener_tile(valor)
+            color = QColor(tile.color).rgba()
+            if tile.tiene_sprite():
+                # Reducido a 1x1 con suavizado queda el promedio
+                punto = cache_pixmaps.obtener(tile.sprite, (1, 1), Qt.SmoothTransformation,
+                                              Qt.IgnoreAspectRatio)
+                if not punto.isNull():
+                    color = punto.toImage().pixel(0, 0)
+            self._colores[valor] = color
+        return color
+
+    # ------------------------------------------------------------------
+    def obtener_estadisticas(self):
+        return {
+            'chunks': self.chunks_x * self.chunks_y,
+            'chunks_en_memoria': len(self._pixmaps),
+            'bytes_usados': self.bytes_usados,
+            'limite_bytes': self.limite_bytes,
+            'horneados': self.horneados,
+            'pintados': self.pintados,
+            'nivel': self.nivel
+        }
@@ -9,6 +9,9 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QPixmap, QIcon
 import os
 
+from modelo.recursos import registro_recursos
+from .cache_pixmaps import cache_pixmaps
+
 
 class SpriteButton(QPushButton):
     """Botón que muestra un sprite."""
@@ -22,10 +25,11 @@ class SpriteButton(QPushButton):
         self.setCheckable(True)
         self.setToolTip(nombre)
         
-        if os.path.exists(sprite_path):
-            icon = QIcon(sprite_path)
+        if registro_recursos.existe(sprite_path):
+            tamano_icono = self.size() - self.size() / 4
+            icon = QIcon(cache_pixmaps.obtener(sprite_path, (tamano_icono.width(), tamano_icono.height())))
             self.setIcon(icon)
-            self.setIconSize(self.size() - self.size()/4)
+            self.setIconSize(tamano_icono)
         else:
             self.setText("?")
         
@@ -120,6 +124,9 @@ class SpritePaletteWidget(QWidget):
             os.makedirs(ruta_base, exist_ok=True)
             return
         
+        # Recargar la galería es el momento de volver a mirar los sprites en disco
+        registro_recursos.reescanear()
+        
         # Limpiar grid
         for i in reversed(range(self.sprite_grid.count())): 
             self.sprite_grid.itemAt(i).widget().setParent(None)
@@ -173,6 +180,8 @@ class SpritePaletteWidget(QWidget):
             
             os.makedirs("assets/tiles/", exist_ok=True)
             shutil.copy(archivo, destino)
+            registro_recursos.invalidar(destino)
+            cache_pixmaps.invalidar(destino)
             
             # Recargar galería
             self.cargar_sprites_disponibles()
@@ -185,10 +194,8 @@ class SpritePaletteWidget(QWidget):
         self.radio_sprite.setChecked(True)
         
         # Actualizar preview
-        if os.path.exists(sprite_path):
-            pixmap = QPixmap(sprite_path)
-            pixmap = pixmap.scaled(80, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.preview_image.setPixmap(pixmap)
+        if registro_recursos.existe(sprite_path):
+            self.preview_image.setPixmap(cache_pixmaps.obtener(sprite_path, 80))
             self.preview_label.setText(f"<b>{nombre}</b>")
         
         # Emitir señal
@@ -1,4 +1,15 @@
-from .mapa import Mapa, Tile
-from .objetos import Objeto
+from .mapa import Mapa, Tile, RegistroTiles, registro_tiles, TILES_CONFIG, crear_tile_desde_config
+from .objetos import Objeto, OBJETOS_PREDEFINIDOS, crear_objeto_desde_config
+from .capas import PaletaTiles, CapaTiles, CapaChunks
+from .colision import CapaColision
+from .relleno import calcular_relleno
+from .lineas import linea_celdas, celdas_del_trazo
+from .recursos import RegistroRecursos, registro_recursos
 
-__all__ = ['Mapa', 'Tile', 'Objeto']
\ No newline at end of file
+__all__ = [
+    'Mapa', 'Tile', 'Objeto', 'RegistroTiles', 'registro_tiles', 'PaletaTiles', 'CapaTiles',
+    'CapaChunks', 'CapaColision', 'calcular_relleno', 'linea_celdas', 'celdas_del_trazo',
+    'RegistroRecursos', 'registro_recursos',
+    'TILES_CONFIG', 'crear_tile_desde_config',
+    'OBJETOS_PREDEFINIDOS', 'crear_objeto_desde_config'
+]
@@ -0,0 +1,137 @@
+"""
+Animación de tiles: qué frame toca y dónde hay celdas animadas.
+
+Los tiles internados son compartidos e inmutables, así que el frame no se
+guarda en el tile: sale del tiempo de un reloj común. Todas las celdas con
+la misma entrada de la paleta muestran el mismo frame.
+
+IndiceAnimados guarda, por capa y por chunk, las celdas cuyo tile está
+animado. Así quien dibuja recorre solo las celdas animadas de lo que se
+ve, sin mirar el resto del mapa. Se mantiene con los avisos de cambio del
+mapa (actualizar es un oyente como los de Mapa.agregar_oyente).
+"""
+
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from .capas import VACIO
+
+
+def es_animado(tile) -> bool:
+    """El tile tiene algo que animar (marcado como animado y con frames)."""
+    return tile is not None and tile.animado and len(tile.frames) > 0
+
+
+def frame_en(tile, tiempo_ms: int) -> int:
+    """Índice del frame que muestra el tile en ese momento del reloj."""
+    return (tiempo_ms // max(1, tile.tiempo_por_frame)) % len(tile.frames)
+
+
+class IndiceAnimados:
+    """Celdas con tiles animados, agrupadas por chunk."""
+
+    # Con más celdas avisadas que esto se vuelve a buscar en toda la capa
+    MAX_CELDAS_INCREMENTAL = 20000
+
+    def __init__(self, mapa, capas: Tuple[str, ...] = ('fondo', 'objetos'), tamano_chunk: int = 16):
+        self.mapa = mapa
+        self.capas = tuple(capas)
+        self.tamano_chunk = tamano_chunk
+        # capa -> (cx, cy) -> índices planos de las celdas animadas
+        self._por_chunk: Dict[str, Dict[Tuple[int, int], Set[int]]] = {capa: {} for capa in self.capas}
+        self._total = 0
+        # Entradas animadas de la paleta (la paleta solo crece, así que
+        # alcanza con recalcular cuando cambia su largo)
+        self._animados: Set[int] = set()
+        self._largo_paleta = -1
+        for capa in self.capas:
+            self.reconstruir(capa)
+
+    def _entradas_animadas(self) -> Set[int]:
+        paleta = self.mapa.paleta
+        if len(paleta) != self._largo_paleta:
+            self._largo_paleta = len(paleta)
+            self._animados = {indice for indice, tile in paleta if es_animado(tile)}
+        return self._animados
+
+    def es_animado(self, valor: int) -> bool:
+        return valor != VACIO and valor in self._entradas_animadas()
+
+    def _clave(self, indice: int) -> Tuple[int, int]:
+        ancho, t = self.mapa.ancho, self.tamano_chunk
+        return (indice % ancho) // t, (indice // ancho) // t
+
+    def reconstruir(self, capa: str) -> None:
+        """Vuelve a buscar las celdas animadas de toda la capa."""
+        self._total -= sum(len(celdas) for celdas in self._por_chunk[capa].values())
+        por_chunk = self._por_chunk[capa] = {}
+        animados = self._entradas_animadas()
+        datos = self.mapa.capas[capa]
+        # Con el histograma se evita recorrer capas sin tiles animados
+        presentes = [valor for valor in animados if datos.contar(valor)]
+        if not presentes:
+            return
+        ancho = self.mapa.ancho
+        for y in range(self.mapa.alto):
+            fila = datos.fila(y)
+            if not any(valor in fila for valor in presentes):
+                continue
+            base = y * ancho
+            for x, valor in enumerate(fila):
+                if valor in animados:
+                    por_chunk.setdefault(self._clave(base + x), set()).add(base + x)
+                    self._total += 1
+
+    def actualizar(self, capa: str, indices) -> None:
+        """Oyente del mapa: revisa las celdas cambiadas (None = toda la capa)."""
+        if capa not in self._por_chunk:
+            return
+        animados = self._entradas_animadas()
+        if not animados:
+            # Sin entradas animadas en la paleta no hay nada que indexar
+            return
+        if indices is None or len(indices) > self.MAX_CELDAS_INCREMENTAL:
+            self.reconstruir(capa)
+            return
+        por_chunk = self._por_chunk[capa]
+        datos = self.mapa.capas[capa]
+        if not por_chunk and not any(datos.contar(valor) for valor in animados):
+            # La capa no tenía ni tiene celdas animadas
+            return
+        ancho = self.mapa.ancho
+        for indice in indices:
+            clave = self._clave(indice)
+            celdas = por_chunk.get(clave)
+            if datos.obtener(indice % ancho, indice // ancho) in animados:
+                if celdas is None:
+                    celdas = por_chunk[clave] = set()
+                if indice not in celdas:
+                    celdas.add(indice)
+                    self._total += 1
+            elif celdas is not None and indice in celdas:
+                celdas.remove(indice)
+                self._total -= 1
+                if not celdas:
+                    del por_chunk[clave]
+
+    def en_chunks(self, capa: str, cx0: int, cy0: int, cx1: int, cy1: int) -> Iterator[int]:
+        """Índices de las celdas animadas de la capa en los chunks del rango (extremos incluidos)."""
+        por_chunk = self._por_chunk.get(capa, {})
+        if not por_chunk:
+            return
+        # Se recorre lo más chico: el rango o los chunks con animaciones
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(por_chunk):
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    yield from por_chunk.get((cx, cy), ())
+        else:
+            for (cx, cy), celdas in por_chunk.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield from celdas
+
+    def chunks(self, capa: Optional[str] = None) -> Set[Tuple[int, int]]:
+        """Chunks que tienen alguna celda animada (en la capa o en cualquiera)."""
+        capas = (capa,) if capa else self.capas
+        return {clave for nombre in capas for clave in self._por_chunk[nombre]}
+
+    def __len__(self) -> int:
+        return self._total
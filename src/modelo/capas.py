@@ -0,0 +1,658 @@
+"""
+Almacenamiento compacto de las capas del mapa.
+
+Cada capa guarda un entero sin signo de 16 bits por celda. Ese entero es
+un índice en la paleta de tiles del mapa, donde se guarda una sola vez
+cada definición de tile distinta (como instancia internada y congelada,
+ver RegistroTiles). El índice 0 significa "celda vacía".
+
+Hay dos formas de guardar esa matriz:
+
+- CapaTiles: un único array de ancho*alto (mapas normales).
+- CapaChunks: bloques de TAMANO_CHUNK x TAMANO_CHUNK que se crean al
+  escribir la primera celda y se liberan cuando vuelven a quedar vacíos
+  (mapas enormes y casi vacíos).
+
+Clonar una capa es O(1): el clon comparte los datos con el original y
+cada lado copia el array (o el chunk) solo la primera vez que lo escribe.
+
+Las dos llevan además un histograma de índices que se actualiza en cada
+escritura, así que contar celdas ocupadas o por tipo no recorre la capa.
+"""
+
+import operator
+import struct
+import sys
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+VACIO = 0
+MAX_ENTRADAS_PALETA = 0xFFFF
+TAMANO_CHUNK = 32
+
+# Las escrituras en bloque devuelven las celdas que cambiaron como índices
+# planos (y * ancho + x) junto con el valor que tenían antes
+Cambios = Tuple[array, array]
+
+
+def _nuevos_cambios() -> Cambios:
+    return array('I'), array('H')
+
+
+def _bytes_little(datos: array) -> bytes:
+    """Bytes de un array en little-endian (el formato de los volcados)."""
+    if sys.byteorder == 'little':
+        return datos.tobytes()
+    copia = array(datos.typecode, datos)
+    copia.byteswap()
+    return copia.tobytes()
+
+
+def _tramos(indices: array) -> Iterator[Tuple[int, int, int]]:
+    """
+    Recorre los tramos de índices consecutivos (i, i+1, i+2...) como
+    (posición en indices, primer índice, largo). El final de cada tramo se
+    busca mirando pocos elementos y se confirma comparando un slice, así
+    que un relleno no se recorre celda por celda en Python.
+    """
+    n = len(indices)
+    k = 0
+    largo = 1
+    while k < n:
+        inicio = indices[k]
+        fin = k + largo
+        if not (fin <= n and indices[fin - 1] - inicio == largo - 1
+                and (fin == n or indices[fin] - inicio != largo)):
+            # No mide lo mismo que el anterior (el caso habitual son filas de
+            # chunk iguales): galopa y bisecta sobre indices[j] - inicio == j - k
+            bajo, paso = k, 1
+            while bajo + paso < n and indices[bajo + paso] - inicio == bajo + paso - k:
+                bajo += paso
+                paso *= 2
+            alto = min(n, bajo + paso)
+            while alto - bajo > 1:
+                medio = (bajo + alto) // 2
+                if indices[medio] - inicio == medio - k:
+                    bajo = medio
+                else:
+                    alto = medio
+            largo = bajo - k + 1
+        # Con índices desordenados los extremos pueden coincidir sin ser un tramo
+        if largo > 2 and indices[k:k + largo] != array(indices.typecode, range(inicio, inicio + largo)):
+            largo = 1
+            while k + largo < n and indices[k + largo] == inicio + largo:
+                largo += 1
+        yield k, inicio, largo
+        k += largo
+
+
+def _uniforme(valores: array) -> bool:
+    return not valores or valores.count(valores[0]) == len(valores)
+
+
+def _cambios_tramo(
+    viejo: array,
+    nuevo: array,
+    indices: array,
+    cambiados: array,
+    anteriores: array,
+    nuevos: array
+) -> None:
+    """
+    Anota las celdas del tramo (indices, consecutivos) que van a cambiar,
+    con su valor anterior y el nuevo.
+    """
+    if _uniforme(nuevo):
+        iguales = viejo.count(nuevo[0])
+    else:
+        iguales = any(map(operator.eq, viejo, nuevo))
+    if iguales:
+        for i, a, n in zip(indices, viejo, nuevo):
+            if a != n:
+                cambiados.append(i)
+                anteriores.append(a)
+                nuevos.append(n)
+    else:
+        # Cambian todas (el caso de deshacer: las celdas tienen el valor nuevo)
+        cambiados.extend(indices)
+        anteriores.extend(viejo)
+        nuevos.extend(nuevo)
+
+
+def _cantidades(valores: Iterable[int]) -> Dict[int, int]:
+    """Cuántas veces aparece cada valor."""
+    if isinstance(valores, array) and valores and _uniforme(valores):
+        # Todas iguales (p. ej. rellenar celdas vacías): sin Counter
+        return {valores[0]: len(valores)}
+    return Counter(valores)
+
+
+def _array_little(typecode: str, datos: bytes) -> array:
+    resultado = array(typecode)
+    resultado.frombytes(datos)
+    if sys.byteorder != 'little':
+        resultado.byteswap()
+    return resultado
+
+
+class PaletaTiles:
+    """Paleta de tiles únicos de un mapa (índice -> Tile)."""
+
+    def __init__(self, registro: 'RegistroTiles'):
+        self._registro = registro
+        self._tiles: List[Optional['Tile']] = [None]
+        self._indices = {}
+
+    def obtener_id(self, tile: Optional['Tile']) -> int:
+        """Devuelve el índice del tile, agregándolo a la paleta si es nuevo."""
+        if tile is None:
+            return VACIO
+
+        clave = tile.clave_contenido()
+        indice = self._indices.get(clave)
+        if indice is None:
+            if len(self._tiles) > MAX_ENTRADAS_PALETA:
+                raise ValueError("La paleta del mapa está llena")
+            indice = len(self._tiles)
+            # Se guarda la instancia internada, nunca la del que llama,
+            # para que este pueda seguir modificando su tile
+            self._tiles.append(self._registro.internar(tile))
+            self._indices[clave] = indice
+        return indice
+
+    def obtener_tile(self, indice: int) -> Optional['Tile']:
+        return self._tiles[indice]
+
+    def __len__(self) -> int:
+        return len(self._tiles) - 1
+
+    def __iter__(self) -> Iterator[Tuple[int, 'Tile']]:
+        for indice in range(1, len(self._tiles)):
+            yield indice, self._tiles[indice]
+
+
+class CapaBase:
+    """Contadores comunes a todas las capas (celdas ocupadas e histograma)."""
+
+    def __init__(self):
+        # indice -> cantidad de celdas con ese índice (sin contar VACIO)
+        self._conteo = {}
+        self._no_vacias = 0
+
+    def _contar(self, anterior: int, valor: int) -> None:
+        conteo = self._conteo
+        if anterior != VACIO:
+            restantes = conteo[anterior] - 1
+            if restantes:
+                conteo[anterior] = restantes
+            else:
+                del conteo[anterior]
+            self._no_vacias -= 1
+        if valor != VACIO:
+            conteo[valor] = conteo.get(valor, 0) + 1
+            self._no_vacias += 1
+
+    def _contar_lote(self, anteriores: Iterable[int], valor: int) -> None:
+        """Como _contar, para muchas celdas (que cambiaron) escritas con el mismo valor."""
+        conteo = self._conteo
+        total = 0
+        for anterior, cantidad in _cantidades(anteriores).items():
+            total += cantidad
+            if anterior == VACIO:
+                continue
+            restantes = conteo[anterior] - cantidad
+            if restantes:
+                conteo[anterior] = restantes
+            else:
+                del conteo[anterior]
+            self._no_vacias -= cantidad
+        if valor != VACIO and total:
+            conteo[valor] = conteo.get(valor, 0) + total
+            self._no_vacias += total
+
+    def _contar_valores(self, anteriores: array, nuevos: array) -> None:
+        """Como _contar, para muchas celdas (que cambiaron) con un valor nuevo cada una."""
+        conteo = self._conteo
+        for anterior, cantidad in _cantidades(anteriores).items():
+            if anterior == VACIO:
+                continue
+            restantes = conteo[anterior] - cantidad
+            if restantes:
+                conteo[anterior] = restantes
+            else:
+                del conteo[anterior]
+            self._no_vacias -= cantidad
+        for valor, cantidad in _cantidades(nuevos).items():
+            if valor != VACIO:
+                conteo[valor] = conteo.get(valor, 0) + cantidad
+                self._no_vacias += cantidad
+
+    def _reiniciar_conteo(self) -> None:
+        self._conteo = {}
+        self._no_vacias = 0
+
+    def _recontar(self, valores: Iterable[int]) -> None:
+        conteo = Counter(valores)
+        conteo.pop(VACIO, None)
+        self._conteo = dict(conteo)
+        self._no_vacias = sum(conteo.values())
+
+    def _copiar_conteo(self, otra: 'CapaBase') -> None:
+        self._conteo = dict(otra._conteo)
+        self._no_vacias = otra._no_vacias
+
+    def contar_no_vacias(self) -> int:
+        return self._no_vacias
+
+    def contar(self, indice: int) -> int:
+        return self._conteo.get(indice, 0)
+
+    def histograma(self) -> Dict[int, int]:
+        """Copia del histograma indice -> celdas."""
+        return dict(self._conteo)
+
+
+class CapaTiles(CapaBase):
+    """Matriz ancho x alto de índices de paleta guardada en un array('H')."""
+
+    def __init__(self, ancho: int, alto: int):
+        super().__init__()
+        self.ancho = ancho
+        self.alto = alto
+        self._celdas = array('H', [VACIO]) * (ancho * alto)
+        # Contador compartido de cuántas capas usan self._celdas
+        self._usuarios = [1]
+
+    def obtener(self, x: int, y: int) -> int:
+        return self._celdas[y * self.ancho + x]
+
+    def establecer(self, x: int, y: int, valor: int) -> int:
+        """Escribe el índice de la celda y devuelve el que tenía antes."""
+        i = y * self.ancho + x
+        anterior = self._celdas[i]
+        if anterior != valor:
+            if self._usuarios[0] > 1:
+                self._separar()
+            self._celdas[i] = valor
+            self._contar(anterior, valor)
+        return anterior
+
+    def escribir_lote(
+        self,
+        indices: Iterable[int],
+        valores: Union[int, array]
+    ) -> Cambios:
+        """
+        Escribe muchas celdas dadas por índice plano (y * ancho + x).
+        valores es un único índice de paleta o uno por celda. Los tramos de
+        índices consecutivos se escriben con slices y el histograma se
+        actualiza una vez al final.
+        """
+        if not isinstance(indices, array):
+            indices = array('I', indices)
+        unico = isinstance(valores, int)
+        celdas = self._celdas
+        cambiados, anteriores = _nuevos_cambios()
+        nuevos = array('H')
+        for k, inicio, largo in _tramos(indices):
+            nuevo = array('H', [valores]) * largo if unico else valores[k:k + largo]
+            viejo = celdas[inicio:inicio + largo]
+            if viejo == nuevo:
+                continue
+            _cambios_tramo(viejo, nuevo, indices[k:k + largo], cambiados, anteriores, nuevos)
+            if self._usuarios[0] > 1:
+                self._separar()
+                celdas = self._celdas
+            celdas[inicio:inicio + largo] = nuevo
+        self._contar_valores(anteriores, nuevos)
+        return cambiados, anteriores
+
+    def llenar_rectangulo(self, x0: int, y0: int, x1: int, y1: int, valor: int) -> Cambios:
+        """
+        Escribe valor en [x0, x1) x [y0, y1) con slices: si son filas enteras
+        el rectángulo es un solo tramo del array, si no va fila por fila.
+        """
+        cambiados, anteriores = _nuevos_cambios()
+        if x0 == 0 and x1 == self.ancho:
+            tramos = [(y0 * self.ancho, (y1 - y0) * self.ancho)]
+        else:
+            tramos = [(y * self.ancho + x0, x1 - x0) for y in range(y0, y1)]
+        bloque = array('H', [valor]) * tramos[0][1]
+        for inicio, largo in tramos:
+            viejo = self._celdas[inicio:inicio + largo]
+            if viejo == bloque:
+                continue
+            if self._usuarios[0] > 1:
+                self._separar()
+            if valor in viejo:
+                anteriores.extend(v for v in viejo if v != valor)
+                cambiados.extend(inicio + k for k, v in enumerate(viejo) if v != valor)
+            else:
+                # Cambia todo el tramo (el caso habitual al rellenar)
+                anteriores.extend(viejo)
+                cambiados.extend(range(inicio, inicio + largo))
+            self._celdas[inicio:inicio + largo] = bloque
+        self._contar_lote(anteriores, valor)
+        return cambiados, anteriores
+
+    def _separar(self) -> None:
+        """Copy-on-write: deja de compartir el array antes de escribirlo."""
+        self._usuarios[0] -= 1
+        self._celdas = array('H', self._celdas)
+        self._usuarios = [1]
+
+    def limpiar(self) -> None:
+        self._usuarios[0] -= 1
+        self._celdas = array('H', [VACIO]) * (self.ancho * self.alto)
+        self._usuarios = [1]
+        self._reiniciar_conteo()
+
+    def volcar(self) -> bytes:
+        """Contenido completo como bytes (uint16 little-endian, fila por fila)."""
+        return _bytes_little(self._celdas)
+
+    def cargar_volcado(self, datos: bytes) -> None:
+        celdas = _array_little('H', datos)
+        if len(celdas) != self.ancho * self.alto:
+            raise ValueError("El volcado no corresponde al tamaño de la capa")
+        self._usuarios[0] -= 1
+        self._celdas = celdas
+        self._usuarios = [1]
+        self._recontar(celdas)
+
+    def bytes_datos(self) -> int:
+        """Bytes que ocupan las celdas (lo que cuesta separar un clon)."""
+        return len(self._celdas) * self._celdas.itemsize
+
+    def clonar(self) -> 'CapaTiles':
+        nueva = CapaTiles.__new__(CapaTiles)
+        nueva.ancho = self.ancho
+        nueva.alto = self.alto
+        nueva._celdas = self._celdas
+        nueva._usuarios = self._usuarios
+        nueva._copiar_conteo(self)
+        self._usuarios[0] += 1
+        return nueva
+
+    def fila(self, y: int, x0: int = 0, x1: Optional[int] = None) -> array:
+        """Índices de la fila y, de x0 a x1 (sin incluir; por defecto toda la fila)."""
+        inicio = y * self.ancho
+        fin = self.ancho if x1 is None else x1
+        return self._celdas[inicio + x0:inicio + fin]
+
+    def celdas_no_vacias(self) -> Iterator[Tuple[int, int, int]]:
+        """Recorre (x, y, indice) de las celdas ocupadas."""
+        for y in range(self.alto):
+            fila = self.fila(y)
+            if fila.count(VACIO) == self.ancho:
+                continue
+            for x, valor in enumerate(fila):
+                if valor != VACIO:
+                    yield x, y, valor
+
+    def __repr__(self) -> str:
+        return f"CapaTiles({self.ancho}x{self.alto})"
+
+
+class CapaChunks(CapaBase):
+    """Matriz dispersa de índices de paleta dividida en chunks de 32x32."""
+
+    def __init__(self, ancho: int, alto: int, tamano_chunk: int = TAMANO_CHUNK):
+        super().__init__()
+        self.ancho = ancho
+        self.alto = alto
+        self.tamano_chunk = tamano_chunk
+        # (cx, cy) -> array('H') de tamano_chunk * tamano_chunk
+        self._chunks = {}
+        # (cx, cy) -> celdas no vacías del chunk, para saber cuándo liberarlo
+        self._ocupadas = {}
+        # Copy-on-write: si los diccionarios se comparten con un clon, y qué
+        # chunks son exclusivos de esta capa (se pueden escribir sin copiar)
+        self._compartida = False
+        self._propios = set()
+
+    def _ubicar(self, x: int, y: int) -> Tuple[Tuple[int, int], int]:
+        t = self.tamano_chunk
+        return (x // t, y // t), (y % t) * t + (x % t)
+
+    def obtener(self, x: int, y: int) -> int:
+        clave, i = self._ubicar(x, y)
+        chunk = self._chunks.get(clave)
+        if chunk is None:
+            return VACIO
+        return chunk[i]
+
+    def establecer(self, x: int, y: int, valor: int) -> int:
+        """Escribe el índice de la celda y devuelve el que tenía antes."""
+        clave, i = self._ubicar(x, y)
+        chunk = self._chunks.get(clave)
+        anterior = VACIO if chunk is None else chunk[i]
+        if anterior == valor:
+            return anterior
+
+        chunk = self._chunk_escribible(clave, chunk)
+        chunk[i] = valor
+        self._contar(anterior, valor)
+
+        if anterior == VACIO:
+            self._ocupadas[clave] += 1
+        elif valor == VACIO:
+            self._ocupadas[clave] -= 1
+            self._liberar_si_vacio(clave)
+        return anterior
+
+    def _chunk_escribible(self, clave: Tuple[int, int], chunk: Optional[array]) -> array:
+        """Devuelve el chunk listo para escribir: lo crea o lo copia (copy-on-write) si hace falta."""
+        if self._compartida:
+            self._separar()
+
+        if chunk is None:
+            chunk = array('H', [VACIO]) * (self.tamano_chunk * self.tamano_chunk)
+            self._chunks[clave] = chunk
+            self._ocupadas[clave] = 0
+            self._propios.add(clave)
+        elif clave not in self._propios:
+            chunk = array('H', chunk)
+            self._chunks[clave] = chunk
+            self._propios.add(clave)
+        return chunk
+
+    def _liberar_si_vacio(self, clave: Tuple[int, int]) -> None:
+        if self._ocupadas.get(clave) == 0:
+            del self._chunks[clave]
+            del self._ocupadas[clave]
+            self._propios.discard(clave)
+
+    def escribir_lote(
+        self,
+        indices: Iterable[int],
+        valores: Union[int, array]
+    ) -> Cambios:
+        """
+        Escribe muchas celdas dadas por índice plano (y * ancho + x). Los
+        tramos de índices consecutivos se escriben con slices, cortados en
+        los bordes de los chunks.
+        """
+        if not isinstance(indices, array):
+            indices = array('I', indices)
+        t = self.tamano_chunk
+        unico = isinstance(valores, int)
+        cambiados, anteriores = _nuevos_cambios()
+        nuevos = array('H')
+        vacio = array('H', [VACIO]) * t
+        for k, inicio, largo in _tramos(indices):
+            fin = inicio + largo
+            while inicio < fin:
+                y, x = divmod(inicio, self.ancho)
+                # Hasta el final del tramo, de la fila o del chunk
+                ancho = min(fin - inicio, self.ancho - x, t - x % t)
+                clave = (x // t, y // t)
+                a = (y % t) * t + x % t
+                chunk = self._chunks.get(clave)
+                viejo = vacio[:ancho] if chunk is None else chunk[a:a + ancho]
+                desde = k + inicio - indices[k]
+                nuevo = array('H', [valores]) * ancho if unico else valores[desde:desde + ancho]
+                if viejo != nuevo:
+                    chunk = self._chunk_escribible(clave, chunk)
+                    _cambios_tramo(viejo, nuevo, indices[desde:desde + ancho], cambiados, anteriores, nuevos)
+                    chunk[a:a + ancho] = nuevo
+                    self._ocupadas[clave] += viejo.count(VACIO) - nuevo.count(VACIO)
+                    self._liberar_si_vacio(clave)
+                inicio += ancho
+        self._contar_valores(anteriores, nuevos)
+        return cambiados, anteriores
+
+    def llenar_rectangulo(self, x0: int, y0: int, x1: int, y1: int, valor: int) -> Cambios:
+        """
+        Escribe valor en [x0, x1) x [y0, y1), chunk por chunk: un chunk
+        cubierto entero se reemplaza de una vez, el resto fila por fila.
+        """
+        t = self.tamano_chunk
+        cambiados, anteriores = _nuevos_cambios()
+        vacio = array('H', [VACIO]) * (t * t)
+        lleno = array('H', [valor]) * (t * t)
+
+        for cy in range(y0 // t, (y1 - 1) // t + 1):
+            for cx in range(x0 // t, (x1 - 1) // t + 1):
+                clave = (cx, cy)
+                chunk = self._chunks.get(clave)
+                if chunk is None and valor == VACIO:
+                    continue
+
+                lx0 = max(x0, cx * t) - cx * t
+                lx1 = min(x1, cx * t + t) - cx * t
+                ly0 = max(y0, cy * t) - cy * t
+                ly1 = min(y1, cy * t + t) - cy * t
+                viejo = vacio if chunk is None else chunk
+                if lx1 - lx0 == t and ly1 - ly0 == t and valor not in viejo:
+                    # Chunk entero y cambian todas sus celdas
+                    base = cy * t * self.ancho + cx * t
+                    for ly in range(t):
+                        fila = base + ly * self.ancho
+                        cambiados.extend(range(fila, fila + t))
+                    anteriores.extend(viejo)
+                    if self._compartida:
+                        self._separar()
+                    if valor == VACIO:
+                        self._ocupadas[clave] = 0
+                        self._liberar_si_vacio(clave)
+                    else:
+                        self._chunks[clave] = array('H', lleno)
+                        self._ocupadas[clave] = t * t
+                        self._propios.add(clave)
+                    continue
+
+                bloque = lleno[:lx1 - lx0]
+                for ly in range(ly0, ly1):
+                    a = ly * t + lx0
+                    viejo = vacio[:lx1 - lx0] if chunk is None else chunk[a:a + len(bloque)]
+                    if viejo == bloque:
+                        continue
+
+                    chunk = self._chunk_escribible(clave, chunk)
+                    base = (cy * t + ly) * self.ancho + cx * t + lx0
+                    if valor in viejo:
+                        cambiadas_fila = len(viejo) - viejo.count(valor)
+                        anteriores.extend(v for v in viejo if v != valor)
+                        cambiados.extend(base + k for k, v in enumerate(viejo) if v != valor)
+                    else:
+                        cambiadas_fila = len(viejo)
+                        anteriores.extend(viejo)
+                        cambiados.extend(range(base, base + len(viejo)))
+                    chunk[a:a + len(bloque)] = bloque
+
+                    if valor == VACIO:
+                        self._ocupadas[clave] -= cambiadas_fila
+                    else:
+                        self._ocupadas[clave] += viejo.count(VACIO)
+
+                self._liberar_si_vacio(clave)
+        self._contar_lote(anteriores, valor)
+        return cambiados, anteriores
+
+    def _separar(self) -> None:
+        """Copia los diccionarios compartidos (no los chunks, esos se copian al escribirlos)."""
+        self._chunks = dict(self._chunks)
+        self._ocupadas = dict(self._ocupadas)
+        self._compartida = False
+
+    def limpiar(self) -> None:
+        self._chunks = {}
+        self._ocupadas = {}
+        self._compartida = False
+        self._propios = set()
+        self._reiniciar_conteo()
+
+    def volcar(self) -> bytes:
+        """Solo los chunks asignados: (cx, cy) y sus celdas, en little-endian."""
+        partes = [struct.pack('<HI', self.tamano_chunk, len(self._chunks))]
+        for (cx, cy), chunk in self._chunks.items():
+            partes.append(struct.pack('<II', cx, cy))
+            partes.append(_bytes_little(chunk))
+        return b''.join(partes)
+
+    def cargar_volcado(self, datos: bytes) -> None:
+        tamano, cantidad = struct.unpack_from('<HI', datos)
+        if tamano != self.tamano_chunk:
+            raise ValueError("El volcado usa otro tamaño de chunk")
+        self.limpiar()
+        largo = tamano * tamano * 2
+        posicion = struct.calcsize('<HI')
+        for _ in range(cantidad):
+            cx, cy = struct.unpack_from('<II', datos, posicion)
+            posicion += 8
+            chunk = _array_little('H', datos[posicion:posicion + largo])
+            posicion += largo
+            ocupadas = len(chunk) - chunk.count(VACIO)
+            if ocupadas:
+                self._chunks[(cx, cy)] = chunk
+                self._ocupadas[(cx, cy)] = ocupadas
+                self._propios.add((cx, cy))
+        self._recontar(v for chunk in self._chunks.values() for v in chunk)
+
+    def bytes_datos(self) -> int:
+        """Bytes que ocupan los chunks asignados."""
+        return len(self._chunks) * self.tamano_chunk * self.tamano_chunk * 2
+
+    def clonar(self) -> 'CapaChunks':
+        nueva = CapaChunks(self.ancho, self.alto, self.tamano_chunk)
+        nueva._chunks = self._chunks
+        nueva._ocupadas = self._ocupadas
+        nueva._copiar_conteo(self)
+        nueva._compartida = self._compartida = True
+        # A partir de ahora ningún chunk es exclusivo de ninguno de los dos
+        self._propios = set()
+        return nueva
+
+    @property
+    def chunks_asignados(self) -> int:
+        return len(self._chunks)
+
+    def fila(self, y: int, x0: int = 0, x1: Optional[int] = None) -> array:
+        """Índices de la fila y, de x0 a x1 (sin incluir); solo mira los chunks del tramo."""
+        t = self.tamano_chunk
+        if x1 is None:
+            x1 = self.ancho
+        fila = array('H', [VACIO]) * (x1 - x0)
+        cy, dy = divmod(y, t)
+        for cx in range(x0 // t, (x1 - 1) // t + 1):
+            chunk = self._chunks.get((cx, cy))
+            if chunk is None:
+                continue
+            a = max(x0, cx * t)
+            b = min(x1, cx * t + t)
+            fila[a - x0:b - x0] = chunk[dy * t + a - cx * t:dy * t + b - cx * t]
+        return fila
+
+    def celdas_no_vacias(self) -> Iterator[Tuple[int, int, int]]:
+        """Recorre (x, y, indice) de las celdas ocupadas, chunk por chunk."""
+        t = self.tamano_chunk
+        for (cx, cy), chunk in list(self._chunks.items()):
+            for i, valor in enumerate(chunk):
+                if valor != VACIO:
+                    dy, dx = divmod(i, t)
+                    yield cx * t + dx, cy * t + dy, valor
+
+    def __repr__(self) -> str:
+        return f"CapaChunks({self.ancho}x{self.alto}, {len(self._chunks)} chunks)"
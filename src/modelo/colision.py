@@ -0,0 +1,340 @@
+"""
+Capa de colisión guardada como mapa de bits.
+
+Cada celda ocupa un bit. Las filas se guardan en un bytearray, con un
+número entero de bytes por fila, y el bit x de una fila es el bit x del
+entero little-endian que forman esos bytes. Así las operaciones sobre
+rectángulos y máscaras se hacen con operaciones de enteros de Python
+(en C) en vez de recorrer celda por celda.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .capas import _tramos
+
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    # Python < 3.10
+    def _popcount(n: int) -> int:
+        return bin(n).count('1')
+
+
+def _a_entero(datos) -> int:
+    return int.from_bytes(datos, 'little')
+
+
+_A_DIGITO = bytes.maketrans(b'\x00\x01', b'01')
+_INVERTIR = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+
+def _bits_de(celdas: bytes) -> int:
+    """Entero con el bit x encendido si celdas[x] es 1 (sin recorrer en Python)."""
+    return int(celdas.translate(_A_DIGITO)[::-1] or b'0', 2)
+
+
+class CapaColision:
+    """Mapa de bits ancho x alto con la misma interfaz que las capas de tiles."""
+
+    def __init__(self, ancho: int, alto: int):
+        self.ancho = ancho
+        self.alto = alto
+        self.bytes_por_fila = (ancho + 7) // 8
+        self._bits = bytearray(self.bytes_por_fila * alto)
+        self._activas = 0
+        # Contador compartido para copy-on-write (igual que CapaTiles)
+        self._usuarios = [1]
+
+    # ------------------------------------------------------------------
+    # Interfaz de capa (usada por Mapa)
+    # ------------------------------------------------------------------
+    def obtener(self, x: int, y: int) -> int:
+        return (self._bits[y * self.bytes_por_fila + (x >> 3)] >> (x & 7)) & 1
+
+    def establecer(self, x: int, y: int, valor: int) -> int:
+        """Activa (valor != 0) o desactiva la celda. Devuelve el valor anterior (0/1)."""
+        i = y * self.bytes_por_fila + (x >> 3)
+        bit = 1 << (x & 7)
+        anterior = 1 if self._bits[i] & bit else 0
+        nuevo = 1 if valor else 0
+        if anterior != nuevo:
+            self._antes_de_escribir()
+            self._bits[i] ^= bit
+            self._activas += 1 if nuevo else -1
+        return anterior
+
+    def alternar(self, x: int, y: int) -> int:
+        """Invierte la celda y devuelve el valor que tenía."""
+        anterior = self.obtener(x, y)
+        self.establecer(x, y, not anterior)
+        return anterior
+
+    def limpiar(self) -> None:
+        self._usuarios[0] -= 1
+        self._bits = bytearray(self.bytes_por_fila * self.alto)
+        self._usuarios = [1]
+        self._activas = 0
+
+    def bytes_datos(self) -> int:
+        """Bytes que ocupa el mapa de bits."""
+        return len(self._bits)
+
+    def clonar(self) -> 'CapaColision':
+        nueva = CapaColision.__new__(CapaColision)
+        nueva.ancho = self.ancho
+        nueva.alto = self.alto
+        nueva.bytes_por_fila = self.bytes_por_fila
+        nueva._bits = self._bits
+        nueva._activas = self._activas
+        nueva._usuarios = self._usuarios
+        self._usuarios[0] += 1
+        return nueva
+
+    def volcar(self) -> bytes:
+        """El mapa de bits tal cual (filas de bytes_por_fila bytes)."""
+        return bytes(self._bits)
+
+    def cargar_volcado(self, datos: bytes) -> None:
+        if len(datos) != self.bytes_por_fila * self.alto:
+            raise ValueError("El volcado no corresponde al tamaño de la capa")
+        self._usuarios[0] -= 1
+        self._bits = bytearray(datos)
+        self._usuarios = [1]
+        self._activas = self.recontar()
+
+    def _antes_de_escribir(self) -> None:
+        if self._usuarios[0] > 1:
+            self._usuarios[0] -= 1
+            self._bits = bytearray(self._bits)
+            self._usuarios = [1]
+
+    def contar_no_vacias(self) -> int:
+        return self._activas
+
+    def contar(self, indice: int) -> int:
+        return self._activas if indice else 0
+
+    def histograma(self) -> Dict[int, int]:
+        return {1: self._activas} if self._activas else {}
+
+    def fila(self, y: int, x0: int = 0, x1: Optional[int] = None) -> array:
+        bits = self._fila_entero(y) >> x0
+        fin = self.ancho if x1 is None else x1
+        return array('H', ((bits >> x) & 1 for x in range(fin - x0)))
+
+    def celdas_no_vacias(self) -> Iterator[Tuple[int, int, int]]:
+        for x, y in self.celdas_activas():
+            yield x, y, 1
+
+    # ------------------------------------------------------------------
+    # Operaciones en bloque
+    # ------------------------------------------------------------------
+    def escribir_lote(
+        self,
+        indices: Iterable[int],
+        valores: Union[int, array]
+    ) -> Tuple[array, array]:
+        """
+        Igual que en las capas de tiles: índices planos, valores 0/1. Los
+        tramos de índices consecutivos se escriben como rangos de bits de
+        cada fila, con operaciones de enteros.
+        """
+        if not isinstance(indices, array):
+            indices = array('I', indices)
+        cambiados, anteriores = array('I'), array('H')
+        unico = isinstance(valores, int)
+        valor = 1 if unico and valores else 0
+        n = self.bytes_por_fila
+        for k, inicio, largo in _tramos(indices):
+            fin = inicio + largo
+            while inicio < fin:
+                y, x0 = divmod(inicio, self.ancho)
+                x1 = min(self.ancho, x0 + fin - inicio)
+                b0, b1 = x0 >> 3, (x1 + 7) >> 3
+                corrimiento = x0 - b0 * 8
+                mascara = ((1 << (x1 - x0)) - 1) << corrimiento
+                if unico:
+                    bits = mascara if valor else 0
+                else:
+                    celdas = bytes(map(bool, valores[k:k + x1 - x0]))
+                    bits = _bits_de(celdas) << corrimiento
+                desde = y * n
+                antes = _a_entero(self._bits[desde + b0:desde + b1])
+                despues = (antes & ~mascara) | bits
+                diferencia = antes ^ despues
+                if diferencia:
+                    self._antes_de_escribir()
+                    self._bits[desde + b0:desde + b1] = despues.to_bytes(b1 - b0, 'little')
+                    self._activas += _popcount(despues) - _popcount(antes)
+                    base = y * self.ancho + b0 * 8
+                    if diferencia == mascara:
+                        # Cambió todo el tramo (un relleno o su undo)
+                        cambiados.extend(range(base + corrimiento, base + corrimiento + x1 - x0))
+                        if unico:
+                            anteriores.extend(array('H', [1 - valor]) * (x1 - x0))
+                        else:
+                            anteriores.extend(celdas.translate(_INVERTIR))
+                    else:
+                        while diferencia:
+                            bajo = diferencia & -diferencia
+                            j = bajo.bit_length() - 1
+                            cambiados.append(base + j)
+                            anteriores.append((antes >> j) & 1)
+                            diferencia ^= bajo
+                k += x1 - x0
+                inicio += x1 - x0
+        return cambiados, anteriores
+
+    def llenar_rectangulo(self, x0: int, y0: int, x1: int, y1: int, valor: int) -> Tuple[array, array]:
+        """Activa o desactiva [x0, x1) x [y0, y1) y devuelve las celdas que cambiaron."""
+        cambiados, anteriores = array('I'), array('H')
+        valor = 1 if valor else 0
+        antes = {y: self._fila_entero(y) for y in range(max(0, y0), min(self.alto, y1))}
+        self._operar_rectangulo(x0, y0, x1, y1, 'activar' if valor else 'desactivar')
+        for y, bits_antes in antes.items():
+            diferencia = bits_antes ^ self._fila_entero(y)
+            while diferencia:
+                bajo = diferencia & -diferencia
+                cambiados.append(y * self.ancho + bajo.bit_length() - 1)
+                diferencia ^= bajo
+        anteriores.extend(array('H', [1 - valor]) * len(cambiados))
+        return cambiados, anteriores
+
+    def _fila_entero(self, y: int) -> int:
+        inicio = y * self.bytes_por_fila
+        return _a_entero(self._bits[inicio:inicio + self.bytes_por_fila])
+
+    def _operar_rectangulo(self, x0: int, y0: int, x1: int, y1: int, operacion: str) -> int:
+        # Recorta al mapa; x1/y1 son exclusivos
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.ancho, x1), min(self.alto, y1)
+        if x0 >= x1 or y0 >= y1:
+            return 0
+
+        self._antes_de_escribir()
+        b0 = x0 >> 3
+        b1 = (x1 + 7) >> 3
+        mascara = ((1 << (x1 - x0)) - 1) << (x0 - b0 * 8)
+        cambios = 0
+
+        for y in range(y0, y1):
+            inicio = y * self.bytes_por_fila
+            antes = _a_entero(self._bits[inicio + b0:inicio + b1])
+            if operacion == 'activar':
+                despues = antes | mascara
+            elif operacion == 'desactivar':
+                despues = antes & ~mascara
+            else:
+                despues = antes ^ mascara
+            if despues != antes:
+                self._bits[inicio + b0:inicio + b1] = despues.to_bytes(b1 - b0, 'little')
+                cambios += _popcount(despues ^ antes)
+                self._activas += _popcount(despues) - _popcount(antes)
+        return cambios
+
+    def activar_rectangulo(self, x0: int, y0: int, x1: int, y1: int) -> int:
+        """Activa las celdas [x0, x1) x [y0, y1). Devuelve cuántas cambiaron."""
+        return self._operar_rectangulo(x0, y0, x1, y1, 'activar')
+
+    def desactivar_rectangulo(self, x0: int, y0: int, x1: int, y1: int) -> int:
+        return self._operar_rectangulo(x0, y0, x1, y1, 'desactivar')
+
+    def alternar_rectangulo(self, x0: int, y0: int, x1: int, y1: int) -> int:
+        return self._operar_rectangulo(x0, y0, x1, y1, 'alternar')
+
+    def _operar_mascara(self, mascara: 'CapaColision', operacion: str) -> int:
+        if (mascara.ancho, mascara.alto) != (self.ancho, self.alto):
+            raise ValueError("La máscara debe tener las mismas dimensiones que la capa")
+
+        self._antes_de_escribir()
+        antes = _a_entero(self._bits)
+        otra = _a_entero(mascara._bits)
+        if operacion == 'activar':
+            despues = antes | otra
+        elif operacion == 'desactivar':
+            despues = antes & ~otra
+        else:
+            despues = antes ^ otra
+
+        if despues == antes:
+            return 0
+        self._bits = bytearray(despues.to_bytes(len(self._bits), 'little'))
+        self._activas = _popcount(despues)
+        return _popcount(despues ^ antes)
+
+    def activar_mascara(self, mascara: 'CapaColision') -> int:
+        """Activa todas las celdas activas de la máscara. Devuelve cuántas cambiaron."""
+        return self._operar_mascara(mascara, 'activar')
+
+    def desactivar_mascara(self, mascara: 'CapaColision') -> int:
+        return self._operar_mascara(mascara, 'desactivar')
+
+    def alternar_mascara(self, mascara: 'CapaColision') -> int:
+        return self._operar_mascara(mascara, 'alternar')
+
+    def recontar(self) -> int:
+        """Popcount completo del mapa de bits (para verificar el contador)."""
+        return _popcount(_a_entero(self._bits))
+
+    def celdas_activas(self) -> Iterator[Tuple[int, int]]:
+        """Recorre (x, y) de las celdas activas, saltando filas vacías."""
+        n = self.bytes_por_fila
+        for y in range(self.alto):
+            inicio = y * n
+            fila = self._bits[inicio:inicio + n]
+            if not any(fila):
+                continue
+            bits = _a_entero(fila)
+            while bits:
+                bajo = bits & -bits
+                yield bajo.bit_length() - 1, y
+                bits ^= bajo
+
+    def rectangulos(self) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Cubre las celdas activas con rectángulos (x0, y0, x1, y1), exclusivos.
+        Las filas consecutivas idénticas se juntan, así una región
+        rectangular sale como un solo rectángulo.
+        """
+        n = self.bytes_por_fila
+        y = 0
+        while y < self.alto:
+            fila = self._bits[y * n:(y + 1) * n]
+            y_fin = y + 1
+            while y_fin < self.alto and self._bits[y_fin * n:(y_fin + 1) * n] == fila:
+                y_fin += 1
+            if any(fila):
+                bits = _a_entero(fila)
+                while bits:
+                    x0 = (bits & -bits).bit_length() - 1
+                    resto = bits >> x0
+                    largo = (~resto & (resto + 1)).bit_length() - 1
+                    yield x0, y, x0 + largo, y_fin
+                    bits &= ~(((1 << largo) - 1) << x0)
+            y = y_fin
+
+    def a_matriz(self) -> List[List[bool]]:
+        """Lista de filas de bool (formato de los archivos .json)."""
+        matriz = []
+        for y in range(self.alto):
+            bits = self._fila_entero(y)
+            matriz.append([bool((bits >> x) & 1) for x in range(self.ancho)])
+        return matriz
+
+    def cargar_matriz(self, matriz: List[List[bool]]) -> None:
+        """Reemplaza el contenido con una lista de filas de bool/0/1."""
+        self.limpiar()
+        for y, fila in enumerate(matriz[:self.alto]):
+            bits = 0
+            for x, valor in enumerate(fila[:self.ancho]):
+                if valor:
+                    bits |= 1 << x
+            if bits:
+                inicio = y * self.bytes_por_fila
+                self._bits[inicio:inicio + self.bytes_por_fila] = bits.to_bytes(self.bytes_por_fila, 'little')
+                self._activas += _popcount(bits)
+
+    def __repr__(self) -> str:
+        return f"CapaColision({self.ancho}x{self.alto}, {self._activas} activas)"
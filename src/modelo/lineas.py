@@ -0,0 +1,55 @@
+"""
+Rasterización de trazos: las celdas que pisa el mouse entre dos muestras.
+
+El mouse no avisa de cada celda por la que pasa, solo de algunas
+posiciones; si se pinta solo en esas, un arrastre rápido deja huecos.
+Con Bresenham se completa el segmento entre cada par de muestras.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+
+Celda = Tuple[int, int]
+
+
+def linea_celdas(x0: int, y0: int, x1: int, y1: int) -> List[Celda]:
+    """Celdas del segmento de (x0, y0) a (x1, y1), extremos incluidos (Bresenham)."""
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    paso_x = 1 if x0 < x1 else -1
+    paso_y = 1 if y0 < y1 else -1
+    error = dx + dy
+    celdas = []
+    while True:
+        celdas.append((x0, y0))
+        if x0 == x1 and y0 == y1:
+            return celdas
+        doble = 2 * error
+        if doble >= dy:
+            error += dy
+            x0 += paso_x
+        if doble <= dx:
+            error += dx
+            y0 += paso_y
+
+
+def celdas_del_trazo(puntos: Iterable[Celda], anterior: Optional[Celda] = None) -> List[Celda]:
+    """
+    Celdas que recorre el trazo que pasa por puntos, en orden y sin repetir.
+    anterior: último punto ya pintado (el segmento desde él se incluye,
+    pero no la celda misma).
+    """
+    celdas = []
+    vistas = set()
+    if anterior is not None:
+        vistas.add(anterior)
+    for punto in puntos:
+        if anterior is None:
+            segmento = [punto]
+        else:
+            segmento = linea_celdas(anterior[0], anterior[1], punto[0], punto[1])
+        for celda in segmento:
+            if celda not in vistas:
+                vistas.add(celda)
+                celdas.append(celda)
+        anterior = punto
+    return celdas
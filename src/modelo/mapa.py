@@ -1,10 +1,29 @@
 import copy
-import os
-from typing import Optional, Dict, List, Tuple, Any
-from sistema.undo_redo import GestorUndoRedo, Accion
-from copy import deepcopy
+import weakref
+from array import array
+from types import MappingProxyType
+from typing import Optional, Dict, List, Tuple, Any, Iterable, Callable
+from sistema.undo_redo import GestorUndoRedo, Accion, SIN_VALOR
+from .capas import PaletaTiles, CapaTiles, CapaChunks, VACIO
+from .colision import CapaColision
+from .relleno import calcular_relleno
+from .recursos import registro_recursos
+
+_SIN_PROPIEDADES = MappingProxyType({})
+
+# frame_actual, tiempo_por_frame, ultimo_cambio
+_ANIMACION_DEFAULT = (0, 200, 0)
+
 
 class Tile:
+
+    # Sin __dict__: frames, propiedades y el estado de animación se crean
+    # solo cuando alguien los usa (la mayoría de los tiles no los necesita)
+    __slots__ = (
+        'tipo', 'color', 'sprite', 'tiene_colision', 'animado',
+        '_frames', '_propiedades', '_animacion',
+        '_clave', '_congelado', '__weakref__'
+    )
     
     def __init__(
             self,
@@ -14,18 +33,67 @@ class Tile:
             tiene_colision: bool = False,
             animado: bool = False
     ):
+        # Los tiles internados (ver RegistroTiles) se comparten entre muchas
+        # celdas, así que quedan congelados: para cambiarlos hay que clonarlos
+        object.__setattr__(self, '_congelado', False)
+
         self.tipo = tipo
         self.sprite = sprite
         self.color = color if color is not None else self._obtener_color_default()
         self.tiene_colision = tiene_colision
         self.animado = animado
 
-        self.frames = []
-        self.frame_actual = 0
-        self.tiempo_por_frame = 200
-        self.ultimo_cambio = 0
+        self._frames = None
+        self._propiedades = None
+        self._animacion = None
+
+    @property
+    def frames(self) -> List[str]:
+        if self._frames is None:
+            self._frames = []
+        return self._frames
+
+    @frames.setter
+    def frames(self, valor: List[str]) -> None:
+        self._frames = valor
 
-        self.propiedades = {}
+    @property
+    def propiedades(self) -> Dict[str, Any]:
+        if self._propiedades is None:
+            self._propiedades = {}
+        return self._propiedades
+
+    @propiedades.setter
+    def propiedades(self, valor: Dict[str, Any]) -> None:
+        self._propiedades = valor
+
+    def _obtener_animacion(self, i: int) -> int:
+        if self._animacion is None:
+            return _ANIMACION_DEFAULT[i]
+        return self._animacion[i]
+
+    def _establecer_animacion(self, i: int, valor: int) -> None:
+        if self._animacion is None:
+            self._animacion = list(_ANIMACION_DEFAULT)
+        self._animacion[i] = valor
+
+    frame_actual = property(
+        lambda self: self._obtener_animacion(0),
+        lambda self, valor: self._establecer_animacion(0, valor)
+    )
+    def _establecer_tiempo_por_frame(self, valor: int) -> None:
+        # Es parte del contenido (clave de la paleta, archivo), no estado de la animación
+        self._verificar_mutable()
+        self._establecer_animacion(1, valor)
+
+    tiempo_por_frame = property(
+        lambda self: self._obtener_animacion(1),
+        _establecer_tiempo_por_frame
+    )
+    ultimo_cambio = property(
+        lambda self: self._obtener_animacion(2),
+        lambda self, valor: self._establecer_animacion(2, valor)
+    )
     
     def _obtener_color_default(self) -> str:
         colores = {
@@ -49,7 +117,8 @@ class Tile:
         return colores.get(self.tipo, '#FFFFFF')
     
     def tiene_sprite(self) -> bool:
-        return self.sprite is not None and os.path.exists(self.sprite)
+        # Sin os.path.exists: se llama por cada celda al redibujar
+        return self.sprite is not None and registro_recursos.existe(self.sprite)
     
     def obtener_sprite_path(self) -> Optional[str]:
         if self.tiene_sprite():
@@ -57,16 +126,56 @@ class Tile:
         return None
     
     def establecer_sprite(self, ruta: str) -> bool:
-        if os.path.exists(ruta):
+        self._verificar_mutable()
+        if registro_recursos.info(ruta, verificar=True).existe:
             self.sprite = ruta
             return True
         return False
     
     def establecer_propiedad(self, clave: str, valor: Any) -> None:
+        self._verificar_mutable()
         self.propiedades[clave] = valor
 
     def obtener_propiedad(self, clave: str, default: Any = None) -> Any:
-        return self.propiedades.get(clave, default)
+        if not self._propiedades:
+            return default
+        return self._propiedades.get(clave, default)
+
+    def con_propiedad(self, clave: str, valor: Any) -> 'Tile':
+        """Copy-on-write: devuelve el tile internado igual a este pero con la propiedad cambiada."""
+        tile = self.clonar()
+        tile.propiedades[clave] = valor
+        return registro_tiles.internar(tile)
+
+    @property
+    def congelado(self) -> bool:
+        return self._congelado
+
+    def _verificar_mutable(self) -> None:
+        if self._congelado:
+            raise AttributeError(
+                f"El tile '{self.tipo}' es compartido e inmutable; usa clonar() o con_propiedad()"
+            )
+
+    def _congelar(self) -> None:
+        self._frames = tuple(self._frames) if self._frames else ()
+        if self._propiedades:
+            self._propiedades = MappingProxyType(copy.deepcopy(dict(self._propiedades)))
+        else:
+            self._propiedades = _SIN_PROPIEDADES
+        self._clave = self.clave_contenido()
+        self._congelado = True
+
+    def __setattr__(self, nombre: str, valor: Any) -> None:
+        if getattr(self, '_congelado', False):
+            self._verificar_mutable()
+        object.__setattr__(self, nombre, valor)
+
+    def __copy__(self) -> 'Tile':
+        return self if self._congelado else self.clonar()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'Tile':
+        return self if self._congelado else self.clonar()
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -75,8 +184,9 @@ class Tile:
             'sprite': self.sprite,
             'colision': self.tiene_colision,
             'animado': self.animado,
-            'frames': self.frames,
-            'propiedades': self.propiedades
+            'frames': list(self._frames or ()),
+            'tiempo_por_frame': self.tiempo_por_frame,
+            'propiedades': dict(self._propiedades or {})
         }
     
     @classmethod
@@ -88,10 +198,29 @@ class Tile:
             tiene_colision=datos.get('colision', False),
             animado=datos.get('animado', False)
         )
-        tile.frames = datos.get('frames', [])
-        tile.propiedades = datos.get('propiedades', {})
+        tile._frames = datos.get('frames') or None
+        tile._propiedades = datos.get('propiedades') or None
+        # Los archivos viejos no lo tienen
+        tiempo = datos.get('tiempo_por_frame', _ANIMACION_DEFAULT[1])
+        if tiempo != _ANIMACION_DEFAULT[1]:
+            tile.tiempo_por_frame = tiempo
         return tile
     
+    def clave_contenido(self) -> Tuple[Any, ...]:
+        """Clave que identifica el contenido completo del tile (para la paleta)."""
+        if self._congelado:
+            return self._clave
+        return (
+            self.tipo,
+            self.color,
+            self.sprite,
+            self.tiene_colision,
+            self.animado,
+            tuple(self._frames or ()),
+            self.tiempo_por_frame,
+            repr(sorted(self._propiedades.items())) if self._propiedades else ''
+        )
+
     def clonar(self) -> 'Tile':
         tile_nuevo = Tile(
             tipo=self.tipo,
@@ -100,8 +229,12 @@ class Tile:
             tiene_colision=self.tiene_colision,
             animado=self.animado
         )
-        tile_nuevo.frames = self.frames.copy()
-        tile_nuevo.propiedades = copy.deepcopy(self.propiedades)
+        if self._frames:
+            tile_nuevo._frames = list(self._frames)
+        if self.tiempo_por_frame != _ANIMACION_DEFAULT[1]:
+            tile_nuevo.tiempo_por_frame = self.tiempo_por_frame
+        if self._propiedades:
+            tile_nuevo._propiedades = copy.deepcopy(dict(self._propiedades))
         return tile_nuevo
     
     def __repr__(self) -> str:
@@ -117,11 +250,54 @@ class Tile:
             self.color == otro.color and
             self.tiene_colision == otro.tiene_colision
         )
-    
+
+    def __hash__(self) -> int:
+        # Mismos campos que __eq__
+        return hash((self.tipo, self.color, self.tiene_colision))
+
+
+class RegistroTiles:
+    """
+    Registro de tiles internados (flyweight).
+
+    Para cada contenido distinto existe una sola instancia congelada que se
+    comparte entre todas las celdas y todos los mapas. Las entradas se
+    liberan solas cuando ya nadie las usa.
+    """
+
+    def __init__(self):
+        self._tiles = weakref.WeakValueDictionary()
+
+    def internar(self, tile: Tile) -> Tile:
+        if tile.congelado:
+            return tile
+
+        clave = tile.clave_contenido()
+        compartido = self._tiles.get(clave)
+        if compartido is None:
+            compartido = tile.clonar()
+            compartido._congelar()
+            self._tiles[clave] = compartido
+        return compartido
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+
+registro_tiles = RegistroTiles()
 
 class Mapa:
+
+    # A partir de este número de celdas conviene usar capas dispersas
+    CELDAS_MAX_DENSO = 1024 * 1024
     
-    def __init__(self, ancho: int, alto: int, tamano_tile: int = 32):
+    def __init__(
+            self,
+            ancho: int,
+            alto: int,
+            tamano_tile: int = 32,
+            disperso: bool = False
+    ):
         if ancho <= 0 or alto <= 0:
             raise ValueError(f"Dimensiones inválidas: {ancho}x{alto}")
         if tamano_tile <= 0:
@@ -130,17 +306,24 @@ class Mapa:
         self.ancho = ancho
         self.alto = alto
         self.tamano_tile = tamano_tile
+        self.disperso = disperso
 
-        # Creación de capas del mapa
+        # Creación de capas del mapa: cada celda es un índice en la paleta.
+        # Con disperso=True las capas se guardan en chunks que solo existen
+        # donde hay algo pintado. La colisión es un mapa de bits (1 bit/celda).
+        self.paleta = PaletaTiles(registro_tiles)
         self.capas = {
-            'fondo': [[None for _ in range(ancho)] for _ in range(alto)],
-            'decoracion': [[None for _ in range(ancho)] for _ in range(alto)],
-            'objetos': [[None for _ in range(ancho)] for _ in range(alto)],
-            'colision': [[False for _ in range(ancho)] for _ in range(alto)]
+            'fondo': self._crear_capa(),
+            'decoracion': self._crear_capa(),
+            'objetos': self._crear_capa(),
+            'colision': CapaColision(ancho, alto)
         }
+        self.spawn_points = []
 
         self.capa_activa = 'fondo'
         self.undo_redo = GestorUndoRedo()
+        # Funciones oyente(capa, indices) a las que se avisa qué celdas cambiaron
+        self._oyentes = []
         
         # Metadata del mapa
         self.metadata = {
@@ -151,6 +334,15 @@ class Mapa:
             'ruta_assets': 'assets/'
         }
 
+    @property
+    def colisiones(self) -> CapaColision:
+        return self.capas['colision']
+
+    def _crear_capa(self):
+        if self.disperso:
+            return CapaChunks(self.ancho, self.alto)
+        return CapaTiles(self.ancho, self.alto)
+
     def colocar_tile(
             self,
             x: int,
@@ -161,24 +353,184 @@ class Mapa:
         if not self._validar_coordenadas(x, y):
             raise ValueError(f"Coordenadas fuera del mapa: ({x}, {y})")
         
-        capa = capa or self.capa_activa
+        capa = self._validar_capa(capa)
+        valor = self._valor_celda(capa, tile)
+        anterior = self.capas[capa].establecer(x, y, valor)
+        if anterior != valor:
+            self._registrar_celda(x, y, capa, anterior, valor)
+    
+    def establecer_colision(self, x: int, y: int, estado: bool) -> bool:
+        """Marca o desmarca la colisión de la celda (con undo). Devuelve el estado anterior."""
+        if not self._validar_coordenadas(x, y):
+            raise ValueError(f"Coordenadas fuera del mapa: ({x}, {y})")
+        
+        valor = 1 if estado else VACIO
+        anterior = self.colisiones.establecer(x, y, valor)
+        if anterior != valor:
+            self._registrar_celda(x, y, 'colision', anterior, valor)
+        return anterior != VACIO
+    
+    def alternar_colision(self, x: int, y: int) -> bool:
+        """Invierte la colisión de la celda (con undo). Devuelve el estado nuevo."""
+        return not self.establecer_colision(x, y, not self.colisiones.obtener(x, y))
+    
+    def agregar_oyente(self, oyente: Callable[[str, Optional[Iterable[int]]], None]) -> None:
+        """
+        oyente(capa, indices) se llama después de cada cambio de celdas, con
+        los índices planos (y * ancho + x) que cambiaron, o indices=None si
+        cambió la capa entera. Sirve para redibujar solo lo necesario.
+        """
+        if oyente not in self._oyentes:
+            self._oyentes.append(oyente)
 
-        capa = self.capa_activa
-        tile_anterior = deepcopy(self.capas[capa][y][x])
-        self.capas[capa][y][x] = deepcopy(tile)
+    def quitar_oyente(self, oyente: Callable[[str, Optional[Iterable[int]]], None]) -> None:
+        if oyente in self._oyentes:
+            self._oyentes.remove(oyente)
 
-            # Registrar acción para deshacer
-        accion = Accion('colocar_tile', (x, y, capa, tile_anterior))
-        self.undo_redo.registrar_accion(accion)
-        
+    def notificar_cambio(self, capa: str, indices: Optional[Iterable[int]] = None) -> None:
+        for oyente in self._oyentes:
+            oyente(capa, indices)
+
+    def _registrar_celda(self, x: int, y: int, capa: str, anterior: int, valor: int) -> None:
+        # Dentro de un trazo la celda se suma al delta del trazo
+        if self.undo_redo.trazo is not None:
+            if self._oyentes:
+                self.notificar_cambio(capa, (y * self.ancho + x,))
+            self.undo_redo.trazo.anotar(capa, y * self.ancho + x, anterior, valor)
+        else:
+            self._registrar_delta(capa, array('I', [y * self.ancho + x]), array('H', [anterior]), valor)
+    
+    def colocar_region(
+            self,
+            x: int,
+            y: int,
+            ancho: int,
+            alto: int,
+            tile: Optional[Tile],
+            capa: Optional[str] = None
+    ) -> int:
+        """
+        Rellena el rectángulo (x, y, ancho, alto) con el tile (recortado al mapa).
+        Registra una sola acción de undo. Devuelve cuántas celdas cambiaron.
+        """
+        capa = self._validar_capa(capa)
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.ancho, x + ancho), min(self.alto, y + alto)
+        if x0 >= x1 or y0 >= y1:
+            return 0
+
+        valor = self._valor_celda(capa, tile)
+        cambios = self.capas[capa].llenar_rectangulo(x0, y0, x1, y1, valor)
+        return self._registrar_lote(capa, cambios, valor)
+
+    def colocar_mascara(
+            self,
+            mascara: CapaColision,
+            tile: Optional[Tile],
+            capa: Optional[str] = None
+    ) -> int:
+        """Coloca el tile en todas las celdas activas de la máscara (un mapa de bits del tamaño del mapa)."""
+        capa = self._validar_capa(capa)
+        if (mascara.ancho, mascara.alto) != (self.ancho, self.alto):
+            raise ValueError(
+                f"Máscara de {mascara.ancho}x{mascara.alto} para un mapa de {self.ancho}x{self.alto}"
+            )
+
+        # Se escribe por rectángulos (slices) en vez de celda por celda
+        destino = self.capas[capa]
+        valor = self._valor_celda(capa, tile)
+        cambiados, anteriores = array('I'), array('H')
+        for x0, y0, x1, y1 in mascara.rectangulos():
+            cambiados_tramo, anteriores_tramo = destino.llenar_rectangulo(x0, y0, x1, y1, valor)
+            cambiados.extend(cambiados_tramo)
+            anteriores.extend(anteriores_tramo)
+        return self._registrar_lote(capa, (cambiados, anteriores), valor)
+
+    def rellenar(
+            self,
+            x: int,
+            y: int,
+            tile: Optional[Tile],
+            capa: Optional[str] = None,
+            conectividad: int = 4,
+            limites: Optional[Tuple[int, int, int, int]] = None
+    ) -> int:
+        """
+        Flood fill desde (x, y): reemplaza la región conectada de celdas del
+        mismo tipo que la inicial. Registra una sola acción de undo.
+        Devuelve cuántas celdas cambiaron.
+        """
+        capa = self._validar_capa(capa)
+        if not self._validar_coordenadas(x, y):
+            raise ValueError(f"Coordenadas fuera del mapa: ({x}, {y})")
+
+        inicial = self.capas[capa].obtener(x, y)
+        if capa == 'colision' or inicial == VACIO:
+            valores = {inicial}
+        else:
+            # Igual que antes se compara por tipo: cualquier entrada de la paleta con ese tipo
+            tipo = self.paleta.obtener_tile(inicial).tipo
+            if tile is not None and tile.tipo == tipo:
+                return 0
+            valores = {indice for indice, t in self.paleta if t.tipo == tipo}
+
+        mascara = calcular_relleno(self.capas[capa], x, y, valores, conectividad, limites)
+        return self.colocar_mascara(mascara, tile, capa)
+
+    def colocar_lote(
+            self,
+            celdas: Iterable[Tuple[int, int, Optional[Tile]]],
+            capa: Optional[str] = None
+    ) -> int:
+        """
+        Coloca muchos (x, y, tile) de una vez. Valida todo antes de escribir
+        (si una coordenada está fuera no se escribe nada).
+        """
+        capa = self._validar_capa(capa)
+        celdas = list(celdas)
+        for x, y, _ in celdas:
+            if not self._validar_coordenadas(x, y):
+                raise ValueError(f"Coordenadas fuera del mapa: ({x}, {y})")
+
+        # Si una celda se repite gana la última escritura (así el undo guarda
+        # un solo valor anterior por celda)
+        ultimos = {y * self.ancho + x: self._valor_celda(capa, tile) for x, y, tile in celdas}
+        indices = array('I', ultimos.keys())
+        valores = array('H', ultimos.values())
+        cambios = self.capas[capa].escribir_lote(indices, valores)
+        nuevos = array('H', (ultimos[i] for i in cambios[0]))
+        return self._registrar_lote(capa, cambios, nuevos)
+
+    def _validar_capa(self, capa: Optional[str]) -> str:
+        capa = capa or self.capa_activa
         if capa not in self.capas:
             raise ValueError(f"Capa inválida: {capa}")
-        
+        return capa
+
+    def _valor_celda(self, capa: str, tile: Any) -> int:
         if capa == 'colision':
-            self.capas[capa][y][x] = bool(tile) if tile is not None else False
+            return 1 if tile else VACIO
+        return self.paleta.obtener_id(tile)
+
+    def _registrar_lote(self, capa: str, cambios: Tuple[array, array], nuevos: Any) -> int:
+        """nuevos: el valor escrito en todas las celdas o un array con uno por celda cambiada."""
+        cambiados, anteriores = cambios
+        if cambiados:
+            self._registrar_delta(capa, cambiados, anteriores, nuevos)
+        return len(cambiados)
+
+    def _registrar_delta(self, capa: str, indices: array, anteriores: array, nuevos: Any) -> None:
+        self.notificar_cambio(capa, indices)
+        # Todo cambio queda como delta compacto: dentro del trazo abierto o
+        # como un trazo de una sola operación (el mismo formato que el diario)
+        if self.undo_redo.trazo is None:
+            # Una sola operación ya tiene cada celda una vez
+            if isinstance(nuevos, int):
+                nuevos = array('H', [nuevos]) * len(indices)
+            self.undo_redo.registrar_accion(Accion('trazo', [(capa, indices, anteriores, nuevos)]))
         else:
-            self.capas[capa][y][x] = tile
-    
+            self.undo_redo.trazo.anotar_lote(capa, indices, anteriores, nuevos)
+
     def obtener_tile(self, x: int, y: int, capa: str) -> Optional[Tile]:
         if not self._validar_coordenadas(x, y):
             return None
@@ -186,7 +538,46 @@ class Mapa:
         if capa not in self.capas:
             return None
         
-        return self.capas[capa][y][x]
+        return self._leer(x, y, capa)
+
+    def _leer(self, x: int, y: int, capa: str) -> Any:
+        return self._desde_valor(capa, self.capas[capa].obtener(x, y))
+
+    def _desde_valor(self, capa: str, valor: int) -> Any:
+        # Inverso de _valor_celda: bool en la colisión, Tile (o None) en el resto
+        if capa == 'colision':
+            return valor != VACIO
+        return self.paleta.obtener_tile(valor)
+
+    def _asignar(self, x: int, y: int, capa: str, tile: Any) -> Any:
+        """Escribe una celda sin validar ni registrar undo. Devuelve el valor anterior."""
+        valor = self._valor_celda(capa, tile)
+        anterior = self.capas[capa].establecer(x, y, valor)
+        if anterior != valor and self._oyentes:
+            self.notificar_cambio(capa, (y * self.ancho + x,))
+        return self._desde_valor(capa, anterior)
+
+    def obtener_matriz(self, nombre_capa: str) -> List[List[Any]]:
+        """Devuelve la capa como lista de filas (Tile/None, o bool en colisión)."""
+        capa = self.capas[nombre_capa]
+        if nombre_capa == 'colision':
+            return capa.a_matriz()
+
+        tiles = self.paleta.obtener_tile
+        return [[tiles(valor) for valor in capa.fila(y)] for y in range(self.alto)]
+
+    def establecer_matriz(self, nombre_capa: str, matriz: List[List[Any]]) -> None:
+        """Carga una capa completa desde una lista de filas, sin registrar undo."""
+        if nombre_capa == 'colision':
+            self.colisiones.cargar_matriz(matriz)
+        else:
+            capa = self.capas[nombre_capa]
+            capa.limpiar()
+            for y, fila in enumerate(matriz[:self.alto]):
+                for x, valor in enumerate(fila[:self.ancho]):
+                    if valor:
+                        capa.establecer(x, y, self._valor_celda(nombre_capa, valor))
+        self.notificar_cambio(nombre_capa)
     
     def _validar_coordenadas(self, x: int, y: int) -> bool:
         return 0 <= x < self.ancho and 0 <= y < self.alto
@@ -209,30 +600,61 @@ class Mapa:
         }
 
         self.spawn_points.append(spawn)
+        self.undo_redo.registrar_accion(Accion('agregar_spawn', spawn))
         return True
 
     def eliminar_spawn_point(self, x: int, y: int) -> bool:
-        inicial = len(self.spawn_points) 
-        self.spawn_points = [
-            sp for sp in self.spawn_points
-            if not (sp['x'] == x and sp['y'] == y)
+        eliminados = [
+            (i, sp) for i, sp in enumerate(self.spawn_points)
+            if sp['x'] == x and sp['y'] == y
         ]
-        return len(self.spawn_points) < inicial
+        if not eliminados:
+            return False
+        for i, _ in reversed(eliminados):
+            del self.spawn_points[i]
+        self.undo_redo.registrar_accion(Accion('eliminar_spawns', eliminados))
+        return True
     
     def limpiar_capa(self, nombre_capa: str) -> bool:
         if nombre_capa not in self.capas:
             return False
         
+        anterior = self.capas[nombre_capa]
+        if anterior.contar_no_vacias() == 0:
+            return True
+        # Se cambia la capa entera por una vacía (deshacer vuelve a poner la anterior)
         if nombre_capa == 'colision':
-            self.capas[nombre_capa] = [
-                [False for _ in range(self.ancho)]
-                for _ in range(self.alto)
-            ]
+            nueva = CapaColision(self.ancho, self.alto)
         else:
-            self.capas[nombre_capa] = [
-                [None for _ in range(self.ancho)]
-                for _ in range(self.alto)
-            ]
+            nueva = self._crear_capa()
+        self.capas[nombre_capa] = nueva.clonar()
+        self.notificar_cambio(nombre_capa)
+        self.undo_redo.registrar_accion(Accion('cambiar_capa', (nombre_capa, anterior, nueva)))
+        return True
+
+    def establecer_metadata(self, clave: str, valor: Any) -> bool:
+        """Cambia un dato del mapa (nombre, autor, ...) con undo. False si no cambió."""
+        anterior = self.metadata.get(clave, SIN_VALOR)
+        if anterior == valor:
+            return False
+        self.metadata[clave] = valor
+        self.undo_redo.registrar_accion(Accion('metadata', (clave, anterior, valor)))
+        return True
+
+    def establecer_propiedad_celda(
+        self,
+        x: int,
+        y: int,
+        clave: str,
+        valor: Any,
+        capa: Optional[str] = None
+    ) -> bool:
+        """Cambia una propiedad solo en esta celda (copy-on-write del tile compartido)."""
+        capa = capa or self.capa_activa
+        tile = self.obtener_tile(x, y, capa)
+        if tile is None or capa == 'colision':
+            return False
+        self.colocar_tile(x, y, tile.con_propiedad(clave, valor), capa)
         return True
     
     def cambiar_capa_activa(self, nombre_capa: str) -> bool:
@@ -250,23 +672,46 @@ class Mapa:
             'capas': len(self.capas)
         }
 
-        # Conteo de tiles por capa
-        for nombre_capa, matriz in self.capas.items():
-            if nombre_capa == 'colision':
-                count = sum(1 for fila in matriz for col in fila if col)
-                stats['tiles_colision'] = count
-            else:
-                count = sum(1 for fila in matriz for tile in fila if tile is not None)
-                stats[f'tiles_{nombre_capa}'] = count
+        # Conteo de tiles por capa (los contadores se mantienen en cada escritura)
+        for nombre_capa, capa in self.capas.items():
+            stats[f'tiles_{nombre_capa}'] = capa.contar_no_vacias()
         return stats
+
+    def obtener_histograma(self, nombre_capa: str) -> Dict[str, int]:
+        """Cantidad de celdas por tipo de tile en la capa."""
+        histograma = {}
+        if nombre_capa == 'colision':
+            return histograma
+        for indice, cantidad in self.capas[nombre_capa].histograma().items():
+            tipo = self.paleta.obtener_tile(indice).tipo
+            histograma[tipo] = histograma.get(tipo, 0) + cantidad
+        return histograma
+
+    def obtener_estadisticas_capa(self, nombre_capa: str) -> Dict[str, Any]:
+        """Celdas ocupadas, celdas con tiles que colisionan e histograma por tipo."""
+        capa = self.capas[nombre_capa]
+        if nombre_capa == 'colision':
+            con_colision = capa.contar_no_vacias()
+        else:
+            con_colision = sum(
+                cantidad for indice, cantidad in capa.histograma().items()
+                if self.paleta.obtener_tile(indice).tiene_colision
+            )
+        return {
+            'no_vacias': capa.contar_no_vacias(),
+            'con_colision': con_colision,
+            'histograma': self.obtener_histograma(nombre_capa)
+        }
     
     def clonar(self) -> 'Mapa':
-        """Crea una copia del mapa."""
-        nuevo_mapa = Mapa(self.ancho, self.alto, self.tamano_tile)
-        nuevo_mapa.capas = copy.deepcopy(self.capas)
+        """Crea una copia del mapa en O(1): las capas se copian al escribirlas (copy-on-write)."""
+        nuevo_mapa = copy.copy(self)
+        # La paleta solo crece, así que ambos mapas pueden compartirla
+        nuevo_mapa.capas = {nombre: capa.clonar() for nombre, capa in self.capas.items()}
         nuevo_mapa.spawn_points = copy.deepcopy(self.spawn_points)
         nuevo_mapa.metadata = self.metadata.copy()
-        nuevo_mapa.capa_activa = self.capa_activa
+        nuevo_mapa.undo_redo = GestorUndoRedo()
+        nuevo_mapa._oyentes = []
         return nuevo_mapa
     
     def __repr__(self) -> str:
@@ -345,7 +790,7 @@ def crear_tile_desde_config(tipo: str) -> Tile:
     config = TILES_CONFIG[tipo]
 
     sprite_path = config['sprite']
-    if not os.path.exists(sprite_path):
+    if not registro_recursos.existe(sprite_path):
         sprite_path = None
     
     return Tile(
@@ -1,12 +1,18 @@
 #OBJETOS DECORATIVOS E INTERACTIVOS DEL MAPA
 
 import copy
-import os
 from typing import Optional, Dict, List, Any, Tuple  # ← AGREGAR Tuple aquí
+from .recursos import registro_recursos
 
 
 class Objeto:
 
+    # Sin __dict__: los mapas con muchos objetos son los que más memoria usan
+    __slots__ = (
+        'nombre', 'x', 'y', 'tipo', 'sprite', 'color', 'tiene_colision',
+        'ancho', 'alto', '_propiedades', 'visible', 'rotacion'
+    )
+
     def __init__(
         self, 
         nombre: str, 
@@ -27,10 +33,21 @@ class Objeto:
         self.ancho = 1
         self.alto = 1
         
-        self.propiedades = {}
+        # Se crea al primer uso
+        self._propiedades = None
         
         self.visible = True
         self.rotacion = 0
+
+    @property
+    def propiedades(self) -> Dict[str, Any]:
+        if self._propiedades is None:
+            self._propiedades = {}
+        return self._propiedades
+
+    @propiedades.setter
+    def propiedades(self, valor: Dict[str, Any]) -> None:
+        self._propiedades = valor
     
     def _obtener_color_por_tipo(self) -> str:
         colores = {
@@ -46,10 +63,10 @@ class Objeto:
         return colores.get(self.tipo, '#FFFFFF')
     
     def tiene_sprite(self) -> bool:
-        return self.sprite is not None and os.path.exists(self.sprite)
+        return self.sprite is not None and registro_recursos.existe(self.sprite)
     
     def establecer_sprite(self, ruta: str) -> bool:
-        if os.path.exists(ruta):
+        if registro_recursos.info(ruta, verificar=True).existe:
             self.sprite = ruta
             return True
         return False
@@ -66,7 +83,9 @@ class Objeto:
         self.propiedades[clave] = valor
     
     def obtener_propiedad(self, clave: str, default: Any = None) -> Any:
-        return self.propiedades.get(clave, default)
+        if not self._propiedades:
+            return default
+        return self._propiedades.get(clave, default)
     
     def cambiar_tamaño(self, ancho: int, alto: int) -> bool:
         if ancho > 0 and alto > 0:
@@ -104,7 +123,7 @@ class Objeto:
             'alto': self.alto,
             'visible': self.visible,
             'rotacion': self.rotacion,
-            'propiedades': self.propiedades
+            'propiedades': self._propiedades if self._propiedades is not None else {}
         }
     
     @classmethod
@@ -123,7 +142,7 @@ class Objeto:
         obj.alto = datos.get('alto', 1)
         obj.visible = datos.get('visible', True)
         obj.rotacion = datos.get('rotacion', 0)
-        obj.propiedades = datos.get('propiedades', {})
+        obj._propiedades = datos.get('propiedades') or None
         
         return obj
     
@@ -136,7 +155,8 @@ class Objeto:
         nuevo.alto = self.alto
         nuevo.visible = self.visible
         nuevo.rotacion = self.rotacion
-        nuevo.propiedades = copy.deepcopy(self.propiedades)
+        if self._propiedades:
+            nuevo._propiedades = copy.deepcopy(self._propiedades)
         return nuevo
     
     def __repr__(self) -> str:
@@ -283,7 +303,7 @@ def crear_objeto_desde_config(tipo: str, x: int, y: int) -> Objeto:
     obj = Objeto(config['nombre'], x, y, config['tipo'])
     
     sprite_path = config.get('sprite')
-    if sprite_path and os.path.exists(sprite_path):
+    if registro_recursos.existe(sprite_path):
         obj.sprite = sprite_path
     
     obj.color = config['color']
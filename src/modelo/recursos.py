@@ -0,0 +1,88 @@
+"""
+Registro de recursos (sprites) compartido por todo el proceso.
+
+Tile.tiene_sprite() y Objeto.tiene_sprite() se llaman al redibujar cada
+celda, así que no pueden hacer un os.path.exists cada vez. El registro
+hace un solo os.stat por ruta y guarda si existe, el tamaño y el mtime.
+Las entradas se actualizan solo cuando se pide: reescanear() vuelve a
+mirar todas las rutas conocidas, invalidar() las olvida e
+info(ruta, verificar=True) comprueba una sola.
+"""
+
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+
+class InfoRecurso(NamedTuple):
+    ruta: str
+    ruta_absoluta: str
+    existe: bool
+    tamano: int
+    mtime: float
+
+
+class RegistroRecursos:
+    """Caché de os.stat por ruta de sprite."""
+
+    def __init__(self):
+        self._info: Dict[str, InfoRecurso] = {}
+        self._lock = threading.Lock()
+        # Sube cada vez que cambia algún recurso (sirve de clave para cachés de imágenes)
+        self.version = 0
+        self.consultas_disco = 0
+
+    def _leer_disco(self, ruta: str) -> InfoRecurso:
+        self.consultas_disco += 1
+        absoluta = os.path.abspath(ruta)
+        try:
+            estado = os.stat(absoluta)
+        except OSError:
+            return InfoRecurso(ruta, absoluta, False, 0, 0.0)
+        return InfoRecurso(ruta, absoluta, True, estado.st_size, estado.st_mtime)
+
+    def info(self, ruta: str, verificar: bool = False) -> InfoRecurso:
+        """Datos de la ruta; solo toca el disco la primera vez (o con verificar=True)."""
+        info = self._info.get(ruta)
+        if info is None or verificar:
+            nueva = self._leer_disco(ruta)
+            with self._lock:
+                if nueva != info:
+                    self._info[ruta] = nueva
+                    if info is not None:
+                        self.version += 1
+            info = nueva
+        return info
+
+    def existe(self, ruta: Optional[str]) -> bool:
+        if not ruta:
+            return False
+        info = self._info.get(ruta)
+        if info is None:
+            info = self.info(ruta)
+        return info.existe
+
+    def reescanear(self) -> List[str]:
+        """Vuelve a mirar en disco todas las rutas conocidas. Devuelve las que cambiaron."""
+        cambiadas = []
+        for ruta in list(self._info):
+            anterior = self._info[ruta]
+            if self.info(ruta, verificar=True) != anterior:
+                cambiadas.append(ruta)
+        return cambiadas
+
+    def invalidar(self, ruta: Optional[str] = None) -> None:
+        """Olvida una ruta (o todas); la próxima consulta vuelve a ir al disco."""
+        with self._lock:
+            if ruta is None:
+                self._info.clear()
+            else:
+                self._info.pop(ruta, None)
+            self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._info)
+
+
+# Registro global de recursos
+registro_recursos = RegistroRecursos()
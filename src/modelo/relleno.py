@@ -0,0 +1,133 @@
+"""
+Motor de relleno (flood fill) por tramos (scanline).
+
+En vez de apilar cada celda con sus cuatro vecinos, se rellena una fila
+entera de una vez (el tramo de celdas iguales que contiene al punto) y
+solo se apila una semilla por cada tramo vecino de las filas de arriba y
+de abajo. Cada fila se convierte a un bytearray de 0/1 ("celda
+disponible"), así los bordes de los tramos se buscan con find/rfind (en C).
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .colision import CapaColision
+
+
+Limites = Tuple[int, int, int, int]
+
+
+def _tablas(valores: Iterable[int]) -> List[Tuple[bytes, bytes]]:
+    """
+    Tablas de translate para reconocer los valores (uint16) byte a byte.
+    Se agrupan por byte alto: con una paleta de menos de 256 tiles hay una sola.
+    """
+    por_alto: Dict[int, set] = {}
+    for valor in valores:
+        por_alto.setdefault(valor >> 8, set()).add(valor & 0xFF)
+
+    tablas = []
+    for alto, bajos in por_alto.items():
+        tabla_alto = bytes(1 if b == alto else 0 for b in range(256))
+        tabla_bajo = bytes(1 if b in bajos else 0 for b in range(256))
+        tablas.append((tabla_bajo, tabla_alto))
+    return tablas
+
+
+def _coincidencias(fila: array, tablas: List[Tuple[bytes, bytes]], x0: int, x1: int) -> bytearray:
+    """bytearray con 1 en las celdas de la fila cuyo valor está en las tablas (solo en [x0, x1))."""
+    crudo = fila.tobytes()
+    if sys.byteorder == 'little':
+        bajos, altos = crudo[0::2], crudo[1::2]
+    else:
+        altos, bajos = crudo[0::2], crudo[1::2]
+
+    resultado = 0
+    for tabla_bajo, tabla_alto in tablas:
+        resultado |= (int.from_bytes(bajos.translate(tabla_bajo), 'little')
+                      & int.from_bytes(altos.translate(tabla_alto), 'little'))
+
+    ancho = len(fila)
+    disponibles = bytearray(resultado.to_bytes(ancho, 'little'))
+    if x0 > 0:
+        disponibles[:x0] = bytes(x0)
+    if x1 < ancho:
+        disponibles[x1:] = bytes(ancho - x1)
+    return disponibles
+
+
+def calcular_relleno(
+    capa,
+    x: int,
+    y: int,
+    valores: Optional[Iterable[int]] = None,
+    conectividad: int = 4,
+    limites: Optional[Limites] = None
+) -> CapaColision:
+    """
+    Calcula la región conectada a (x, y) sin modificar la capa.
+
+    capa: cualquier capa con ancho, alto, obtener(x, y) y fila(y).
+    valores: índices que forman la región (por defecto el de la celda inicial).
+    conectividad: 4 u 8 vecinos.
+    limites: (x0, y0, x1, y1) con x1/y1 exclusivos; el relleno no sale de ahí.
+
+    Devuelve la máscara de celdas rellenadas como CapaColision.
+    """
+    if conectividad not in (4, 8):
+        raise ValueError(f"Conectividad inválida: {conectividad}")
+
+    ancho, alto = capa.ancho, capa.alto
+    x0, y0, x1, y1 = limites if limites else (0, 0, ancho, alto)
+    x0, y0 = max(0, x0), max(0, y0)
+    x1, y1 = min(ancho, x1), min(alto, y1)
+
+    mascara = CapaColision(ancho, alto)
+    if not (x0 <= x < x1 and y0 <= y < y1):
+        return mascara
+
+    if valores is None:
+        valores = (capa.obtener(x, y),)
+    tablas = _tablas(valores)
+
+    # Las filas se convierten la primera vez que el relleno llega a ellas
+    filas: Dict[int, bytearray] = {}
+
+    def disponibles(fy: int) -> bytearray:
+        fila = filas.get(fy)
+        if fila is None:
+            fila = filas[fy] = _coincidencias(capa.fila(fy), tablas, x0, x1)
+        return fila
+
+    extra = 1 if conectividad == 8 else 0
+    pendientes = [(x, y)]
+    while pendientes:
+        sx, sy = pendientes.pop()
+        fila = disponibles(sy)
+        if not fila[sx]:
+            continue
+
+        # Extender el tramo a izquierda y derecha
+        inicio = fila.rfind(0, 0, sx) + 1
+        fin = fila.find(0, sx)
+        if fin == -1:
+            fin = ancho
+        fila[inicio:fin] = bytes(fin - inicio)
+        mascara.activar_rectangulo(inicio, sy, fin, sy + 1)
+
+        # Una semilla por tramo disponible en las filas vecinas
+        a, b = max(x0, inicio - extra), min(x1, fin + extra)
+        for ny in (sy - 1, sy + 1):
+            if not y0 <= ny < y1:
+                continue
+            vecina = disponibles(ny)
+            i = vecina.find(1, a, b)
+            while i != -1:
+                pendientes.append((i, ny))
+                j = vecina.find(0, i, b)
+                if j == -1:
+                    break
+                i = vecina.find(1, j, b)
+
+    return mascara
@@ -0,0 +1,347 @@
+"""
+Árbol de undo: historial que no pierde las ramas abandonadas.
+
+Con las pilas, hacer algo nuevo después de deshacer borra el redo. En el
+árbol cada acción es un nodo hijo del estado en que se hizo, así
+que deshacer y pintar otra cosa deja la edición anterior como rama
+hermana, y se puede volver a ella con ir_a().
+
+Cada INTERVALO_SNAPSHOT niveles el nodo guarda un clon de las capas
+(copy-on-write, clonar es O(1)). Para saltar a un nodo se elige lo más
+barato entre:
+  - caminar: deshacer hasta el ancestro común y rehacer hasta el destino;
+  - restaurar el snapshot del ancestro más cercano del destino y aplicar
+    los deltas que faltan (a lo sumo INTERVALO_SNAPSHOT - 1).
+Los snapshots solo tienen las capas: las acciones que no tocan capas
+(spawns, metadata) se deshacen y rehacen siempre por el camino. La raíz
+siempre tiene snapshot, también cuando recortar() la baja un nivel.
+"""
+
+import heapq
+
+from .undo_redo import COMANDOS
+
+
+INTERVALO_SNAPSHOT = 32
+
+
+class _EstadoCapas:
+    """Capas sueltas con lo que usan los comandos que tocan capas (sin avisos)."""
+
+    def __init__(self, capas):
+        self.capas = capas
+
+    def notificar_cambio(self, capa, indices=None):
+        pass
+
+
+class NodoUndo:
+    """Un estado del mapa: la acción que lleva a él desde el padre."""
+
+    __slots__ = ('id', 'padre', 'accion', 'hijos', 'hijo_activo',
+                 'profundidad', 'snapshot', 'tamano')
+
+    def __init__(self, id, padre, accion, profundidad):
+        self.id = id
+        self.padre = padre
+        # Accion (None en la raíz)
+        self.accion = accion
+        self.hijos = []
+        # Hijo por el que sigue el redo (el último visitado)
+        self.hijo_activo = None
+        self.profundidad = profundidad
+        # capa -> clon de la capa en este estado (solo cada tanto)
+        self.snapshot = None
+        self.tamano = accion.tamano() if accion else 0
+
+    def __repr__(self):
+        return f"NodoUndo({self.id}, profundidad={self.profundidad})"
+
+
+class ArbolUndo:
+
+    def __init__(self, mapa, intervalo=INTERVALO_SNAPSHOT):
+        self.mapa = mapa
+        self.intervalo = max(1, intervalo)
+        self.nodos = {}
+        self._siguiente_id = 0
+        self.bytes_deltas = 0
+        self.bytes_snapshots = 0
+
+        # La raíz es el estado actual, siempre con snapshot
+        self.raiz = self._crear_nodo(None, None, 0)
+        self._tomar_snapshot(self.raiz)
+        self.actual = self.raiz
+
+    # ------------------------------------------------------------------
+    # Nodos
+
+    def _crear_nodo(self, padre, accion, profundidad):
+        nodo = NodoUndo(self._siguiente_id, padre, accion, profundidad)
+        self._siguiente_id += 1
+        self.nodos[nodo.id] = nodo
+        self.bytes_deltas += nodo.tamano
+        return nodo
+
+    def _tomar_snapshot(self, nodo, desde=None):
+        """
+        Clona las capas del mapa, que tiene que estar en el estado de nodo.
+        Con desde (el padre de nodo, con snapshot) se arma sin tocar el
+        mapa: el snapshot del padre más la acción de nodo.
+        """
+        if desde is None:
+            nodo.snapshot = {nombre: capa.clonar() for nombre, capa in self.mapa.capas.items()}
+        else:
+            estado = _EstadoCapas({nombre: capa.clonar() for nombre, capa in desde.snapshot.items()})
+            if self._toca_capas(nodo):
+                COMANDOS[nodo.accion.tipo].rehacer(estado, nodo.accion.datos)
+            nodo.snapshot = estado.capas
+        self.bytes_snapshots += self._bytes_snapshot(nodo)
+
+    @staticmethod
+    def _bytes_snapshot(nodo):
+        # Cuando el mapa vuelve a escribir, la capa se separa del clon y
+        # el snapshot pasa a costar una copia entera de cada capa
+        if nodo.snapshot is None:
+            return 0
+        return sum(capa.bytes_datos() for capa in nodo.snapshot.values())
+
+    def agregar(self, accion):
+        """Registra una acción ya aplicada al mapa como hijo del nodo actual."""
+        padre = self.actual
+        nodo = self._crear_nodo(padre, accion, padre.profundidad + 1)
+        padre.hijos.append(nodo)
+        padre.hijo_activo = nodo
+        if nodo.profundidad % self.intervalo == 0:
+            self._tomar_snapshot(nodo)
+        self.actual = nodo
+        return nodo
+
+    def agregar_raiz(self, accion):
+        """
+        Agrega un nodo por encima de la raíz: accion es la que lleva del
+        nuevo estado raíz a la raíz actual (p. ej. leída del diario).
+        """
+        vieja = self.raiz
+        nueva = self._crear_nodo(None, None, vieja.profundidad - 1)
+        vieja.padre = nueva
+        vieja.accion = accion
+        vieja.tamano = accion.tamano()
+        self.bytes_deltas += vieja.tamano
+        nueva.hijos.append(vieja)
+        nueva.hijo_activo = vieja
+        self.raiz = nueva
+        return nueva
+
+    def __len__(self):
+        return len(self.nodos)
+
+    def memoria_usada(self):
+        return self.bytes_deltas + self.bytes_snapshots
+
+    # ------------------------------------------------------------------
+    # Movimiento
+
+    def _aplicar(self, nodo, hacia_atras):
+        accion = nodo.accion
+        comando = COMANDOS[accion.tipo]
+        if hacia_atras:
+            comando.deshacer(self.mapa, accion.datos)
+        else:
+            comando.rehacer(self.mapa, accion.datos)
+
+    @staticmethod
+    def _toca_capas(nodo):
+        return COMANDOS[nodo.accion.tipo].capas
+
+    def _restaurar(self, nodo):
+        # Se clona el snapshot para que quede intacto al seguir editando
+        for nombre, capa in nodo.snapshot.items():
+            self.mapa.capas[nombre] = capa.clonar()
+            self.mapa.notificar_cambio(nombre)
+
+    def subir(self):
+        """Deshace el nodo actual. Devuelve el nodo deshecho (o None en la raíz)."""
+        nodo = self.actual
+        if nodo.padre is None:
+            return None
+        self._aplicar(nodo, hacia_atras=True)
+        nodo.padre.hijo_activo = nodo
+        self.actual = nodo.padre
+        return nodo
+
+    def bajar(self):
+        """Rehace por el hijo activo. Devuelve el nodo rehecho (o None)."""
+        nodo = self.actual.hijo_activo
+        if nodo is None:
+            return None
+        self._aplicar(nodo, hacia_atras=False)
+        self.actual = nodo
+        return nodo
+
+    def ancestro_comun(self, a, b):
+        while a.profundidad > b.profundidad:
+            a = a.padre
+        while b.profundidad > a.profundidad:
+            b = b.padre
+        while a is not b:
+            a, b = a.padre, b.padre
+        return a
+
+    def _snapshot_mas_cercano(self, nodo):
+        """Ancestro (o el mismo nodo) con snapshot y la lista de nodos hasta nodo."""
+        camino = []
+        while nodo is not None and nodo.snapshot is None:
+            camino.append(nodo)
+            nodo = nodo.padre
+        camino.reverse()
+        return nodo, camino
+
+    def ruta(self, destino):
+        """
+        Nodos a deshacer (desde el actual hacia arriba) y a rehacer (hacia
+        abajo hasta destino) para pasar del estado actual a destino.
+        """
+        comun = self.ancestro_comun(self.actual, destino)
+        subida = []
+        nodo = self.actual
+        while nodo is not comun:
+            subida.append(nodo)
+            nodo = nodo.padre
+        bajada = []
+        nodo = destino
+        while nodo is not comun:
+            bajada.append(nodo)
+            nodo = nodo.padre
+        bajada.reverse()
+        return subida, bajada
+
+    def ir_a(self, destino):
+        """
+        Lleva el mapa al estado del nodo destino (nodo o id). Cuesta a lo
+        sumo un snapshot restaurado más intervalo - 1 deltas.
+        Devuelve (subida, bajada) como ruta(), para quien tenga que
+        reflejar el salto (el diario).
+        """
+        if not isinstance(destino, NodoUndo):
+            destino = self.nodos[destino]
+        subida, bajada = self.ruta(destino)
+
+        base, camino = self._snapshot_mas_cercano(destino)
+        if base is not None and len(camino) < len(subida) + len(bajada):
+            # Lo que no está en los snapshots va por el camino
+            for nodo in subida:
+                if not self._toca_capas(nodo):
+                    self._aplicar(nodo, hacia_atras=True)
+            for nodo in bajada:
+                if not self._toca_capas(nodo):
+                    self._aplicar(nodo, hacia_atras=False)
+            self._restaurar(base)
+            for nodo in camino:
+                if self._toca_capas(nodo):
+                    self._aplicar(nodo, hacia_atras=False)
+        else:
+            for nodo in subida:
+                self._aplicar(nodo, hacia_atras=True)
+            for nodo in bajada:
+                self._aplicar(nodo, hacia_atras=False)
+
+        # El redo desde cualquier punto del camino sigue hacia destino
+        for nodo in subida:
+            nodo.padre.hijo_activo = nodo
+        for nodo in bajada:
+            nodo.padre.hijo_activo = nodo
+        self.actual = destino
+        return subida, bajada
+
+    def punta(self, nodo):
+        """Último estado de la rama que empieza en nodo (siguiendo el redo)."""
+        while nodo.hijo_activo is not None:
+            nodo = nodo.hijo_activo
+        return nodo
+
+    def rama_siguiente(self):
+        """
+        Punta de la rama hermana más cercana (para comparar dos ediciones
+        alternativas), o None si el camino actual no tiene bifurcaciones.
+        """
+        hijo, nodo = self.actual, self.actual.padre
+        while nodo is not None:
+            if len(nodo.hijos) > 1:
+                i = nodo.hijos.index(hijo)
+                return self.punta(nodo.hijos[(i + 1) % len(nodo.hijos)])
+            hijo, nodo = nodo, nodo.padre
+        return None
+
+    def ramas(self):
+        """Puntas de todas las ramas (hojas del árbol), de la más nueva a la más vieja."""
+        hojas = [nodo for nodo in self.nodos.values() if not nodo.hijos]
+        hojas.sort(key=lambda nodo: nodo.id, reverse=True)
+        return hojas
+
+    # ------------------------------------------------------------------
+    # Memoria
+
+    def _quitar(self, nodo):
+        del self.nodos[nodo.id]
+        self.bytes_deltas -= nodo.tamano
+        self.bytes_snapshots -= self._bytes_snapshot(nodo)
+        nodo.snapshot = None
+
+    def recortar(self, presupuesto_bytes):
+        """
+        Suelta historial mientras se pase del presupuesto: primero las
+        ramas abandonadas (las hojas más viejas fuera del camino actual),
+        después la raíz, que baja hacia el nodo actual.
+        """
+        if self.memoria_usada() <= presupuesto_bytes:
+            return
+
+        # Se conserva el camino desde la raíz y lo que se puede rehacer
+        camino = set()
+        nodo = self.actual
+        while nodo is not None:
+            camino.add(nodo)
+            nodo = nodo.padre
+        nodo = self.actual.hijo_activo
+        while nodo is not None:
+            camino.add(nodo)
+            nodo = nodo.hijo_activo
+
+        # Montículo de hojas fuera del camino, la más vieja primero
+        hojas = [(n.id, n) for n in self.nodos.values() if not n.hijos and n not in camino]
+        heapq.heapify(hojas)
+        while hojas and self.memoria_usada() > presupuesto_bytes:
+            _, hoja = heapq.heappop(hojas)
+            padre = hoja.padre
+            padre.hijos.remove(hoja)
+            if padre.hijo_activo is hoja:
+                padre.hijo_activo = padre.hijos[-1] if padre.hijos else None
+            self._quitar(hoja)
+            # El padre puede haber quedado como hoja abandonada
+            if not padre.hijos and padre not in camino:
+                heapq.heappush(hojas, (padre.id, padre))
+
+        # Lo que queda es el camino (más lo que aún no hizo falta soltar)
+        while self.raiz is not self.actual and self.memoria_usada() > presupuesto_bytes:
+            vieja = self.raiz
+            siguiente = next(h for h in vieja.hijos if h in camino)
+            for otro in vieja.hijos:
+                if otro is not siguiente:
+                    self._quitar_rama(otro)
+            # La raíz nueva necesita snapshot para que ir_a siga acotado
+            if siguiente.snapshot is None:
+                self._tomar_snapshot(siguiente, desde=vieja)
+            self._quitar(vieja)
+            self.bytes_deltas -= siguiente.tamano
+            siguiente.padre = None
+            siguiente.accion = None
+            siguiente.tamano = 0
+            self.raiz = siguiente
+
+    def _quitar_rama(self, nodo):
+        pendientes = [nodo]
+        while pendientes:
+            nodo = pendientes.pop()
+            pendientes.extend(nodo.hijos)
+            self._quitar(nodo)
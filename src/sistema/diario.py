@@ -0,0 +1,419 @@
+"""
+Diario de cambios en disco (journal) para el mapa abierto.
+
+Cada acción del historial que cambia celdas (los trazos y los cambios de
+capa entera, como delta por celdas) se agrega al final de un archivo
+binario, junto con las entradas nuevas de la paleta, las marcas de
+deshacer/rehacer, las de redo descartado (una acción que no va al diario
+igual corta lo que se podía rehacer) y, cada tanto, un checkpoint
+completo del mapa (capas, spawns y metadata). Al guardar el mapa se
+anota una marca de guardado (y si se guardó con otro nombre el diario se
+mueve al nombre nuevo). Así:
+  - el undo puede seguir más allá de lo que quedó en memoria leyendo los
+    deltas del archivo (en memoria solo queda la posición de cada uno);
+  - si el editor se cierra sin guardar, recuperar_mapa() reconstruye el
+    mapa desde el último checkpoint repitiendo lo que vino después (si
+    después de la última marca de guardado no cambió nada, no hay nada
+    que recuperar: ver hay_cambios_sin_guardar()).
+
+Escribir en disco lo hace un hilo aparte: la interfaz solo encola. Si la
+escritura falla el diario se desactiva y se avisa con al_fallar (desde el
+hilo escritor: la interfaz lo conecta a una señal de Qt).
+
+Formato: cabecera (MAGIA, ancho, alto) y después registros
+    [tipo u8][largo u32][datos][crc32 u32]
+Un registro cortado o con crc inválido (el editor se cerró a mitad de
+una escritura) marca el final del diario.
+"""
+
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+
+MAGIA = b'EMD1'
+_CABECERA = struct.Struct('<4sII')
+_REGISTRO = struct.Struct('<BI')
+_CRC = struct.Struct('<I')
+
+PALETA, DELTA, DESHACER, REHACER, CHECKPOINT, TRUNCAR, GUARDADO = 1, 2, 3, 4, 5, 6, 7
+# No es un registro: le pide al hilo escritor que mueva el archivo
+_MOVER = 0
+
+CHECKPOINT_CADA = 200
+
+
+def _little(datos):
+    if sys.byteorder == 'little':
+        return datos.tobytes()
+    copia = array(datos.typecode, datos)
+    copia.byteswap()
+    return copia.tobytes()
+
+
+def _desde_little(typecode, datos):
+    resultado = array(typecode)
+    resultado.frombytes(datos)
+    if sys.byteorder != 'little':
+        resultado.byteswap()
+    return resultado
+
+
+def codificar_delta(delta):
+    """delta: lista de (capa, indices, anteriores, nuevos) como en las acciones 'trazo'."""
+    partes = [struct.pack('<H', len(delta))]
+    for capa, indices, anteriores, nuevos in delta:
+        nombre = capa.encode('utf-8')
+        partes.append(struct.pack('<HI', len(nombre), len(indices)))
+        partes.append(nombre)
+        partes.append(_little(indices))
+        partes.append(_little(anteriores))
+        partes.append(_little(nuevos))
+    return b''.join(partes)
+
+
+def decodificar_delta(datos):
+    (cantidad,) = struct.unpack_from('<H', datos)
+    posicion = 2
+    delta = []
+    for _ in range(cantidad):
+        largo_nombre, n = struct.unpack_from('<HI', datos, posicion)
+        posicion += 6
+        capa = datos[posicion:posicion + largo_nombre].decode('utf-8')
+        posicion += largo_nombre
+        indices = _desde_little('I', datos[posicion:posicion + 4 * n])
+        posicion += 4 * n
+        anteriores = _desde_little('H', datos[posicion:posicion + 2 * n])
+        posicion += 2 * n
+        nuevos = _desde_little('H', datos[posicion:posicion + 2 * n])
+        posicion += 2 * n
+        delta.append((capa, indices, anteriores, nuevos))
+    return delta
+
+
+def _codificar_checkpoint(cursor, mapa):
+    # Un encabezado JSON y después el volcado comprimido de cada capa
+    volcados = [(nombre, zlib.compress(capa.volcar(), 1)) for nombre, capa in mapa.capas.items()]
+    encabezado = json.dumps({
+        'cursor': cursor,
+        'tamano_tile': mapa.tamano_tile,
+        'disperso': mapa.disperso,
+        'spawn_points': mapa.spawn_points,
+        'metadata': mapa.metadata,
+        'capas': [[nombre, len(datos)] for nombre, datos in volcados]
+    }).encode('utf-8')
+    return b''.join([struct.pack('<I', len(encabezado)), encabezado] + [datos for _, datos in volcados])
+
+
+def _leer_registros(archivo):
+    """Recorre (offset, tipo, datos) de los registros válidos del archivo."""
+    while True:
+        offset = archivo.tell()
+        cabecera = archivo.read(_REGISTRO.size)
+        if len(cabecera) < _REGISTRO.size:
+            return
+        tipo, largo = _REGISTRO.unpack(cabecera)
+        datos = archivo.read(largo)
+        crc = archivo.read(_CRC.size)
+        if len(datos) < largo or len(crc) < _CRC.size or _CRC.unpack(crc)[0] != zlib.crc32(datos):
+            return
+        yield offset, tipo, datos
+
+
+class DiarioCambios:
+    """Diario en disco de un mapa. Lo usa GestorUndoRedo (ver usar_diario)."""
+
+    def __init__(self, ruta, mapa, checkpoint_cada=CHECKPOINT_CADA, al_fallar=None, _continuar=None):
+        """al_fallar: función que recibe la excepción si el diario se desactiva."""
+        self.ruta = ruta
+        self.mapa = mapa
+        self.checkpoint_cada = checkpoint_cada
+        self.al_fallar = al_fallar
+        self.error = None
+
+        # Historial lineal: número de cada delta, y el offset donde quedó escrito
+        self.cursor = 0
+        self._historia = []
+        self._posiciones = {}
+        self._siguiente = 0
+        self._paleta_escrita = 0
+        self._desde_checkpoint = 0
+
+        if _continuar is None:
+            carpeta = os.path.dirname(ruta)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            self._archivo = open(ruta, 'wb')
+            self._archivo.write(_CABECERA.pack(MAGIA, mapa.ancho, mapa.alto))
+        else:
+            # Recuperación: seguir escribiendo al final de lo que era válido
+            self.__dict__.update(_continuar['estado'])
+            self._archivo = open(ruta, 'r+b')
+            self._archivo.truncate(_continuar['fin'])
+            self._archivo.seek(_continuar['fin'])
+        self._lector = None
+
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._escribir, name='diario-cambios', daemon=True)
+        self._hilo.start()
+
+        if _continuar is None:
+            self.checkpoint()
+
+    # ------------------------------------------------------------------
+    # Llamado desde la interfaz (solo encola)
+    # ------------------------------------------------------------------
+    def registrar(self, delta):
+        self._anotar_paleta()
+        numero = self._siguiente
+        self._siguiente += 1
+        # Una edición nueva descarta lo que se podía rehacer
+        del self._historia[self.cursor:]
+        self._historia.append(numero)
+        self.cursor += 1
+        self._cola.put((DELTA, numero, delta))
+
+        self._desde_checkpoint += 1
+        if self._desde_checkpoint >= self.checkpoint_cada:
+            self.checkpoint()
+
+    def descartar_rehacer(self):
+        """Una acción que no va al diario también corta lo que se podía rehacer."""
+        if self.cursor < len(self._historia):
+            del self._historia[self.cursor:]
+            self._cola.put((TRUNCAR, None, None))
+
+    def anotar_deshacer(self):
+        self.cursor -= 1
+        self._cola.put((DESHACER, None, None))
+
+    def anotar_rehacer(self):
+        self.cursor += 1
+        self._cola.put((REHACER, None, None))
+
+    def checkpoint(self):
+        """Encola un volcado completo del mapa (el clon es O(1) por copy-on-write)."""
+        self._anotar_paleta()
+        self._cola.put((CHECKPOINT, self.cursor, self.mapa.clonar()))
+        self._desde_checkpoint = 0
+
+    def guardado(self, ruta=None):
+        """
+        El mapa se guardó: checkpoint y marca de guardado. Con ruta (se
+        guardó con otro nombre) el diario pasa a ese archivo.
+        """
+        self.checkpoint()
+        self._cola.put((GUARDADO, None, None))
+        if ruta is not None and ruta != self.ruta:
+            # El lector se vuelve a abrir (con la ruta nueva) en leer_delta
+            if self._lector is not None:
+                self._lector.close()
+                self._lector = None
+            self._cola.put((_MOVER, ruta, None))
+
+    # Con el diario desactivado (error de escritura) ya no se lee más allá
+    # de lo que hay en memoria: puede faltar lo que no llegó a escribirse
+    def puede_deshacer(self):
+        return self.error is None and self.cursor > 0
+
+    def puede_rehacer(self):
+        return self.error is None and self.cursor < len(self._historia)
+
+    def leer_delta(self, posicion):
+        """Lee del archivo el delta en esa posición del historial."""
+        self.sincronizar()
+        offset = self._posiciones.get(self._historia[posicion])
+        if offset is None:
+            raise ValueError(f"El diario no tiene escrita la acción {posicion} ({self.error})")
+        if self._lector is None:
+            self._lector = open(self.ruta, 'rb')
+        self._lector.seek(offset)
+        _, tipo, datos = next(_leer_registros(self._lector))
+        return decodificar_delta(datos)
+
+    def sincronizar(self):
+        """Espera a que el hilo escriba todo lo encolado."""
+        self._cola.join()
+
+    def cerrar(self, borrar=False):
+        self._cola.put(None)
+        self._hilo.join()
+        try:
+            self._archivo.close()
+        finally:
+            if self._lector is not None:
+                self._lector.close()
+            if borrar and os.path.exists(self.ruta):
+                os.remove(self.ruta)
+
+    def _anotar_paleta(self):
+        # Las entradas nuevas de la paleta van antes que los deltas que las usan
+        paleta = self.mapa.paleta
+        while self._paleta_escrita < len(paleta):
+            self._paleta_escrita += 1
+            indice = self._paleta_escrita
+            self._cola.put((PALETA, indice, paleta.obtener_tile(indice)))
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+    def _escribir(self):
+        while True:
+            item = self._cola.get()
+            try:
+                if item is None:
+                    # cerrar() cierra el archivo (y eso lo vacía)
+                    return
+                if self.error is not None:
+                    continue
+
+                tipo, dato, contenido = item
+                if tipo == _MOVER:
+                    self._archivo.close()
+                    os.replace(self.ruta, dato)
+                    self.ruta = dato
+                    self._archivo = open(dato, 'r+b')
+                    self._archivo.seek(0, os.SEEK_END)
+                    continue
+                if tipo == PALETA:
+                    datos = struct.pack('<H', dato) + json.dumps(contenido.to_dict()).encode('utf-8')
+                elif tipo == DELTA:
+                    # Puede venir sin calcular (ver ComandoCambiarCapa.delta)
+                    datos = codificar_delta(contenido() if callable(contenido) else contenido)
+                elif tipo == CHECKPOINT:
+                    datos = _codificar_checkpoint(dato, contenido)
+                else:
+                    datos = b''
+
+                offset = self._archivo.tell()
+                self._archivo.write(_REGISTRO.pack(tipo, len(datos)) + datos + _CRC.pack(zlib.crc32(datos)))
+                if tipo == DELTA:
+                    self._posiciones[dato] = offset
+
+                if tipo == CHECKPOINT or self._cola.empty():
+                    self._archivo.flush()
+                    os.fsync(self._archivo.fileno())
+            except Exception as e:
+                # Sin diario se puede seguir editando; solo se pierde la recuperación
+                self.error = e
+                if self.al_fallar is not None:
+                    self.al_fallar(e)
+            finally:
+                self._cola.task_done()
+
+
+def abrir_diario(mapa, ruta, checkpoint_cada=CHECKPOINT_CADA, al_fallar=None):
+    """Crea un diario nuevo para el mapa y lo conecta a su historial de undo."""
+    diario = DiarioCambios(ruta, mapa, checkpoint_cada, al_fallar)
+    mapa.undo_redo.usar_diario(diario)
+    return diario
+
+
+def hay_cambios_sin_guardar(ruta):
+    """Si el diario tiene cambios después de la última marca de guardado."""
+    with open(ruta, 'rb') as archivo:
+        magia, _, _ = _CABECERA.unpack(archivo.read(_CABECERA.size))
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es un diario de cambios")
+        cambios = False
+        for _, tipo, _ in _leer_registros(archivo):
+            if tipo in (DELTA, DESHACER, REHACER):
+                cambios = True
+            elif tipo == GUARDADO:
+                cambios = False
+    return cambios
+
+
+def recuperar_mapa(ruta, checkpoint_cada=CHECKPOINT_CADA, al_fallar=None):
+    """
+    Reconstruye el mapa de un diario (p. ej. después de un cierre inesperado)
+    y lo deja conectado al mismo diario, con todo el historial para deshacer.
+    """
+    from modelo.mapa import Mapa, Tile
+
+    with open(ruta, 'rb') as archivo:
+        magia, ancho, alto = _CABECERA.unpack(archivo.read(_CABECERA.size))
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es un diario de cambios")
+
+        # Primera pasada: paleta, posiciones de los deltas y último checkpoint
+        paleta = {}
+        eventos = []
+        posiciones = {}
+        checkpoint = None
+        fin = archivo.tell()
+        for offset, tipo, datos in _leer_registros(archivo):
+            fin = archivo.tell()
+            if tipo == PALETA:
+                (indice,) = struct.unpack_from('<H', datos)
+                paleta[indice] = json.loads(datos[2:].decode('utf-8'))
+            elif tipo == DELTA:
+                posiciones[len(posiciones)] = offset
+                eventos.append((DELTA, len(posiciones) - 1))
+            elif tipo in (DESHACER, REHACER, TRUNCAR):
+                eventos.append((tipo, None))
+            elif tipo == CHECKPOINT:
+                checkpoint = (len(eventos), datos)
+
+        if checkpoint is None:
+            raise ValueError(f"{ruta} no tiene ningún checkpoint")
+
+        # El mapa del checkpoint
+        desde, datos = checkpoint
+        (largo,) = struct.unpack_from('<I', datos)
+        encabezado = json.loads(datos[4:4 + largo].decode('utf-8'))
+        mapa = Mapa(ancho, alto, encabezado['tamano_tile'], encabezado['disperso'])
+        for indice in sorted(paleta):
+            if mapa.paleta.obtener_id(Tile.from_dict(paleta[indice])) != indice:
+                raise ValueError("La paleta del diario no es consistente")
+        posicion = 4 + largo
+        for nombre, largo_capa in encabezado['capas']:
+            mapa.capas[nombre].cargar_volcado(zlib.decompress(datos[posicion:posicion + largo_capa]))
+            posicion += largo_capa
+        mapa.spawn_points = encabezado['spawn_points']
+        mapa.metadata.update(encabezado.get('metadata', {}))
+
+        # Segunda pasada: repetir el historial, aplicando lo posterior al checkpoint
+        def delta(numero):
+            archivo.seek(posiciones[numero])
+            return decodificar_delta(next(_leer_registros(archivo))[2])
+
+        historia, cursor = [], 0
+        for i, (tipo, numero) in enumerate(eventos):
+            aplicar = i >= desde
+            if tipo == DELTA:
+                del historia[cursor:]
+                historia.append(numero)
+                cursor += 1
+                if aplicar:
+                    for capa, indices, _, nuevos in delta(numero):
+                        mapa.capas[capa].escribir_lote(indices, nuevos)
+            elif tipo == DESHACER:
+                cursor -= 1
+                if aplicar:
+                    for capa, indices, anteriores, _ in reversed(delta(historia[cursor])):
+                        mapa.capas[capa].escribir_lote(indices, anteriores)
+            elif tipo == REHACER:
+                if aplicar:
+                    for capa, indices, _, nuevos in delta(historia[cursor]):
+                        mapa.capas[capa].escribir_lote(indices, nuevos)
+                cursor += 1
+            else:
+                # Lo que se podía rehacer quedó descartado
+                del historia[cursor:]
+
+    estado = {
+        'cursor': cursor,
+        '_historia': historia,
+        '_posiciones': posiciones,
+        '_siguiente': len(posiciones),
+        '_paleta_escrita': len(mapa.paleta)
+    }
+    diario = DiarioCambios(ruta, mapa, checkpoint_cada, al_fallar, _continuar={'estado': estado, 'fin': fin})
+    mapa.undo_redo.usar_diario(diario)
+    return mapa
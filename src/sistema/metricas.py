@@ -0,0 +1,168 @@
+"""
+Métricas de dibujo del canvas: cuánto se tarda en cada cuadro y en qué.
+
+Por cada cuadro pintado se guarda lo que se acumuló desde el anterior:
+  - modelo: aplicar herramientas y trazos al mapa (incluye los avisos);
+  - reconstruccion: rearmar el dibujo del mapa (dibujar_mapa);
+  - horneado: componer chunks;
+  - pintado: el paintEvent de la vista (incluye los horneados que hace);
+más el tamaño de la región repintada, los ítems de la escena y la tasa de
+aciertos de la caché de pixmaps. Se guardan los últimos VENTANA cuadros
+para sacar percentiles, y se pueden exportar como traza JSON en el
+formato de eventos de Chrome (se abre en chrome://tracing o Perfetto).
+
+Mientras no está activo, medir() no hace nada.
+"""
+
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class MetricasRender:
+
+    VENTANA = 240
+    TIEMPOS = ('modelo_ms', 'reconstruccion_ms', 'horneado_ms', 'pintado_ms')
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, ventana: int = VENTANA):
+        self.activo = False
+        self.cuadros = deque(maxlen=ventana)
+        # Tramos medidos para la traza: (nombre, inicio_us, duracion_us)
+        self._eventos = deque(maxlen=ventana * 16)
+        self._inicio = time.perf_counter()
+        self._pendiente = self._nuevo_pendiente()
+
+    @staticmethod
+    def _nuevo_pendiente() -> Dict[str, float]:
+        return {'modelo_ms': 0.0, 'reconstruccion_ms': 0.0, 'horneado_ms': 0.0, 'chunks_horneados': 0}
+
+    def _us(self, instante: float) -> int:
+        return int((instante - self._inicio) * 1e6)
+
+    def limpiar(self) -> None:
+        self.cuadros.clear()
+        self._eventos.clear()
+        self._pendiente = self._nuevo_pendiente()
+
+    # ------------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------------
+    @contextmanager
+    def medir(self, nombre: str):
+        """Suma la duración del bloque a la métrica nombre ('modelo', 'horneado'...)."""
+        if not self.activo:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, inicio, time.perf_counter())
+
+    def sumar(self, nombre: str, inicio: float, fin: float) -> None:
+        """Anota un tramo medido con time.perf_counter()."""
+        if not self.activo:
+            return
+        self._pendiente[nombre + '_ms'] += (fin - inicio) * 1000
+        if nombre == 'horneado':
+            self._pendiente['chunks_horneados'] += 1
+        self._eventos.append((nombre, self._us(inicio), self._us(fin) - self._us(inicio)))
+
+    def fin_cuadro(
+            self,
+            inicio: float,
+            fin: float,
+            region_px: int = 0,
+            items: int = 0,
+            tasa_aciertos: float = 0.0
+    ) -> Optional[Dict[str, Any]]:
+        """Cierra el cuadro cuyo pintado fue de inicio a fin. Devuelve el registro."""
+        if not self.activo:
+            return None
+        self._eventos.append(('pintado', self._us(inicio), self._us(fin) - self._us(inicio)))
+        cuadro = self._pendiente
+        cuadro['t_ms'] = (fin - self._inicio) * 1000
+        cuadro['pintado_ms'] = (fin - inicio) * 1000
+        cuadro['region_px'] = region_px
+        cuadro['items'] = items
+        cuadro['tasa_aciertos'] = tasa_aciertos
+        self.cuadros.append(cuadro)
+        self._pendiente = self._nuevo_pendiente()
+        return cuadro
+
+    # ------------------------------------------------------------------
+    # Resultados
+    # ------------------------------------------------------------------
+    @staticmethod
+    def percentil(valores: Iterable[float], p: float) -> float:
+        """Percentil p (0-100) por rango más cercano; 0 sin valores."""
+        ordenados = sorted(valores)
+        if not ordenados:
+            return 0.0
+        rango = max(1, -(-len(ordenados) * p // 100))
+        return ordenados[int(rango) - 1]
+
+    def resumen(self) -> Dict[str, Any]:
+        """Percentiles de cada tiempo y promedios del resto, sobre la ventana."""
+        cuadros = list(self.cuadros)
+        resumen: Dict[str, Any] = {'cuadros': len(cuadros)}
+        for metrica in self.TIEMPOS:
+            valores = [c[metrica] for c in cuadros]
+            resumen[metrica] = {f'p{p}': self.percentil(valores, p) for p in self.PERCENTILES}
+            resumen[metrica]['max'] = max(valores, default=0.0)
+        if cuadros:
+            resumen['region_px'] = self.percentil([c['region_px'] for c in cuadros], 50)
+            resumen['items'] = cuadros[-1]['items']
+            resumen['tasa_aciertos'] = cuadros[-1]['tasa_aciertos']
+            resumen['chunks_horneados'] = sum(c['chunks_horneados'] for c in cuadros)
+            duracion = cuadros[-1]['t_ms'] - cuadros[0]['t_ms']
+            resumen['fps'] = (len(cuadros) - 1) * 1000 / duracion if duracion > 0 else 0.0
+        return resumen
+
+    def lineas_overlay(self) -> List[str]:
+        """Texto corto para mostrar sobre el canvas."""
+        r = self.resumen()
+        if not r['cuadros']:
+            return ["Métricas: sin cuadros todavía"]
+        lineas = [f"{r['fps']:.0f} fps  ({r['cuadros']} cuadros)"]
+        for metrica in self.TIEMPOS:
+            valores = r[metrica]
+            lineas.append(
+                f"{metrica[:-3]:<14} p50 {valores['p50']:6.2f}  p95 {valores['p95']:6.2f}  "
+                f"p99 {valores['p99']:6.2f} ms"
+            )
+        lineas.append(
+            f"región {r['region_px']:,} px  ítems {r['items']}  "
+            f"caché {r['tasa_aciertos'] * 100:.0f}%  chunks {r['chunks_horneados']}"
+        )
+        return lineas
+
+    def traza(self) -> Dict[str, Any]:
+        """Traza en formato de eventos de Chrome, con el resumen como metadato."""
+        eventos = [
+            {'name': nombre, 'ph': 'X', 'ts': inicio, 'dur': duracion, 'pid': 1, 'tid': 1}
+            for nombre, inicio, duracion in self._eventos
+        ]
+        # Un contador por cuadro con los números que no son tiempos
+        for cuadro in self.cuadros:
+            eventos.append({
+                'name': 'cuadro', 'ph': 'C', 'ts': int(cuadro['t_ms'] * 1000), 'pid': 1,
+                'args': {
+                    'region_px': cuadro['region_px'],
+                    'items': cuadro['items'],
+                    'chunks_horneados': cuadro['chunks_horneados']
+                }
+            })
+        eventos.sort(key=lambda evento: evento['ts'])
+        return {
+            'traceEvents': eventos,
+            'displayTimeUnit': 'ms',
+            'metadata': {'resumen': self.resumen(), 'cuadros': list(self.cuadros)}
+        }
+
+    def exportar_json(self, ruta: str) -> None:
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.traza(), archivo, indent=1, ensure_ascii=False)
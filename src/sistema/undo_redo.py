@@ -1,159 +1,554 @@
 
 #Sistema de Undo/Redo para el editor.
 
+import sys
+from array import array
+from collections import deque
 from copy import deepcopy
 
 
+def _estimar_bytes(datos):
+    """
+    Tamaño aproximado de los datos de una acción. Los contenedores y arrays
+    cuentan con su tamaño real, y las capas guardadas enteras (cambiar_capa)
+    lo que ocupan sus celdas; lo que referencian (Tiles internados, ints
+    chicos, strings de capa) es compartido y cuenta solo como puntero.
+    """
+    if isinstance(datos, array):
+        return sys.getsizeof(datos)
+    if hasattr(datos, 'bytes_datos'):
+        return datos.bytes_datos()
+    if isinstance(datos, (tuple, list)):
+        return sys.getsizeof(datos) + sum(_estimar_bytes(d) for d in datos)
+    return 0
+
+
 class Accion:
     #Representa una acción que se puede deshacer
     
     def __init__(self, tipo, datos):
         self.tipo = tipo
         self.datos = datos
+        self._tamano = None
+    
+    def tamano(self):
+        """Bytes aproximados que ocupa la acción (se calcula una vez)."""
+        if self._tamano is None:
+            self._tamano = sys.getsizeof(self) + _estimar_bytes(self.datos)
+        return self._tamano
     
     def __repr__(self):
         return f"Accion({self.tipo})"
 
 
+class Trazo:
+    """
+    Cambios de un trazo (de que se aprieta el mouse hasta que se suelta).
+    Por capa guarda arrays paralelos: índice plano de la celda, valor
+    anterior y valor nuevo (índices de paleta, o 0/1 en la colisión).
+    """
+    
+    def __init__(self):
+        self.capas = {}
+    
+    def _arrays(self, capa):
+        if capa not in self.capas:
+            self.capas[capa] = (array('I'), array('H'), array('H'))
+        return self.capas[capa]
+    
+    def anotar(self, capa, indice, anterior, nuevo):
+        indices, anteriores, nuevos = self._arrays(capa)
+        indices.append(indice)
+        anteriores.append(anterior)
+        nuevos.append(nuevo)
+    
+    def anotar_lote(self, capa, indices_lote, anteriores_lote, nuevos_lote):
+        """nuevos_lote es un valor único para todo el lote o uno por celda."""
+        indices, anteriores, nuevos = self._arrays(capa)
+        indices.extend(indices_lote)
+        anteriores.extend(anteriores_lote)
+        if isinstance(nuevos_lote, int):
+            nuevos.extend(array('H', [nuevos_lote]) * len(indices_lote))
+        else:
+            nuevos.extend(nuevos_lote)
+    
+    def compactar(self):
+        """
+        Una entrada (capa, indices, anteriores, nuevos) por capa, con cada
+        celda una sola vez (primer valor anterior, último valor nuevo) y sin
+        las celdas que terminaron igual que al empezar.
+        """
+        delta = []
+        for capa, (indices, anteriores, nuevos) in self.capas.items():
+            if len(set(indices)) != len(indices):
+                primero, ultimo = {}, {}
+                for i, anterior, nuevo in zip(indices, anteriores, nuevos):
+                    primero.setdefault(i, anterior)
+                    ultimo[i] = nuevo
+                indices = array('I', (i for i in ultimo if primero[i] != ultimo[i]))
+                anteriores = array('H', (primero[i] for i in indices))
+                nuevos = array('H', (ultimo[i] for i in indices))
+            if indices:
+                delta.append((capa, indices, anteriores, nuevos))
+        return delta
+
+
+# ----------------------------------------------------------------------
+# Comandos: cómo se deshace y se rehace cada tipo de acción
+# ----------------------------------------------------------------------
+
+COMANDOS = {}
+
+
+def registrar_comando(clase):
+    """Decorador: registra una subclase de Comando para su tipo de acción."""
+    COMANDOS[clase.tipo] = clase()
+    return clase
+
+
+class Comando:
+    """
+    Deshacer/rehacer de un tipo de acción. deshacer() y rehacer() reciben
+    los datos de la acción y los aplican al mapa sin modificarlos.
+    """
+    
+    tipo = None
+    # Si modifica capas (en el árbol de undo los snapshots ya lo cubren)
+    capas = True
+    deshecho = "✅ Acción deshecha"
+    rehecho = "✅ Acción rehecha"
+    
+    def deshacer(self, mapa, datos):
+        raise NotImplementedError
+    
+    def rehacer(self, mapa, datos):
+        raise NotImplementedError
+    
+    def delta(self, datos):
+        """
+        Delta por celdas para el diario (lista de (capa, indices,
+        anteriores, nuevos), o algo que la devuelva al llamarlo), o None
+        si la acción no va al diario.
+        """
+        return None
+
+
+@registrar_comando
+class ComandoTrazo(Comando):
+    """datos: [(capa, indices, anteriores, nuevos), ...]"""
+    
+    tipo = 'trazo'
+    deshecho = "✅ Trazo deshecho"
+    rehecho = "✅ Trazo rehecho"
+    
+    def deshacer(self, mapa, datos):
+        # Una escritura por capa con los valores anteriores
+        for capa, indices, anteriores, _ in reversed(datos):
+            mapa.capas[capa].escribir_lote(indices, anteriores)
+            mapa.notificar_cambio(capa, indices)
+    
+    def rehacer(self, mapa, datos):
+        for capa, indices, _, nuevos in datos:
+            mapa.capas[capa].escribir_lote(indices, nuevos)
+            mapa.notificar_cambio(capa, indices)
+    
+    def delta(self, datos):
+        return datos
+
+
+def _diferencias(nombre, anterior, nueva):
+    """Delta por celdas entre dos versiones de una capa (para el diario)."""
+    indices, anteriores, nuevos = array('I'), array('H'), array('H')
+    ancho = anterior.ancho
+    for y in range(anterior.alto):
+        fila_a, fila_n = anterior.fila(y), nueva.fila(y)
+        if fila_a == fila_n:
+            continue
+        base = y * ancho
+        if fila_n.count(0) == ancho and 0 not in fila_a:
+            # Fila llena que queda vacía (el caso de limpiar una capa)
+            indices.extend(range(base, base + ancho))
+            anteriores.extend(fila_a)
+            nuevos.extend(fila_n)
+            continue
+        for x, (a, n) in enumerate(zip(fila_a, fila_n)):
+            if a != n:
+                indices.append(base + x)
+                anteriores.append(a)
+                nuevos.append(n)
+    return [(nombre, indices, anteriores, nuevos)] if indices else []
+
+
+@registrar_comando
+class ComandoCambiarCapa(Comando):
+    """
+    datos: (capa, anterior, nueva). Cambia la capa entera de una vez (p. ej.
+    limpiarla) sin recorrer celdas. Las dos versiones guardadas no se
+    escriben nunca: al mapa va un clon copy-on-write.
+    """
+    
+    tipo = 'cambiar_capa'
+    deshecho = "✅ Capa restaurada"
+    rehecho = "✅ Capa cambiada otra vez"
+    
+    def deshacer(self, mapa, datos):
+        capa, anterior, _ = datos
+        mapa.capas[capa] = anterior.clonar()
+        mapa.notificar_cambio(capa)
+    
+    def rehacer(self, mapa, datos):
+        capa, _, nueva = datos
+        mapa.capas[capa] = nueva.clonar()
+        mapa.notificar_cambio(capa)
+    
+    def delta(self, datos):
+        # Se calcula en el hilo del diario, no al limpiar
+        return lambda: _diferencias(*datos)
+
+
+@registrar_comando
+class ComandoAgregarSpawn(Comando):
+    """datos: el spawn agregado (queda al final de la lista)."""
+    
+    tipo = 'agregar_spawn'
+    capas = False
+    deshecho = "✅ Spawn quitado"
+    rehecho = "✅ Spawn agregado otra vez"
+    
+    def deshacer(self, mapa, datos):
+        mapa.spawn_points.pop()
+    
+    def rehacer(self, mapa, datos):
+        mapa.spawn_points.append(datos)
+
+
+@registrar_comando
+class ComandoEliminarSpawns(Comando):
+    """datos: [(posición, spawn), ...] en orden creciente de posición."""
+    
+    tipo = 'eliminar_spawns'
+    capas = False
+    deshecho = "✅ Spawns restaurados"
+    rehecho = "✅ Spawns eliminados otra vez"
+    
+    def deshacer(self, mapa, datos):
+        for posicion, spawn in datos:
+            mapa.spawn_points.insert(posicion, spawn)
+    
+    def rehacer(self, mapa, datos):
+        for posicion, _ in reversed(datos):
+            del mapa.spawn_points[posicion]
+
+
+# Marca de "la clave no existía" en los cambios de metadata
+SIN_VALOR = object()
+
+
+@registrar_comando
+class ComandoMetadata(Comando):
+    """datos: (clave, valor anterior o SIN_VALOR, valor nuevo)."""
+    
+    tipo = 'metadata'
+    capas = False
+    deshecho = "✅ Propiedad del mapa restaurada"
+    rehecho = "✅ Propiedad del mapa cambiada otra vez"
+    
+    def deshacer(self, mapa, datos):
+        clave, anterior, _ = datos
+        if anterior is SIN_VALOR:
+            mapa.metadata.pop(clave, None)
+        else:
+            mapa.metadata[clave] = anterior
+    
+    def rehacer(self, mapa, datos):
+        clave, _, nuevo = datos
+        mapa.metadata[clave] = nuevo
+
+
 class GestorUndoRedo:
     
-    def __init__(self, limite=50):
-        self.pila_undo = []
-        self.pila_redo = []
+    PRESUPUESTO_MB = 64
+    
+    def __init__(self, limite=None, presupuesto_mb=PRESUPUESTO_MB):
+        # El historial se limita por memoria; limite (cantidad de acciones) es opcional
+        self.pila_undo = deque()
+        self.pila_redo = deque()
         self.limite = limite
+        self.presupuesto_bytes = int(presupuesto_mb * 1024 * 1024)
+        self.bytes_undo = 0
+        self.bytes_redo = 0
+        # Trazo abierto (entre iniciar_trazo y confirmar_trazo)
+        self.trazo = None
+        # Diario en disco opcional (ver sistema/diario.py)
+        self.diario = None
+        # Árbol de undo opcional (ver sistema/arbol_undo.py)
+        self.arbol = None
     
-    def registrar_accion(self, accion):
-        self.pila_undo.append(accion)
+    def usar_diario(self, diario):
+        """
+        Conecta un diario en disco. El historial en memoria se descarta: a
+        partir de acá cada acción está también en el diario, y cuando las
+        pilas se quedan sin acciones se sigue leyendo del archivo.
+        """
+        self.limpiar()
+        self.diario = diario
+    
+    def usar_arbol(self, mapa, intervalo=None):
+        """
+        Pasa a guardar el historial como árbol: hacer algo nuevo después de
+        deshacer ya no borra el redo, queda como otra rama (ver ir_a).
+        El estado actual del mapa es la raíz.
+        """
+        from .arbol_undo import ArbolUndo, INTERVALO_SNAPSHOT
+        self.pila_undo.clear()
         self.pila_redo.clear()
+        self.bytes_undo = 0
+        self.bytes_redo = 0
+        self.arbol = ArbolUndo(mapa, intervalo or INTERVALO_SNAPSHOT)
+    
+    def iniciar_trazo(self):
+        """A partir de acá los cambios se juntan en una sola acción."""
+        if self.trazo is not None:
+            self.confirmar_trazo()
+        self.trazo = Trazo()
+    
+    def confirmar_trazo(self):
+        """Cierra el trazo y lo registra como una acción (si cambió algo)."""
+        trazo, self.trazo = self.trazo, None
+        if trazo is None:
+            return False
+        delta = trazo.compactar()
+        if not delta:
+            return False
+        self.registrar_accion(Accion('trazo', delta))
+        return True
+    
+    def cancelar_trazo(self):
+        """Descarta lo anotado (no revierte el mapa)."""
+        self.trazo = None
+    
+    def registrar_accion(self, accion):
+        comando = COMANDOS.get(accion.tipo)
+        if comando is None:
+            raise ValueError(f"Tipo de acción desconocido: '{accion.tipo}'")
+        # Lo que se venía pintando va antes en el historial
+        if accion.tipo != 'trazo' and self.trazo is not None:
+            self.confirmar_trazo()
+        
+        if self.arbol is not None:
+            self.arbol.agregar(accion)
+            self.arbol.recortar(self.presupuesto_bytes)
+        else:
+            self.pila_redo.clear()
+            self.bytes_redo = 0
+            self._apilar(self.pila_undo, accion)
+        self._anotar_en_diario(accion)
+    
+    def _anotar_en_diario(self, accion):
+        """Agrega la acción al diario (si no va, igual corta su redo). Devuelve si fue."""
+        if self.diario is None:
+            return False
+        delta = COMANDOS[accion.tipo].delta(accion.datos)
+        if delta is None:
+            self.diario.descartar_rehacer()
+            return False
+        self.diario.registrar(delta)
+        return True
+    
+    def _en_diario(self, accion):
+        return self.diario is not None and COMANDOS[accion.tipo].delta(accion.datos) is not None
+    
+    def _apilar(self, pila, accion):
+        if pila is self.pila_undo:
+            self.bytes_undo += accion.tamano()
+        else:
+            self.bytes_redo += accion.tamano()
+        pila.append(accion)
+        self._recortar()
+    
+    def _desapilar(self, pila):
+        accion = pila.pop()
+        if pila is self.pila_undo:
+            self.bytes_undo -= accion.tamano()
+        else:
+            self.bytes_redo -= accion.tamano()
+        return accion
+    
+    def _recortar(self):
+        """Descarta las acciones más viejas mientras se pase del presupuesto (siempre queda la última)."""
+        while len(self.pila_undo) > 1 and (
+            self.bytes_undo + self.bytes_redo > self.presupuesto_bytes
+            or (self.limite is not None and len(self.pila_undo) > self.limite)
+        ):
+            self.bytes_undo -= self.pila_undo.popleft().tamano()
         
-        if len(self.pila_undo) > self.limite:
-            self.pila_undo.pop(0)
+        # Con diario también se puede soltar lo más lejano del redo (se relee del archivo)
+        while self.diario is not None and len(self.pila_redo) > 1 and (
+            self.bytes_undo + self.bytes_redo > self.presupuesto_bytes
+        ):
+            self.bytes_redo -= self.pila_redo.popleft().tamano()
     
     def puede_deshacer(self):
-        return len(self.pila_undo) > 0
+        if self.arbol is not None:
+            return (self.arbol.actual.padre is not None
+                    or (self.diario is not None and self.diario.puede_deshacer()))
+        if self.pila_undo:
+            return True
+        return self.diario is not None and self.diario.puede_deshacer()
     
     def puede_rehacer(self):
-        return len(self.pila_redo) > 0
+        if self.arbol is not None:
+            return self.arbol.actual.hijo_activo is not None
+        if self.pila_redo:
+            return True
+        return self.diario is not None and self.diario.puede_rehacer()
     
     def deshacer(self, mapa):
+        # Un trazo a medio hacer se cierra antes
+        if self.trazo is not None:
+            self.confirmar_trazo()
+        
         if not self.puede_deshacer():
             return False, "No hay acciones para deshacer"
         
-        accion = self.pila_undo.pop()
+        if self.arbol is not None:
+            return self._deshacer_en_arbol()
         
-        try:
-            if accion.tipo == 'colocar_tile':
-                x, y, capa, tile_anterior = accion.datos
-                
-                # Guardar estado actual para redo
-                tile_actual = mapa.capas[capa][y][x]
-                self.pila_redo.append(
-                    Accion('colocar_tile', (x, y, capa, tile_actual))
-                )
-                
-                # Restaurar estado anterior
-                mapa.capas[capa][y][x] = tile_anterior
-                return True, "✅ Acción deshecha"
-            
-            elif accion.tipo == 'toggle_colision':
-                x, y, estado_anterior = accion.datos
-                
-                estado_actual = mapa.capas['colision'][y][x]
-                self.pila_redo.append(
-                    Accion('toggle_colision', (x, y, estado_actual))
-                )
-                
-                mapa.capas['colision'][y][x] = estado_anterior
-                return True, "✅ Colisión deshecha"
-            
-            elif accion.tipo == 'flood_fill':
-                tiles_modificados = accion.datos
-                capa = mapa.capa_activa
-                
-                tiles_actuales = []
-                for x, y, _ in tiles_modificados:
-                    tile_actual = mapa.capas[capa][y][x]
-                    tiles_actuales.append((x, y, tile_actual))
-                
-                self.pila_redo.append(
-                    Accion('flood_fill', tiles_actuales)
-                )
-                
-                # Restaurar tiles anteriores
-                for x, y, tile_anterior in tiles_modificados:
-                    mapa.capas[capa][y][x] = tile_anterior
-                
-                return True, "✅ Relleno deshecho"
+        if self.pila_undo:
+            accion = self._desapilar(self.pila_undo)
+        else:
+            # Lo que ya no está en memoria se lee del diario
+            try:
+                accion = Accion('trazo', self.diario.leer_delta(self.diario.cursor - 1))
+            except (OSError, ValueError) as e:
+                return False, f"❌ Error al deshacer: {str(e)}"
         
+        comando = COMANDOS[accion.tipo]
+        try:
+            comando.deshacer(mapa, accion.datos)
         except Exception as e:
             return False, f"❌ Error al deshacer: {str(e)}"
+        self._apilar(self.pila_redo, accion)
+        if self._en_diario(accion):
+            self.diario.anotar_deshacer()
+        return True, comando.deshecho
     
     def rehacer(self, mapa):
+        # Un trazo a medio hacer se cierra antes
+        if self.trazo is not None:
+            self.confirmar_trazo()
+        
         if not self.puede_rehacer():
             return False, "No hay acciones para rehacer"
         
-        accion = self.pila_redo.pop()
+        if self.arbol is not None:
+            accion = self.arbol.bajar().accion
+            if self._en_diario(accion):
+                if self.diario.puede_rehacer():
+                    self.diario.anotar_rehacer()
+                else:
+                    self._anotar_en_diario(accion)
+            return True, COMANDOS[accion.tipo].rehecho
         
-        try:
-            if accion.tipo == 'colocar_tile':
-                x, y, capa, tile_nuevo = accion.datos
-                
-                # Guardar estado actual para undo
-                tile_actual = mapa.capas[capa][y][x]
-                self.pila_undo.append(
-                    Accion('colocar_tile', (x, y, capa, tile_actual))
-                )
-                
-                # Aplicar estado nuevo
-                mapa.capas[capa][y][x] = tile_nuevo
-                return True, "✅ Acción rehecha"
-            
-            elif accion.tipo == 'toggle_colision':
-                x, y, estado_nuevo = accion.datos
-                
-                # Guardar estado actual para undo
-                estado_actual = mapa.capas['colision'][y][x]
-                self.pila_undo.append(
-                    Accion('toggle_colision', (x, y, estado_actual))
-                )
-                
-                # Aplicar estado nuevo
-                mapa.capas['colision'][y][x] = estado_nuevo
-                return True, "✅ Colisión rehecha"
-            
-            elif accion.tipo == 'flood_fill':
-                tiles_nuevos = accion.datos
-                capa = mapa.capa_activa
-                
-                # Guardar estado actual para undo
-                tiles_actuales = []
-                for x, y, _ in tiles_nuevos:
-                    tile_actual = mapa.capas[capa][y][x]
-                    tiles_actuales.append((x, y, tile_actual))
-                
-                self.pila_undo.append(
-                    Accion('flood_fill', tiles_actuales)
-                )
-                
-                # Aplicar tiles nuevos
-                for x, y, tile_nuevo in tiles_nuevos:
-                    mapa.capas[capa][y][x] = tile_nuevo
-                
-                return True, "✅ Relleno rehecho"
+        if self.pila_redo:
+            accion = self._desapilar(self.pila_redo)
+        else:
+            try:
+                accion = Accion('trazo', self.diario.leer_delta(self.diario.cursor))
+            except (OSError, ValueError) as e:
+                return False, f"❌ Error al rehacer: {str(e)}"
         
+        comando = COMANDOS[accion.tipo]
+        try:
+            comando.rehacer(mapa, accion.datos)
         except Exception as e:
             return False, f"❌ Error al rehacer: {str(e)}"
+        self._apilar(self.pila_undo, accion)
+        if self._en_diario(accion):
+            self.diario.anotar_rehacer()
+        return True, comando.rehecho
+    
+    def _deshacer_en_arbol(self):
+        arbol = self.arbol
+        if arbol.actual.padre is None:
+            # En la raíz: el árbol crece hacia arriba con el delta del diario
+            try:
+                arbol.agregar_raiz(Accion('trazo', self.diario.leer_delta(self.diario.cursor - 1)))
+            except (OSError, ValueError) as e:
+                return False, f"❌ Error al deshacer: {str(e)}"
+        accion = arbol.subir().accion
+        arbol.recortar(self.presupuesto_bytes)
+        if self._en_diario(accion):
+            self.diario.anotar_deshacer()
+        return True, COMANDOS[accion.tipo].deshecho
+    
+    def ir_a(self, mapa, nodo):
+        """Salta al estado de cualquier nodo del árbol (nodo o id)."""
+        if self.trazo is not None:
+            self.confirmar_trazo()
+        if self.arbol is None:
+            return False, "El historial no es un árbol"
+        if self.arbol.mapa is not mapa:
+            return False, "El árbol de undo es de otro mapa"
+        try:
+            subida, bajada = self.arbol.ir_a(nodo)
+        except KeyError:
+            return False, f"No existe el nodo {nodo}"
+        
+        # El diario es lineal: el salto se anota como deshacer hasta el
+        # ancestro común y los deltas de la otra rama como acciones nuevas
+        if self.diario is not None:
+            for paso in subida:
+                if self._en_diario(paso.accion):
+                    self.diario.anotar_deshacer()
+            for paso in bajada:
+                self._anotar_en_diario(paso.accion)
+        return True, f"✅ Historial en el nodo {self.arbol.actual.id}"
+    
+    def alternar_rama(self, mapa):
+        """Salta a la punta de la rama hermana más cercana (comparar A/B)."""
+        if self.arbol is None:
+            return False, "El historial no es un árbol"
+        if self.trazo is not None:
+            self.confirmar_trazo()
+        destino = self.arbol.rama_siguiente()
+        if destino is None:
+            return False, "No hay otra rama"
+        return self.ir_a(mapa, destino)
     
     def limpiar(self):
+        if self.arbol is not None:
+            self.arbol = type(self.arbol)(self.arbol.mapa, self.arbol.intervalo)
         self.pila_undo.clear()
         self.pila_redo.clear()
+        self.bytes_undo = 0
+        self.bytes_redo = 0
+        self.trazo = None
+    
+    def memoria_usada(self):
+        if self.arbol is not None:
+            return self.arbol.memoria_usada()
+        return self.bytes_undo + self.bytes_redo
     
     def obtener_estado(self):
+        if self.arbol is not None:
+            return {
+                'puede_deshacer': self.puede_deshacer(),
+                'puede_rehacer': self.puede_rehacer(),
+                'nodos': len(self.arbol),
+                'nodo_actual': self.arbol.actual.id,
+                'ramas': len(self.arbol.ramas()),
+                'bytes_arbol': self.arbol.memoria_usada(),
+                'presupuesto_bytes': self.presupuesto_bytes
+            }
         return {
             'puede_deshacer': self.puede_deshacer(),
             'puede_rehacer': self.puede_rehacer(),
             'acciones_undo': len(self.pila_undo),
-            'acciones_redo': len(self.pila_redo)
+            'acciones_redo': len(self.pila_redo),
+            'bytes_undo': self.bytes_undo,
+            'bytes_redo': self.bytes_redo,
+            'presupuesto_bytes': self.presupuesto_bytes
         }
 
 
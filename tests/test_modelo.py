@@ -5,6 +5,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from src.modelo import (
     Mapa, Tile, Objeto,
+    calcular_relleno,
+    linea_celdas,
+    celdas_del_trazo,
     crear_tile_desde_config,
     crear_objeto_desde_config,
     TILES_CONFIG,
@@ -98,6 +101,31 @@ def test_tile_serializacion():
         assert tile_nuevo.color == tile.color
         assert tile_nuevo.tiene_colision == tile.tiene_colision
         assert tile_nuevo.obtener_propiedad('dureza') == 100
+        
+        # Los tiles animados conservan frames y velocidad al guardar y cargar
+        # (mismo camino que GestorArchivos: to_dict, JSON, from_dict)
+        import json
+        from src.modelo.animacion import frame_en
+        agua = Tile('agua', animado=True)
+        agua.frames = ['agua_1.png', 'agua_2.png']
+        agua.tiempo_por_frame = 75
+        mapa = Mapa(4, 3, 32)
+        mapa.colocar_tile(1, 1, agua, 'fondo')
+        mapa.colocar_tile(2, 1, Tile('agua', animado=True), 'fondo')
+        guardado = json.loads(json.dumps([
+            [t.to_dict() if t else None for t in fila] for fila in mapa.obtener_matriz('fondo')
+        ]))
+        cargado = Mapa(4, 3, 32)
+        cargado.establecer_matriz('fondo', [
+            [Tile.from_dict(datos) if datos else None for datos in fila] for fila in guardado
+        ])
+        rapido = cargado.obtener_tile(1, 1, 'fondo')
+        assert rapido.frames == ('agua_1.png', 'agua_2.png') and rapido.tiempo_por_frame == 75
+        assert frame_en(rapido, 80) == 1
+        # Otra velocidad es otra entrada de la paleta
+        assert cargado.obtener_tile(2, 1, 'fondo').tiempo_por_frame == 200
+        assert len(cargado.paleta) == 2
+        assert agua.clonar().tiempo_por_frame == 75
         resultado.registrar_exito("Serialización de tile")
     except Exception as e:
         resultado.registrar_fallo("Serialización de tile", str(e))
@@ -247,6 +275,59 @@ def test_estadisticas_mapa():
         resultado.registrar_fallo("Estadísticas del mapa", str(e))
 
 
+def test_paleta_compartida():
+    try:
+        mapa = Mapa(50, 50, 32)
+        for y in range(50):
+            for x in range(50):
+                mapa.colocar_tile(x, y, Tile('pasto'), 'fondo')
+        mapa.colocar_tile(0, 0, Tile('agua'), 'fondo')
+        
+        # Solo dos definiciones distintas, no 2500 objetos
+        assert len(mapa.paleta) == 2
+        assert mapa.obtener_tile(1, 1, 'fondo') is mapa.obtener_tile(2, 2, 'fondo')
+        assert mapa.obtener_tile(0, 0, 'fondo').tipo == 'agua'
+        
+        stats = mapa.obtener_estadisticas()
+        assert stats['tiles_fondo'] == 2500
+        assert stats['tiles_objetos'] == 0
+        resultado.registrar_exito("Paleta de tiles compartida")
+    except Exception as e:
+        resultado.registrar_fallo("Paleta de tiles compartida", str(e))
+
+
+def test_tiles_internados():
+    try:
+        from src.modelo import registro_tiles
+        
+        pasto = registro_tiles.internar(Tile('pasto'))
+        assert registro_tiles.internar(Tile('pasto')) is pasto
+        assert pasto in {Tile('pasto')}
+        
+        try:
+            pasto.establecer_propiedad('velocidad', 2)
+            resultado.registrar_fallo("Tiles internados", "El tile compartido se pudo modificar")
+            return
+        except AttributeError:
+            pass
+        
+        mapa = Mapa(200, 200, 32)
+        for y in range(200):
+            for x in range(200):
+                mapa.colocar_tile(x, y, pasto, 'fondo')
+        assert len(mapa.paleta) == 1
+        assert mapa.obtener_tile(199, 199, 'fondo') is pasto
+        
+        # Override por celda: copy-on-write, las demás celdas no cambian
+        mapa.establecer_propiedad_celda(3, 3, 'velocidad', 2, 'fondo')
+        assert mapa.obtener_tile(3, 3, 'fondo').obtener_propiedad('velocidad') == 2
+        assert mapa.obtener_tile(4, 4, 'fondo').obtener_propiedad('velocidad') is None
+        assert len(mapa.paleta) == 2
+        resultado.registrar_exito("Tiles internados")
+    except Exception as e:
+        resultado.registrar_fallo("Tiles internados", str(e))
+
+
 def test_crear_objeto():
     try:
         obj = Objeto('Arbol', 10, 15, 'arbol')
@@ -394,6 +475,606 @@ def test_objetos_predefinidos_completo():
         resultado.registrar_fallo("OBJETOS_PREDEFINIDOS completo", str(e))
 
 
+def test_estadisticas_incrementales():
+    try:
+        mapa = Mapa(10, 10, 32)
+        agua = Tile('agua', tiene_colision=True)
+        for x in range(10):
+            mapa.colocar_tile(x, 0, Tile('pasto'), 'fondo')
+            mapa.colocar_tile(x, 1, agua, 'fondo')
+        mapa.colocar_tile(0, 0, None, 'fondo')
+        mapa.colocar_tile(3, 3, True, 'colision')
+        
+        assert mapa.obtener_histograma('fondo') == {'pasto': 9, 'agua': 10}
+        stats_capa = mapa.obtener_estadisticas_capa('fondo')
+        assert stats_capa['no_vacias'] == 19
+        assert stats_capa['con_colision'] == 10
+        assert mapa.obtener_estadisticas()['tiles_colision'] == 1
+        
+        # Deshacer también mantiene los contadores
+        mapa.undo_redo.deshacer(mapa)
+        mapa.undo_redo.deshacer(mapa)
+        assert mapa.obtener_estadisticas()['tiles_colision'] == 0
+        assert mapa.obtener_histograma('fondo') == {'pasto': 10, 'agua': 10}
+        
+        mapa.limpiar_capa('fondo')
+        assert mapa.obtener_histograma('fondo') == {}
+        resultado.registrar_exito("Estadísticas incrementales")
+    except Exception as e:
+        resultado.registrar_fallo("Estadísticas incrementales", str(e))
+
+
+def test_capa_colision_bits():
+    try:
+        mapa = Mapa(100, 50, 32)
+        colisiones = mapa.colisiones
+        
+        assert colisiones.activar_rectangulo(10, 10, 20, 15) == 50
+        assert colisiones.alternar_rectangulo(15, 10, 25, 11) == 10
+        assert mapa.obtener_tile(12, 12, 'colision') == True
+        assert mapa.obtener_tile(16, 10, 'colision') == False
+        assert mapa.obtener_tile(22, 10, 'colision') == True
+        assert mapa.obtener_estadisticas()['tiles_colision'] == 50
+        assert colisiones.recontar() == 50
+        assert list(colisiones.fila(10, 8, 14)) == [0, 0, 1, 1, 1, 1]
+        assert list(mapa.capas['fondo'].fila(0, 3, 5)) == [0, 0]
+        
+        mascara = type(colisiones)(100, 50)
+        mascara.activar_rectangulo(0, 0, 100, 12)
+        colisiones.desactivar_mascara(mascara)
+        assert sorted(colisiones.celdas_activas())[0] == (10, 12)
+        assert colisiones.contar_no_vacias() == 30
+        
+        # Lotes por tramos: cruzan filas, con valores mezclados, y se deshacen
+        from array import array
+        antes = colisiones.volcar()
+        indices = array('I', range(95, 210)) + array('I', [300, 302])
+        valores = array('H', [(i // 3) % 2 for i in range(len(indices))])
+        cambiados, anteriores = colisiones.escribir_lote(indices, valores)
+        assert all(colisiones.obtener(i % 100, i // 100) == v for i, v in zip(indices, valores))
+        assert colisiones.recontar() == colisiones.contar_no_vacias()
+        colisiones.escribir_lote(cambiados, anteriores)
+        assert colisiones.volcar() == antes and colisiones.contar_no_vacias() == 30
+        
+        # 1 bit por celda
+        assert len(colisiones._bits) == 13 * 50
+        resultado.registrar_exito("Capa de colisión en bits")
+    except Exception as e:
+        resultado.registrar_fallo("Capa de colisión en bits", str(e))
+
+
+def test_edicion_en_bloque():
+    try:
+        for disperso in (False, True):
+            mapa = Mapa(64, 64, 32, disperso)
+            pasto = Tile('pasto')
+            agua = Tile('agua')
+            
+            assert mapa.colocar_region(-5, -5, 15, 15, pasto, 'fondo') == 100
+            assert mapa.colocar_lote([(0, 0, agua), (50, 50, agua), (50, 50, None)], 'fondo') == 1
+            
+            mascara = mapa.colisiones.clonar()
+            mascara.limpiar()
+            mascara.activar_rectangulo(0, 0, 64, 2)
+            assert mapa.colocar_mascara(mascara, agua, 'fondo') == 127
+            
+            # Una acción por operación, no una por celda
+            assert len(mapa.undo_redo.pila_undo) == 3
+            assert mapa.obtener_estadisticas_capa('fondo')['histograma']['agua'] == 128
+            
+            for _ in range(3):
+                mapa.undo_redo.deshacer(mapa)
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+            for _ in range(3):
+                mapa.undo_redo.rehacer(mapa)
+            assert mapa.obtener_tile(0, 0, 'fondo').tipo == 'agua'
+            assert mapa.obtener_tile(9, 9, 'fondo').tipo == 'pasto'
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 208
+            
+            # Escritura por tramos: índices consecutivos y sueltos, valores mezclados
+            from array import array
+            from collections import Counter
+            capa = mapa.capas['fondo']
+            indices = array('I', list(range(60, 200)) + [5, 3, 400, 401, 399])
+            valores = array('H', [1, 2] * 70 + [2, 2, 1, 0, 1])
+            antes = [capa.obtener(i % 64, i // 64) for i in indices]
+            cambiados, anteriores = capa.escribir_lote(indices, valores)
+            assert [capa.obtener(i % 64, i // 64) for i in indices] == list(valores)
+            assert sorted(capa.histograma().items()) == sorted(Counter(
+                v for y in range(capa.alto) for v in capa.fila(y) if v).items())
+            capa.escribir_lote(cambiados, anteriores)
+            assert [capa.obtener(i % 64, i // 64) for i in indices] == antes
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 208
+        resultado.registrar_exito("Edición en bloque con un solo undo")
+    except Exception as e:
+        resultado.registrar_fallo("Edición en bloque con un solo undo", str(e))
+
+
+def test_relleno_por_tramos():
+    try:
+        for disperso in (False, True):
+            mapa = Mapa(40, 30, 32, disperso)
+            # Pared vertical en x=20 con un hueco
+            mapa.colocar_region(20, 0, 1, 30, Tile('roca'), 'fondo')
+            mapa.colocar_tile(20, 10, None, 'fondo')
+            
+            mascara = calcular_relleno(mapa.capas['fondo'], 0, 0)
+            assert mascara.contar_no_vacias() == 20 * 30 + 1 + 19 * 30
+            
+            mascara = calcular_relleno(mapa.capas['fondo'], 0, 0, limites=(0, 0, 10, 5))
+            assert mascara.contar_no_vacias() == 50
+            
+            acciones = len(mapa.undo_redo.pila_undo)
+            assert mapa.rellenar(0, 0, Tile('pasto'), 'fondo') == 20 * 30 + 1 + 19 * 30
+            assert len(mapa.undo_redo.pila_undo) == acciones + 1
+            
+            # Mismo tipo: no hace nada
+            assert mapa.rellenar(5, 5, Tile('pasto'), 'fondo') == 0
+            
+            mapa.undo_redo.deshacer(mapa)
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 29
+        resultado.registrar_exito("Relleno por tramos (scanline)")
+    except Exception as e:
+        resultado.registrar_fallo("Relleno por tramos (scanline)", str(e))
+
+
+def test_trazo_interpolado():
+    try:
+        assert linea_celdas(0, 0, 3, 0) == [(0, 0), (1, 0), (2, 0), (3, 0)]
+        assert linea_celdas(2, 2, 2, 2) == [(2, 2)]
+        # Sin huecos: cada paso avanza a lo sumo una celda en cada eje
+        for x1, y1 in ((7, 3), (-5, 9), (3, -8), (-6, -6)):
+            celdas = linea_celdas(0, 0, x1, y1)
+            assert celdas[0] == (0, 0) and celdas[-1] == (x1, y1)
+            assert len(celdas) == max(abs(x1), abs(y1)) + 1
+            for (ax, ay), (bx, by) in zip(celdas, celdas[1:]):
+                assert abs(bx - ax) <= 1 and abs(by - ay) <= 1
+        
+        # Muestras separadas del mouse: se completa el camino y la celda ya pintada no se repite
+        celdas = celdas_del_trazo([(4, 0), (4, 3), (4, 0)], anterior=(0, 0))
+        assert celdas == [(1, 0), (2, 0), (3, 0), (4, 0), (4, 1), (4, 2), (4, 3)]
+        
+        mapa = Mapa(10, 10, 32)
+        mapa.undo_redo.iniciar_trazo()
+        mapa.colocar_lote(((x, y, Tile('pasto')) for x, y in celdas_del_trazo([(0, 0), (9, 9)])), 'fondo')
+        mapa.undo_redo.confirmar_trazo()
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 10
+        mapa.undo_redo.deshacer(mapa)
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+        resultado.registrar_exito("Trazo interpolado (Bresenham)")
+    except Exception as e:
+        resultado.registrar_fallo("Trazo interpolado (Bresenham)", str(e))
+
+
+def test_indice_animados():
+    try:
+        from src.modelo.animacion import IndiceAnimados, frame_en
+        
+        agua = Tile('agua', animado=True)
+        agua.frames = ['agua_1.png', 'agua_2.png', 'agua_3.png']
+        agua.tiempo_por_frame = 100
+        assert [frame_en(agua, t) for t in (0, 99, 100, 250, 300)] == [0, 0, 1, 2, 0]
+        
+        for disperso in (False, True):
+            mapa = Mapa(64, 40, 32, disperso)
+            mapa.colocar_tile(1, 1, agua, 'fondo')
+            mapa.colocar_tile(5, 5, Tile('pasto'), 'fondo')
+            indice = IndiceAnimados(mapa, ('fondo', 'objetos'), 16)
+            mapa.agregar_oyente(indice.actualizar)
+            assert len(indice) == 1
+            
+            # Se mantiene con los avisos del mapa (también en undo y al limpiar)
+            mapa.colocar_region(30, 20, 10, 2, agua, 'fondo')
+            assert len(indice) == 21
+            assert sorted(indice.chunks('fondo')) == [(0, 0), (1, 1), (2, 1)]
+            assert len(list(indice.en_chunks('fondo', 0, 0, 0, 0))) == 1
+            assert len(list(indice.en_chunks('fondo', 2, 0, 3, 2))) == 16
+            mapa.colocar_tile(1, 1, Tile('pasto'), 'fondo')
+            assert len(indice) == 20
+            mapa.undo_redo.deshacer(mapa)
+            assert len(indice) == 21
+            mapa.limpiar_capa('fondo')
+            assert len(indice) == 0
+            mapa.undo_redo.deshacer(mapa)
+            assert len(indice) == 21
+            # Un lote grande se resuelve volviendo a buscar en la capa
+            indice.MAX_CELDAS_INCREMENTAL = 4
+            mapa.colocar_region(0, 30, 3, 3, agua, 'fondo')
+            assert len(indice) == 30
+            assert (0, 1) in indice.chunks('fondo')
+        
+        # Sin tiles animados en la paleta los avisos no cuestan nada
+        mapa = Mapa(64, 40, 32)
+        indice = IndiceAnimados(mapa, ('fondo', 'objetos'), 16)
+        mapa.agregar_oyente(indice.actualizar)
+        mapa.rellenar(0, 0, Tile('pasto'), 'fondo')
+        assert len(indice) == 0 and not indice.chunks()
+        resultado.registrar_exito("Índice de tiles animados")
+    except Exception as e:
+        resultado.registrar_fallo("Índice de tiles animados", str(e))
+
+
+def test_registro_recursos():
+    try:
+        import tempfile
+        from src.modelo import RegistroRecursos
+        
+        registro = RegistroRecursos()
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'pasto.png')
+            with open(ruta, 'wb') as archivo:
+                archivo.write(b'1234')
+            
+            for _ in range(1000):
+                assert registro.existe(ruta)
+            assert registro.consultas_disco == 1
+            assert registro.info(ruta).tamano == 4
+            
+            # Hasta reescanear se usa lo guardado
+            os.remove(ruta)
+            assert registro.existe(ruta)
+            assert registro.reescanear() == [ruta]
+            assert not registro.existe(ruta)
+            
+            with open(ruta, 'wb') as archivo:
+                archivo.write(b'123456')
+            assert registro.info(ruta, verificar=True).tamano == 6
+        
+        tile = Tile('pasto', sprite='no/existe.png')
+        assert not tile.tiene_sprite()
+        resultado.registrar_exito("Registro de recursos (caché de sprites)")
+    except Exception as e:
+        resultado.registrar_fallo("Registro de recursos (caché de sprites)", str(e))
+
+
+def test_trazo_undo():
+    try:
+        mapa = Mapa(100, 100, 32)
+        gestor = mapa.undo_redo
+        pasto = Tile('pasto')
+        agua = Tile('agua')
+        
+        # Un trazo de 10.000 celdas (pasando dos veces por cada una) es una sola acción
+        gestor.iniciar_trazo()
+        for y in range(100):
+            for x in range(100):
+                mapa.colocar_tile(x, y, pasto, 'fondo')
+        for y in range(100):
+            for x in range(100):
+                mapa.colocar_tile(x, y, agua, 'fondo')
+        mapa.alternar_colision(5, 5)
+        gestor.confirmar_trazo()
+        
+        assert len(gestor.pila_undo) == 1
+        capa, indices, anteriores, nuevos = gestor.pila_undo[0].datos[0]
+        assert capa == 'fondo' and len(indices) == 10000
+        assert set(anteriores) == {0} and len(set(nuevos)) == 1
+        
+        gestor.deshacer(mapa)
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+        assert mapa.obtener_estadisticas()['tiles_colision'] == 0
+        gestor.rehacer(mapa)
+        assert mapa.obtener_tile(99, 99, 'fondo').tipo == 'agua'
+        assert mapa.obtener_tile(5, 5, 'colision') == True
+        
+        # Un trazo que no cambia nada no ocupa lugar en el historial
+        gestor.iniciar_trazo()
+        mapa.colocar_tile(0, 0, agua, 'fondo')
+        assert not gestor.confirmar_trazo()
+        resultado.registrar_exito("Trazos con delta compacto en undo")
+    except Exception as e:
+        resultado.registrar_fallo("Trazos con delta compacto en undo", str(e))
+
+
+def test_historial_por_memoria():
+    try:
+        from src.sistema.undo_redo import GestorUndoRedo
+        
+        mapa = Mapa(200, 200, 32)
+        mapa.undo_redo = GestorUndoRedo(presupuesto_mb=0.375)
+        gestor = mapa.undo_redo
+        
+        # Muchas acciones chicas: entran cientos (antes el tope era 50)
+        for x in range(200):
+            mapa.colocar_tile(x, 0, Tile('pasto'), 'fondo')
+        assert len(gestor.pila_undo) == 200
+        
+        # Una acción grande desplaza a las viejas hasta entrar en el presupuesto
+        mapa.colocar_region(0, 0, 200, 200, Tile('agua'), 'fondo')
+        estado = gestor.obtener_estado()
+        assert estado['bytes_undo'] <= estado['presupuesto_bytes']
+        assert estado['acciones_undo'] < 200
+        assert estado['bytes_undo'] == sum(a.tamano() for a in gestor.pila_undo)
+        
+        gestor.deshacer(mapa)
+        assert gestor.bytes_redo == gestor.pila_redo[-1].tamano()
+        resultado.registrar_exito("Historial de undo limitado por memoria")
+    except Exception as e:
+        resultado.registrar_fallo("Historial de undo limitado por memoria", str(e))
+
+
+def test_diario_recuperacion():
+    try:
+        import tempfile
+        from src.sistema.undo_redo import GestorUndoRedo
+        from src.sistema.diario import abrir_diario, hay_cambios_sin_guardar, recuperar_mapa
+        
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'mapa.diario')
+            mapa = Mapa(50, 40, 32)
+            # Presupuesto mínimo: casi todo el historial queda solo en disco
+            mapa.undo_redo = GestorUndoRedo(presupuesto_mb=0.001)
+            diario = abrir_diario(mapa, ruta, checkpoint_cada=5)
+            gestor = mapa.undo_redo
+            
+            for i in range(20):
+                mapa.colocar_region(i, i, 3, 3, Tile('pasto' if i % 2 else 'agua'), 'fondo')
+            mapa.establecer_colision(7, 7, True)
+            assert len(gestor.pila_undo) < 21
+            
+            for _ in range(21):
+                assert gestor.deshacer(mapa)[0]
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+            for _ in range(18):
+                gestor.rehacer(mapa)
+            tipos = lambda m: [[t.tipo if t else None for t in fila] for fila in m.obtener_matriz('fondo')]
+            esperado = tipos(mapa)
+            diario.sincronizar()
+            
+            # Simular un cierre inesperado: recuperar desde el archivo
+            recuperado = recuperar_mapa(ruta)
+            assert tipos(recuperado) == esperado
+            assert recuperado.undo_redo.rehacer(recuperado)[0]
+            assert recuperado.undo_redo.deshacer(recuperado)[0]
+            assert tipos(recuperado) == esperado
+            
+            recuperado.undo_redo.diario.cerrar()
+            diario.cerrar(borrar=True)
+            assert not os.path.exists(ruta)
+            
+            # La metadata va en los checkpoints, y una acción fuera del
+            # diario deja registrado que cortó el redo
+            mapa = Mapa(20, 20, 32)
+            mapa.establecer_metadata('autor', 'Ana')
+            diario = abrir_diario(mapa, ruta)
+            mapa.colocar_tile(1, 1, Tile('pasto'), 'fondo')
+            mapa.colocar_tile(2, 2, Tile('pasto'), 'fondo')
+            mapa.undo_redo.deshacer(mapa)
+            mapa.establecer_metadata('nombre', 'Isla')
+            assert not mapa.undo_redo.puede_rehacer()
+            diario.sincronizar()
+            recuperado = recuperar_mapa(ruta)
+            assert recuperado.metadata['autor'] == 'Ana'
+            assert recuperado.obtener_estadisticas()['tiles_fondo'] == 1
+            assert not recuperado.undo_redo.puede_rehacer()
+            recuperado.undo_redo.diario.cerrar()
+            diario.cerrar(borrar=True)
+            
+            # Guardar deja una marca (no hay nada que recuperar) y con otro
+            # nombre el diario se mueve; el undo sigue leyendo del archivo
+            mapa = Mapa(20, 20, 32)
+            mapa.undo_redo = GestorUndoRedo(presupuesto_mb=0.0001)
+            diario = abrir_diario(mapa, ruta)
+            for i in range(5):
+                mapa.colocar_tile(i, i, Tile('pasto'), 'fondo')
+            otra = os.path.join(carpeta, 'isla.diario')
+            diario.guardado(otra)
+            diario.sincronizar()
+            assert not os.path.exists(ruta) and diario.ruta == otra
+            assert not hay_cambios_sin_guardar(otra)
+            for _ in range(5):
+                assert mapa.undo_redo.deshacer(mapa)[0]
+            assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+            diario.sincronizar()
+            assert hay_cambios_sin_guardar(otra)
+            diario.cerrar(borrar=True)
+            assert not os.path.exists(otra)
+            
+            # Si el hilo no puede escribir avisa a quien abrió el diario, y
+            # ya no se lee del archivo lo que pudo no quedar escrito
+            errores = []
+            mapa = Mapa(10, 10, 32)
+            mapa.undo_redo = GestorUndoRedo(presupuesto_mb=0.0001)
+            diario = abrir_diario(mapa, ruta, al_fallar=errores.append)
+            diario._archivo.close()
+            mapa.colocar_tile(1, 1, Tile('pasto'), 'fondo')
+            mapa.colocar_tile(2, 2, Tile('pasto'), 'fondo')
+            diario.sincronizar()
+            assert len(errores) == 1 and diario.error is errores[0]
+            assert not diario.puede_deshacer()
+            try:
+                diario.leer_delta(0)
+                assert False, "leer_delta sin el delta escrito"
+            except ValueError:
+                pass
+            while mapa.undo_redo.puede_deshacer():
+                assert mapa.undo_redo.deshacer(mapa)[0]
+            diario.cerrar(borrar=True)
+        resultado.registrar_exito("Diario de cambios y recuperación")
+    except Exception as e:
+        resultado.registrar_fallo("Diario de cambios y recuperación", str(e))
+
+
+def test_comandos_undo():
+    try:
+        mapa = Mapa(20, 20, 32)
+        gestor = mapa.undo_redo
+        mapa.colocar_region(0, 0, 20, 20, Tile('pasto'), 'fondo')
+        capa_llena = mapa.capas['fondo']
+        
+        # Limpiar cambia la capa entera; deshacer vuelve a ponerla
+        assert mapa.limpiar_capa('fondo')
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+        assert gestor.pila_undo[-1].tipo == 'cambiar_capa'
+        # La capa guardada entera cuenta para el presupuesto del historial
+        assert gestor.pila_undo[-1].tamano() >= capa_llena.bytes_datos()
+        assert gestor.deshacer(mapa)[0]
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 400
+        assert mapa.capas['fondo'] is not capa_llena
+        assert gestor.rehacer(mapa)[0]
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+        assert capa_llena.contar_no_vacias() == 400
+        
+        # Spawns y metadata
+        mapa.agregar_spawn_point(1, 1, 'jugador')
+        mapa.agregar_spawn_point(2, 2, 'enemigo')
+        mapa.agregar_spawn_point(1, 1, 'enemigo')
+        assert mapa.eliminar_spawn_point(1, 1)
+        assert [sp['tipo'] for sp in mapa.spawn_points] == ['enemigo']
+        gestor.deshacer(mapa)
+        assert [sp['tipo'] for sp in mapa.spawn_points] == ['jugador', 'enemigo', 'enemigo']
+        assert mapa.establecer_metadata('autor', 'Ana')
+        assert not mapa.establecer_metadata('autor', 'Ana')
+        gestor.deshacer(mapa)
+        assert mapa.metadata['autor'] == ''
+        
+        # Un tipo sin comando registrado no entra al historial
+        from src.sistema.undo_redo import Accion
+        try:
+            gestor.registrar_accion(Accion('inventado', None))
+            assert False, "Debería rechazar el tipo"
+        except ValueError:
+            pass
+        resultado.registrar_exito("Comandos de undo (capas, spawns, metadata)")
+    except Exception as e:
+        resultado.registrar_fallo("Comandos de undo (capas, spawns, metadata)", str(e))
+
+
+def test_arbol_undo():
+    try:
+        mapa = Mapa(30, 20, 32)
+        gestor = mapa.undo_redo
+        gestor.usar_arbol(mapa, intervalo=4)
+        tipos = lambda: [[t.tipo if t else None for t in fila] for fila in mapa.obtener_matriz('fondo')]
+        
+        for i in range(10):
+            mapa.colocar_tile(i, 0, Tile('pasto'))
+        gestor.deshacer(mapa)
+        # Rama A: agua en (9, 0); rama B: arena en (9, 0)
+        mapa.colocar_tile(9, 0, Tile('agua'))
+        version_a = tipos()
+        nodo_a = gestor.arbol.actual
+        gestor.deshacer(mapa)
+        mapa.colocar_tile(9, 0, Tile('arena'))
+        version_b = tipos()
+        
+        # Lo nuevo no borró la rama A
+        assert len(gestor.arbol.ramas()) == 3
+        # Se recorren las ramas hermanas en orden: pasto, A, B
+        assert gestor.alternar_rama(mapa)[0]
+        assert gestor.alternar_rama(mapa)[0]
+        assert tipos() == version_a and gestor.arbol.actual is nodo_a
+        assert gestor.alternar_rama(mapa)[0]
+        assert tipos() == version_b
+        
+        # Saltar a la raíz y volver (usa los snapshots)
+        assert gestor.ir_a(mapa, gestor.arbol.raiz.id)[0]
+        assert mapa.obtener_estadisticas()['tiles_fondo'] == 0
+        assert gestor.ir_a(mapa, nodo_a)[0]
+        assert tipos() == version_a
+        assert gestor.deshacer(mapa)[0] and gestor.rehacer(mapa)[0]
+        assert tipos() == version_a
+        
+        # Con poco presupuesto se sueltan primero las ramas abandonadas
+        gestor.presupuesto_bytes = gestor.arbol.memoria_usada() - 1
+        gestor.arbol.recortar(gestor.presupuesto_bytes)
+        assert nodo_a.id in gestor.arbol.nodos and len(gestor.arbol.ramas()) < 3
+        
+        # Al soltar la raíz la nueva (aunque no sea el nodo actual) queda
+        # con snapshot, y los saltos desde abajo siguen usándolo
+        mapa = Mapa(30, 20, 32)
+        gestor = mapa.undo_redo
+        gestor.usar_arbol(mapa, intervalo=8)
+        versiones = {}
+        for i in range(20):
+            mapa.colocar_tile(i, 1, Tile('pasto' if i % 2 else 'agua'))
+            versiones[gestor.arbol.actual.id] = tipos()
+        arbol = gestor.arbol
+        punta = arbol.actual
+        assert gestor.ir_a(mapa, arbol.nodos[6])[0]
+        while arbol.raiz.profundidad < 3:
+            arbol.recortar(arbol.memoria_usada() - 1)
+        raiz = arbol.raiz
+        assert raiz is not arbol.actual and raiz.profundidad % 8 != 0
+        assert raiz.snapshot is not None and arbol._snapshot_mas_cercano(raiz) == (raiz, [])
+        assert gestor.ir_a(mapa, punta)[0] and tipos() == versiones[punta.id]
+        assert gestor.ir_a(mapa, raiz)[0] and tipos() == versiones[raiz.id]
+        assert gestor.ir_a(mapa, punta)[0] and tipos() == versiones[punta.id]
+        resultado.registrar_exito("Árbol de undo con ramas")
+    except Exception as e:
+        resultado.registrar_fallo("Árbol de undo con ramas", str(e))
+
+
+def test_avisos_de_cambio():
+    try:
+        mapa = Mapa(10, 10, 32)
+        avisos = []
+        oyente = lambda capa, indices: avisos.append((capa, None if indices is None else sorted(indices)))
+        mapa.agregar_oyente(oyente)
+        
+        mapa.colocar_tile(2, 1, Tile('pasto'))
+        mapa.colocar_tile(2, 1, Tile('pasto'))  # sin cambio, sin aviso
+        assert avisos == [('fondo', [12])]
+        
+        mapa.colocar_region(0, 0, 2, 1, Tile('agua'), 'objetos')
+        mapa.establecer_colision(9, 9, True)
+        assert avisos[1:] == [('objetos', [0, 1]), ('colision', [99])]
+        
+        del avisos[:]
+        mapa.undo_redo.deshacer(mapa)
+        mapa.limpiar_capa('fondo')
+        assert avisos == [('colision', [99]), ('fondo', None)]
+        
+        # Los clones no heredan los oyentes
+        assert mapa.clonar()._oyentes == []
+        mapa.quitar_oyente(oyente)
+        mapa.colocar_tile(0, 0, Tile('pasto'))
+        assert len(avisos) == 2
+        resultado.registrar_exito("Avisos de celdas cambiadas")
+    except Exception as e:
+        resultado.registrar_fallo("Avisos de celdas cambiadas", str(e))
+
+
+def test_metricas_render():
+    try:
+        import json
+        import tempfile
+        from src.sistema.metricas import MetricasRender
+        
+        metricas = MetricasRender(ventana=100)
+        # Inactivo no anota nada
+        with metricas.medir('modelo'):
+            pass
+        assert metricas.fin_cuadro(0.0, 0.001) is None and not metricas.cuadros
+        
+        metricas.activo = True
+        for i in range(150):
+            inicio = float(i)
+            metricas.sumar('modelo', inicio, inicio + 0.002)
+            metricas.sumar('horneado', inicio + 0.002, inicio + 0.003)
+            metricas.fin_cuadro(inicio + 0.003, inicio + 0.003 + (i % 10 + 1) / 1000, region_px=1024, items=3)
+        assert len(metricas.cuadros) == 100
+        
+        resumen = metricas.resumen()
+        assert abs(resumen['modelo_ms']['p50'] - 2.0) < 1e-6
+        assert abs(resumen['pintado_ms']['p50'] - 5.0) < 1e-6
+        assert abs(resumen['pintado_ms']['p95'] - 10.0) < 1e-6
+        assert resumen['chunks_horneados'] == 100 and resumen['region_px'] == 1024
+        assert MetricasRender.percentil([], 95) == 0.0
+        assert MetricasRender.percentil([3, 1, 2], 50) == 2
+        
+        ruta = os.path.join(tempfile.mkdtemp(), 'traza.json')
+        metricas.exportar_json(ruta)
+        with open(ruta, encoding='utf-8') as archivo:
+            traza = json.load(archivo)
+        nombres = {evento['name'] for evento in traza['traceEvents']}
+        assert {'modelo', 'horneado', 'pintado', 'cuadro'} <= nombres
+        assert traza['metadata']['resumen']['cuadros'] == 100
+        resultado.registrar_exito("Métricas de render")
+    except Exception as e:
+        resultado.registrar_fallo("Métricas de render", str(e))
+
+
 def test_mapa_grande():
     try:
         mapa = Mapa(100, 100, 32)
@@ -413,6 +1094,33 @@ def test_mapa_grande():
         resultado.registrar_fallo("Mapa grande (100x100)", str(e))
 
 
+def test_mapa_disperso():
+    try:
+        mapa = Mapa(8192, 8192, 32, disperso=True)
+        capa = mapa.capas['decoracion']
+        assert capa.chunks_asignados == 0
+        
+        mapa.colocar_tile(5000, 7000, Tile('arena'), 'decoracion')
+        mapa.colocar_tile(5001, 7000, Tile('arena'), 'decoracion')
+        assert capa.chunks_asignados == 1
+        assert mapa.obtener_tile(5001, 7000, 'decoracion').tipo == 'arena'
+        assert mapa.obtener_tile(0, 0, 'decoracion') is None
+        assert mapa.obtener_estadisticas()['tiles_decoracion'] == 2
+        
+        # Lectura de un tramo de fila (solo mira los chunks del tramo)
+        tramo = capa.fila(7000, 4990, 5010)
+        assert len(tramo) == 20 and tramo.count(0) == 18
+        assert list(tramo) == list(capa.fila(7000)[4990:5010])
+        
+        # Al vaciar el chunk se libera
+        mapa.colocar_tile(5000, 7000, None, 'decoracion')
+        mapa.colocar_tile(5001, 7000, None, 'decoracion')
+        assert capa.chunks_asignados == 0
+        resultado.registrar_exito("Mapa disperso (8192x8192)")
+    except Exception as e:
+        resultado.registrar_fallo("Mapa disperso (8192x8192)", str(e))
+
+
 def test_clonar_mapa():
 
     try:
@@ -434,6 +1142,32 @@ def test_clonar_mapa():
         resultado.registrar_fallo("Clonar mapa", str(e))
 
 
+def test_clonar_copy_on_write():
+    try:
+        for disperso in (False, True):
+            mapa = Mapa(64, 64, 32, disperso)
+            mapa.colocar_tile(1, 1, Tile('pasto'))
+            
+            clon = mapa.clonar()
+            # Recién clonado comparte los datos con el original
+            if disperso:
+                assert clon.capas['fondo']._chunks is mapa.capas['fondo']._chunks
+            else:
+                assert clon.capas['fondo']._celdas is mapa.capas['fondo']._celdas
+            
+            mapa.colocar_tile(1, 1, Tile('agua'))
+            clon.limpiar_capa('fondo')
+            clon.colocar_tile(40, 40, Tile('lava'))
+            
+            assert mapa.obtener_tile(1, 1, 'fondo').tipo == 'agua'
+            assert mapa.obtener_tile(40, 40, 'fondo') is None
+            assert clon.obtener_tile(1, 1, 'fondo') is None
+            assert clon.obtener_tile(40, 40, 'fondo').tipo == 'lava'
+        resultado.registrar_exito("Clonar con copy-on-write")
+    except Exception as e:
+        resultado.registrar_fallo("Clonar con copy-on-write", str(e))
+
+
 def test_clonar_objeto():
     try:
         obj = Objeto('Original', 5, 5, 'test')
@@ -451,6 +1185,32 @@ def test_clonar_objeto():
 
 
 
+def test_memoria_por_instancia():
+    try:
+        import tracemalloc
+        
+        def medir(fabrica, n=10000):
+            tracemalloc.start()
+            instancias = [fabrica() for _ in range(n)]
+            usado = tracemalloc.get_traced_memory()[0] - sys.getsizeof(instancias)
+            tracemalloc.stop()
+            return usado / n
+        
+        bytes_tile = medir(lambda: Tile('pasto'))
+        bytes_objeto = medir(lambda: Objeto('Arbol', 5, 5, 'arbol'))
+        
+        # Con __slots__ no hay __dict__ ni listas/dicts vacíos por instancia
+        assert not hasattr(Tile('pasto'), '__dict__')
+        assert not hasattr(Objeto('Arbol', 5, 5), '__dict__')
+        assert bytes_tile < 160
+        assert bytes_objeto < 160
+        resultado.registrar_exito(
+            f"Memoria por instancia (Tile: {bytes_tile:.0f} B, Objeto: {bytes_objeto:.0f} B)"
+        )
+    except Exception as e:
+        resultado.registrar_fallo("Memoria por instancia", str(e))
+
+
 def ejecutar_todos_los_tests():
     """Ejecuta todos los tests del módulo."""
     print("=" * 60)
@@ -474,8 +1234,26 @@ def ejecutar_todos_los_tests():
     test_limpiar_capa()
     test_cambiar_capa_activa()
     test_estadisticas_mapa()
+    test_estadisticas_incrementales()
+    test_capa_colision_bits()
+    test_edicion_en_bloque()
+    test_relleno_por_tramos()
+    test_trazo_interpolado()
+    test_indice_animados()
+    test_registro_recursos()
+    test_trazo_undo()
+    test_historial_por_memoria()
+    test_diario_recuperacion()
+    test_arbol_undo()
+    test_comandos_undo()
+    test_avisos_de_cambio()
+    test_metricas_render()
     test_mapa_grande()
+    test_mapa_disperso()
     test_clonar_mapa()
+    test_clonar_copy_on_write()
+    test_paleta_compartida()
+    test_tiles_internados()
     
     print("\n Tests de Objeto:")
     test_crear_objeto()
@@ -487,6 +1265,9 @@ def ejecutar_todos_los_tests():
     test_crear_objeto_desde_config()
     test_clonar_objeto()
     
+    print("\n Tests de Memoria:")
+    test_memoria_por_instancia()
+    
     print("\n Tests de Configuración:")
     test_tiles_config_completo()
     test_objetos_predefinidos_completo()